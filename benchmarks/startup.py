@@ -0,0 +1,111 @@
+"""
+Cold-start benchmark for the CLI and the headless/bot entry points.
+
+For each entry module it runs `python -X importtime -c "import <module>"` in a
+fresh interpreter and reports the slowest imports, then times `main.py` from
+launch to its first "Select an option" prompt. Results are checked against
+startup_budget.json; any regression exits with status 1.
+
+    python benchmarks/startup.py            # check against the budget
+    python benchmarks/startup.py --top 15   # show a longer breakdown
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+FIRST_PROMPT = b"Select an option"
+
+def import_profile(module):
+    """{module: (self_us, cumulative_us)} for one fresh `import module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(own), int(cumulative))
+    return profile
+
+def first_prompt_ms():
+    """Wall-clock from process start until main.py asks for a menu option."""
+    env = dict(os.environ, TERM="dumb")
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=ROOT, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    seen = b""
+    while FIRST_PROMPT not in seen:
+        chunk = proc.stdout.read1(4096)
+        if not chunk:
+            break
+        seen += chunk
+    elapsed = (time.perf_counter() - start) * 1000
+    proc.communicate(b"5\n")
+    return elapsed if FIRST_PROMPT in seen else None
+
+def measure(budget, repeat):
+    results = {"import_ms": {}, "forbidden": {}, "profiles": {}}
+    for module in budget["import_ms"]:
+        samples = []
+        for _ in range(repeat):
+            profile = import_profile(module)
+            samples.append(profile[module][1] / 1000)
+        results["import_ms"][module] = statistics.median(samples)
+        results["profiles"][module] = profile
+        banned = budget.get("forbidden", {}).get(module, [])
+        results["forbidden"][module] = sorted(name for name in banned if name in profile)
+
+    samples = [first_prompt_ms() for _ in range(repeat)]
+    results["first_prompt_ms"] = None if None in samples else statistics.median(samples)
+    return results
+
+def check(results, budget):
+    failures = []
+    for module, limit in budget["import_ms"].items():
+        if results["import_ms"][module] > limit:
+            failures.append(f"import {module}: {results['import_ms'][module]:.1f} ms > {limit} ms")
+    for module, found in results["forbidden"].items():
+        if found:
+            failures.append(f"import {module} pulls in {', '.join(found)}")
+    if results["first_prompt_ms"] is None:
+        failures.append("main.py never reached its first prompt")
+    elif results["first_prompt_ms"] > budget["first_prompt_ms"]:
+        failures.append(f"first prompt: {results['first_prompt_ms']:.1f} ms > {budget['first_prompt_ms']} ms")
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start benchmark with a checked-in budget.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement (median is used)")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list per entry module")
+    parser.add_argument("--budget", default=BUDGET_PATH)
+    args = parser.parse_args(argv)
+
+    with open(args.budget, "r", encoding="utf-8") as f:
+        budget = json.load(f)
+    results = measure(budget, args.repeat)
+
+    for module, total in results["import_ms"].items():
+        print(f"import {module}: {total:.1f} ms (budget {budget['import_ms'][module]} ms)")
+        slowest = sorted(results["profiles"][module].items(), key=lambda item: item[1][0], reverse=True)
+        for name, (own, cumulative) in slowest[:args.top]:
+            print(f"    {own / 1000:7.2f} ms self  {cumulative / 1000:7.2f} ms total  {name}")
+    if results["first_prompt_ms"] is not None:
+        print(f"main.py to first prompt: {results['first_prompt_ms']:.1f} ms (budget {budget['first_prompt_ms']} ms)")
+
+    failures = check(results, budget)
+    for failure in failures:
+        print(f"OVER BUDGET: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
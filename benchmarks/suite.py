@@ -0,0 +1,274 @@
+"""
+Benchmarks for the engine hot paths, gated against a checked-in baseline.
+
+    python benchmarks/suite.py run                 # print timings
+    python benchmarks/suite.py compare             # run and compare with baseline.json
+    python benchmarks/suite.py baseline            # run and overwrite baseline.json
+    python benchmarks/suite.py compare --filter storage --threshold 0.5
+
+Every result is seconds per operation, the fastest of several batches: noise
+only ever adds time, so the minimum is what stays put between runs. `compare`
+exits with status 1 when any benchmark is slower than its baseline by more
+than the threshold (or its group's, from GROUP_THRESHOLDS, if looser) and by
+more than `--floor` seconds, so microsecond-scale benchmarks don't fail on
+jitter.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from engine import codec
+from engine.cache import CachedSaveManager
+from engine.dice import Dice
+from engine.game import GameEngine
+from engine.io import run_sync
+from engine.render import RenderCache
+from engine.simulator import HeadlessIO, RandomPolicy, SimulationAborted, SimulationStats, Simulator
+from engine.storage import JournaledSaveManager, MemorySaveManager, SaveManager, ShardedSaveManager
+from models.character import Character
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Allowed slowdown per group where the default --threshold is tighter than run-to-run noise:
+# a dispatch call is a few microseconds of branchy handler code and storage waits on fsync,
+# and both swing up to ~1.6x between processes on an unchanged tree.
+GROUP_THRESHOLDS = {"dispatch": 1.0, "storage": 1.0}
+STORE_SIZES = (1, 1000, 100000)
+INVENTORY_SIZES = (10, 1000)
+
+def load_book():
+    with open(os.path.join(ROOT, "data", "pages.json"), "r", encoding="utf-8") as f:
+        story = json.load(f)
+    with open(os.path.join(ROOT, "data", "enemies.json"), "r", encoding="utf-8") as f:
+        enemies = json.load(f)
+    return story, enemies
+
+def measure(fn, number, repeat=5, setup=None):
+    """Seconds per call of `fn` in the fastest of `repeat` batches of `number` calls."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return min(samples)
+
+def template_character(user_id="bench", inventory=None):
+    character = Character("Bench", user_id, dice=Dice(0))
+    character.stamina = character.max_stamina = 24
+    character.skill = character.max_skill = 12
+    character.luck = character.max_luck = 12
+    if inventory is not None:
+        character.inventory = inventory
+    return character
+
+# --- Benchmarks ---
+def bench_dispatch(story, enemies, quick):
+    """One handler call per page type, answered by a seeded random policy."""
+    io = HeadlessIO(RandomPolicy(random.Random(0)), max_reads=50, max_turns=10**9)
+    game = GameEngine(story, enemies, save_manager=MemorySaveManager(), io=io, user_id="bench", dice=Dice(0))
+    io.game = game
+    template = template_character().to_dict()
+
+    def reset():
+        io.reads = 0
+        game.character = Character.from_dict(dict(template, inventory=list(template["inventory"])))
+        game.save_manager.delete_character("bench") # A fresh character each call, not a stale write
+        game.save_manager.save_character(game.character)
+        game.running = True
+
+    results = {}
+    seen = set()
+    for page in game.graph.pages:
+        if page.type in seen:
+            continue
+        seen.add(page.type)
+
+        def call(page=page):
+            reset()
+            game.page_id = page.id
+            try:
+                run_sync(game.dispatch(page))
+            except SimulationAborted:
+                pass # A shop or loop the random policy never left
+
+        results[f"dispatch.{page.type}"] = measure(call, 20 if quick else 1000, repeat=3 if quick else 9)
+    return results
+
+def _populate(path, count, binary=False, sharded=False):
+    record = template_character().to_dict()
+    records = {f"user{i}": dict(record, user_id=f"user{i}") for i in range(count)}
+    if sharded:
+        manager = ShardedSaveManager(path)
+        manager._save_all(records)
+        manager.close()
+        return
+    if binary:
+        with open(path, "wb") as f:
+            f.write(codec.encode(records))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+
+def bench_storage(story, enemies, quick):
+    results = {}
+    sizes = STORE_SIZES[:2] if quick else STORE_SIZES
+    backends = {
+        "snapshot": lambda path: SaveManager(path),
+        "binary": lambda path: SaveManager(path, codec="binary"),
+        "sharded": lambda path: ShardedSaveManager(path),
+        "journal": lambda path: JournaledSaveManager(path),
+        "cached": lambda path: CachedSaveManager(JournaledSaveManager(path)),
+    }
+    for size in sizes:
+        for name, factory in backends.items():
+            workdir = tempfile.mkdtemp(prefix="ff-bench-")
+            try:
+                path = os.path.join(workdir, "shards" if name == "sharded" else "characters.json")
+                _populate(path, size, binary=name == "binary", sharded=name == "sharded")
+                manager = factory(path)
+                character = template_character("user0")
+                # Full-file rewrites get few iterations so 100k stays tolerable
+                rewrites = name in ("snapshot", "binary", "sharded")
+                number = 3 if rewrites and size >= 100000 else (20 if rewrites else 500)
+                results[f"storage.{name}.save.{size}"] = measure(lambda: manager.save_character(character), number, repeat=3)
+                results[f"storage.{name}.load.{size}"] = measure(lambda: manager.load_character("user0"), number, repeat=3)
+                manager.close()
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def bench_character(story, enemies, quick):
+    results = {}
+    effects = {"stamina": -2, "gold": 3, "add_items": ["Bench Token"], "remove_items": ["Bench Token"]}
+    dice = Dice(0)
+    for size in INVENTORY_SIZES:
+        character = template_character(inventory=[f"Item {i}" for i in range(size)])
+        number = 200 if quick else 2000
+        results[f"character.apply_effects.inv{size}"] = measure(lambda: character.apply_effects(effects, dice), number)
+        results[f"character.has_item.inv{size}"] = measure(lambda: character.has_item("missing item"), number)
+    return results
+
+def bench_playthrough(story, enemies, quick):
+    results = {}
+    runs = 50 if quick else 500
+    for policy in ("random", "greedy"):
+        simulator = Simulator(story, enemies, policy)
+        seeds = iter(range(10**9))
+        results[f"playthrough.{policy}"] = measure(lambda: simulator.run_one(next(seeds), SimulationStats()), runs, repeat=3)
+    # Same runs with gameplay analytics collected, to keep ingest off the per-turn cost
+    simulator = Simulator(story, enemies, "random", analytics=True)
+    seeds = iter(range(10**9))
+    results["playthrough.random.analytics"] = measure(lambda: simulator.run_one(next(seeds), SimulationStats()), runs, repeat=3)
+    return results
+
+def bench_render(story, enemies, quick):
+    cache = RenderCache()
+    keys = list(story)
+    texts = [page.get("text") or "" for page in story.values()]
+    position = iter(range(10**9))
+    number = 100 if quick else 400
+    return {
+        "render.header.cold": measure(lambda: cache.header(f"Page {keys[next(position) % len(keys)]}"), number, setup=cache.clear),
+        "render.header.warm": measure(lambda: cache.header("Page 1"), number * 10),
+        "render.wrapped.cold": measure(lambda: cache.wrapped(texts[next(position) % len(texts)]), number, setup=cache.clear),
+        "render.wrapped.warm": measure(lambda: cache.wrapped(texts[0]), number * 10),
+    }
+
+BENCHMARKS = {
+    "dispatch": bench_dispatch,
+    "storage": bench_storage,
+    "character": bench_character,
+    "playthrough": bench_playthrough,
+    "render": bench_render,
+}
+
+# --- Runner ---
+def run(selected, quick):
+    story, enemies = load_book()
+    results = {}
+    for group, bench in BENCHMARKS.items():
+        if selected and not any(fnmatch.fnmatch(group, pattern) or pattern.startswith(group) for pattern in selected):
+            continue
+        results.update(bench(story, enemies, quick))
+    if selected:
+        results = {name: value for name, value in results.items()
+                   if any(fnmatch.fnmatch(name, pattern) or name.startswith(pattern) for pattern in selected)}
+    return results
+
+def compare(results, baseline, threshold, floor=0.0):
+    regressions = []
+    for name, seconds in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            print(f"  new   {name:<40} {format_time(seconds)}")
+            continue
+        ratio = seconds / before if before else float("inf")
+        allowed = max(threshold, GROUP_THRESHOLDS.get(name.split(".")[0], 0.0))
+        slow = ratio > 1 + allowed and seconds - before > floor
+        flag = "SLOW " if slow else "  ok "
+        print(f"{flag} {name:<40} {format_time(before)} -> {format_time(seconds)} ({ratio:.2f}x)")
+        if slow:
+            regressions.append(name)
+    return regressions
+
+def format_time(seconds):
+    if seconds >= 1:
+        return f"{seconds:8.2f} s "
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds * 1e6:8.2f} us"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Engine hot-path benchmarks.")
+    parser.add_argument("command", choices=("run", "compare", "baseline"))
+    parser.add_argument("--filter", action="append", default=[], help="Benchmark name or glob (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations and no 100k-character store")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown before compare fails")
+    parser.add_argument("--floor", type=float, default=2e-6, help="Slowdowns smaller than this many seconds never fail compare")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--out", help="Also write these results to a JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.quick)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+
+    if args.command == "run":
+        for name, seconds in sorted(results.items()):
+            print(f"{name:<40} {format_time(seconds)}")
+        return 0
+
+    if args.command == "baseline":
+        payload = {"machine": f"{platform.python_implementation()} {platform.python_version()} {platform.machine()}", "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                payload["results"] = json.load(f).get("results", {})
+        payload["results"].update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=4, sort_keys=True)
+        print(f"Wrote {len(results)} results to {args.baseline}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold, args.floor)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed past their threshold")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
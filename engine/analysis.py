@@ -0,0 +1,374 @@
+"""
+Static analysis of the compiled story graph.
+
+    python -m engine.analysis           # analyze, exit 1 on structural problems
+    python -m engine.analysis --force   # ignore the cached index
+
+Results are stored in `.story_index/<sha256 of pages.json + enemies.json>.json`
+so content CI only redoes the work when the data actually changed.
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+import sys
+from collections import deque
+
+from engine.graph import compile_story
+from engine.storage import write_atomic
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+INDEX_DIR = os.path.join(os.path.dirname(__file__), "..", ".story_index")
+INDEX_VERSION = 1
+
+# Nominal hero used to weight random edges for the most-probable path
+NOMINAL_SKILL = 9
+NOMINAL_STAMINA = 18
+NOMINAL_LUCK = 9
+
+STARTING_ITEMS = ("Sword", "Leather Armour", "Backpack")
+TERMINAL_TYPES = ("game_over", "victory")
+
+def _chance_at_most(target):
+    # P(2d6 <= target)
+    return sum(1 for a in range(1, 7) for b in range(1, 7) if a + b <= target) / 36
+
+def _random_test_chance(outcome):
+    if outcome.isdigit():
+        return 1 / 6
+    low, _, high = outcome.partition("-")
+    if low.isdigit() and high.isdigit():
+        return (int(high) - int(low) + 1) / 6
+    return 0.0
+
+class StoryAnalyzer:
+    def __init__(self, graph):
+        self.graph = graph
+        self.edges = [self._edges(page) for page in graph.pages]
+
+    # --- Edges ---
+    def _combat_chance(self, page):
+        from engine.odds import fight_odds
+        enemies = [stats for _, stats in page.enemies]
+        odds = fight_odds(NOMINAL_SKILL, NOMINAL_STAMINA, NOMINAL_LUCK, enemies, page.data.get("rules"))
+        return {"win": odds.win, "win_fast": odds.win_fast, "win_slow": odds.win_slow, "escape": odds.escape, "lose": odds.lose}
+
+    def _edges(self, page):
+        """[(target, probability, gate)] where gate is (kind, items) for condition pages."""
+        ptype = page.type
+        out = page.outcomes
+
+        if ptype in ("condition_item", "condition_multi", "condition_item_any"):
+            if ptype == "condition_item":
+                items, kind = (page.data["check"]["item"],), "all"
+            elif ptype == "condition_multi":
+                items, kind = tuple(c["value"] for c in page.data["checks"] if c["type"] == "item"), "all"
+            else:
+                items, kind = tuple(c["item"] for c in page.data["checks"]), "any"
+            return [(out["success"], 1.0, (kind, items)), (out["failure"], 1.0, None)]
+
+        if ptype in ("condition_gold", "condition_combat"):
+            return [(target, 1.0, None) for target in out.values()]
+
+        if ptype == "luck_test":
+            lucky = _chance_at_most(NOMINAL_LUCK)
+            return [(out["lucky"], lucky, None), (out["unlucky"], 1 - lucky, None)]
+
+        if ptype == "luck_test_double":
+            first, second = _chance_at_most(NOMINAL_LUCK), _chance_at_most(NOMINAL_LUCK - 1)
+            chances = {
+                "lucky_lucky": first * second, "lucky_unlucky": first * (1 - second),
+                "unlucky_lucky": (1 - first) * second, "unlucky_unlucky": (1 - first) * (1 - second),
+            }
+            return [(out[name], p, None) for name, p in chances.items()]
+
+        if ptype == "skill_test":
+            success = _chance_at_most(NOMINAL_SKILL)
+            return [(out["success"], success, None), (out["failure"], 1 - success, None)]
+
+        if ptype == "random_test":
+            return [(target, _random_test_chance(name), None) for name, target in out.items()]
+
+        if ptype in ("combat", "multi_combat"):
+            chances = self._combat_chance(page)
+            return [(target, chances.get(name, 0.0), None) for name, target in out.items()]
+
+        if ptype == "random_encounter":
+            merged = {}
+            for encounter in page.encounters.values():
+                for name, p in self._combat_chance(encounter).items():
+                    merged[name] = merged.get(name, 0.0) + p / 6
+            return [(target, merged.get(name, 0.0), None) for name, target in out.items()]
+
+        # Choices are the player's call; everything else has one exit
+        return [(target, 1.0, None) for target in page.targets()]
+
+    # --- Reachability ---
+    def reachable(self, start=None):
+        start = self.graph.start if start is None else start
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for target, _, _ in self.edges[node]:
+                if target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+        return seen
+
+    def dead_ends(self):
+        return [p.id for p in self.graph.pages if p.type not in TERMINAL_TYPES and not self.edges[p.id]]
+
+    def strongly_connected_components(self):
+        """Iterative Tarjan."""
+        index, low, on_stack = {}, {}, set()
+        stack, components = [], []
+        counter = 0
+        for root in range(len(self.graph.pages)):
+            if root in index:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, child = work.pop()
+                if child == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack.add(node)
+                targets = self.edges[node]
+                if child < len(targets):
+                    work.append((node, child + 1))
+                    target = targets[child][0]
+                    if target not in index:
+                        work.append((target, 0))
+                    elif target in on_stack:
+                        low[node] = min(low[node], index[target])
+                    continue
+                for target, _, _ in targets:
+                    if target in on_stack:
+                        low[node] = min(low[node], low[target])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+        return components
+
+    def traps(self, components=None):
+        """Loops that can be entered but never left."""
+        found = []
+        for component in components or self.strongly_connected_components():
+            members = set(component)
+            looping = len(component) > 1 or any(t == component[0] for t, _, _ in self.edges[component[0]])
+            if not looping:
+                continue
+            exits = any(t not in members for node in component for t, _, _ in self.edges[node])
+            terminal = any(self.graph.pages[node].type in TERMINAL_TYPES for node in component)
+            if not exits and not terminal:
+                found.append(sorted(component))
+        return found
+
+    # --- Paths ---
+    def shortest_path(self, goal, start=None):
+        start = self.graph.start if start is None else start
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                return self._walk(previous, goal)
+            for target, _, _ in self.edges[node]:
+                if target not in previous:
+                    previous[target] = node
+                    queue.append(target)
+        return None
+
+    def most_probable_path(self, goal, start=None):
+        """Dijkstra over -log(p): the path a nominal hero is likeliest to survive."""
+        start = self.graph.start if start is None else start
+        best = {start: 0.0}
+        previous = {start: None}
+        heap = [(0.0, start)]
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if node == goal:
+                return self._walk(previous, goal), math.exp(-cost)
+            if cost > best[node]:
+                continue
+            for target, p, _ in self.edges[node]:
+                if p <= 0:
+                    continue
+                new_cost = cost - math.log(p)
+                if new_cost < best.get(target, math.inf):
+                    best[target] = new_cost
+                    previous[target] = node
+                    heapq.heappush(heap, (new_cost, target))
+        return None, 0.0
+
+    @staticmethod
+    def _walk(previous, goal):
+        path = []
+        node = goal
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return path[::-1]
+
+    # --- Items ---
+    def item_prerequisites(self):
+        """
+        Items every path from the start must have passed an item gate for
+        ("must" dataflow: intersect over predecessors). `any`-gates are kept
+        as alternatives since no single item is required.
+        """
+        required = {self.graph.start: frozenset()}
+        queue = deque([self.graph.start])
+        while queue:
+            node = queue.popleft()
+            for target, _, gate in self.edges[node]:
+                incoming = required[node]
+                if gate is not None:
+                    kind, items = gate
+                    incoming = incoming | (frozenset(items) if kind == "all" else frozenset([" | ".join(items)]))
+                current = required.get(target)
+                merged = incoming if current is None else current & incoming
+                if merged != current:
+                    required[target] = merged
+                    queue.append(target)
+        return required
+
+    def granted_items(self):
+        items = set(STARTING_ITEMS)
+        for page in self.graph.pages:
+            data = page.data
+            items.update(data.get("effects", {}).get("add_items", ()))
+            if page.type in ("shop", "shop_multi"):
+                items.update(data.get("items", {}))
+            for _, _, option in page.choices:
+                items.update(option.get("effect", {}).get("add_items", ()))
+        return {item.lower() for item in items}
+
+    def unobtainable_gate_items(self):
+        granted = self.granted_items()
+        missing = set()
+        for edges in self.edges:
+            for _, _, gate in edges:
+                if gate:
+                    missing.update(item for item in gate[1] if item.lower() not in granted)
+        return sorted(missing)
+
+    # --- Report ---
+    def report(self):
+        keys = self.graph.keys
+        reachable = self.reachable()
+        components = self.strongly_connected_components()
+        prerequisites = self.item_prerequisites()
+
+        victories = {}
+        for page in self.graph.pages:
+            if page.type != "victory":
+                continue
+            shortest = self.shortest_path(page.id)
+            likely, chance = self.most_probable_path(page.id)
+            victories[page.key] = {
+                "reachable": page.id in reachable,
+                "shortest_path": [keys[n] for n in shortest] if shortest else None,
+                "most_probable_path": [keys[n] for n in likely] if likely else None,
+                "path_probability": chance,
+                "required_items": sorted(prerequisites.get(page.id, ())),
+            }
+
+        return {
+            "version": INDEX_VERSION,
+            "pages": len(self.graph.pages),
+            "reachable": len(reachable),
+            "unreachable": sorted(keys[p.id] for p in self.graph.pages if p.id not in reachable),
+            "dead_ends": sorted(keys[n] for n in self.dead_ends()),
+            "traps": [[keys[n] for n in trap] for trap in self.traps(components)],
+            "components": len(components),
+            "largest_component": max(len(c) for c in components),
+            "victories": victories,
+            "unobtainable_gate_items": self.unobtainable_gate_items(),
+            "item_prerequisites": {
+                keys[n]: sorted(items) for n, items in prerequisites.items() if items
+            },
+        }
+
+# --- Content-addressed Index ---
+def content_hash(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def analyze(pages_path, enemies_path, index_dir=INDEX_DIR, force=False):
+    """Returns (report, cached?)."""
+    key = content_hash(pages_path, enemies_path)
+    index_path = os.path.join(index_dir, f"{key}.json")
+    if not force and os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        if report.get("version") == INDEX_VERSION:
+            return report, True
+
+    with open(pages_path, "r", encoding="utf-8") as f:
+        story = json.load(f)
+    with open(enemies_path, "r", encoding="utf-8") as f:
+        enemies = json.load(f)
+
+    report = StoryAnalyzer(compile_story(story, enemies)).report()
+    report["content_hash"] = key
+    # Atomic, so a concurrent reader never loads a half-written index
+    write_atomic(index_path, json.dumps(report, indent=4))
+    return report, False
+
+def problems(report):
+    found = []
+    if report["dead_ends"]:
+        found.append(f"Dead ends: {', '.join(report['dead_ends'])}")
+    for trap in report["traps"]:
+        found.append(f"Loop with no exit: {', '.join(trap)}")
+    for key, victory in report["victories"].items():
+        if not victory["reachable"]:
+            found.append(f"Victory page {key} is unreachable")
+    return found
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Static story analysis.")
+    parser.add_argument("--pages", default=os.path.join(DATA_DIR, "pages.json"))
+    parser.add_argument("--enemies", default=os.path.join(DATA_DIR, "enemies.json"))
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--force", action="store_true", help="Ignore the cached index")
+    parser.add_argument("--json", action="store_true", help="Print the full report")
+    args = parser.parse_args(argv)
+
+    report, cached = analyze(args.pages, args.enemies, args.index_dir, args.force)
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print(f"{report['reachable']}/{report['pages']} pages reachable ({'cached' if cached else 'fresh'} {report['content_hash'][:12]})")
+        if report["unreachable"]:
+            print(f"Unreachable: {', '.join(report['unreachable'])}")
+        if report["unobtainable_gate_items"]:
+            print(f"Gate items nothing grants: {', '.join(report['unobtainable_gate_items'])}")
+        for key, victory in report["victories"].items():
+            if not victory["shortest_path"]:
+                print(f"Victory {key}: unreachable")
+                continue
+            print(f"Victory {key}: {len(victory['shortest_path'])} pages at best, "
+                  f"{victory['path_probability']:.2%} on the likeliest path, needs {victory['required_items'] or 'nothing'}")
+
+    found = problems(report)
+    for problem in found:
+        print(f"ERROR: {problem}", file=sys.stderr)
+    return 1 if found else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+Gameplay analytics: running totals per book, fed by the engine as it plays.
+
+    pages      visits, deaths, gold gained and gold spent on each page
+    choices    how often each option of a choice or transaction page is taken
+    enemies    fights won and lost against each enemy
+    gold       gold gained and spent per page type (pawn_shop, dice_game...)
+
+Counters live in flat arrays indexed by a slot per page key or enemy name, so
+recording a turn is a few array increments and every point query is a dict
+lookup and an index. Nothing keeps raw history. Off unless GameEngine gets an
+`analytics`; `start()` saves to a JSON file every `interval` seconds, and a
+saved file is merged back in when an Analytics is created with its path.
+Saving adds what this process recorded since its last save to whatever the
+file holds by then, under a file lock, so several processes can share one
+file. Simulated runs are kept under `<book>:simulated`, apart from players.
+
+    python -m engine.analytics data/analytics.json --top 10
+"""
+import argparse
+import json
+import os
+import threading
+from array import array
+
+try:
+    import fcntl
+except ImportError: # Windows: saves are only serialised within one process
+    fcntl = None
+
+from models.character import DEFAULT_BOOK
+
+PAGE_FIELDS = ("visits", "deaths", "gold_in", "gold_out")
+SIMULATED = ":simulated"
+
+def simulated(book_id):
+    """The analytics key that keeps simulated runs of a book apart from real players."""
+    return book_id + SIMULATED
+
+def _negated(totals):
+    if isinstance(totals, dict):
+        return {key: _negated(value) for key, value in totals.items()}
+    return [-count for count in totals]
+
+class BookStats:
+    def __init__(self):
+        self.slots = {} # Page key -> index into the page arrays
+        self.visits = array("q")
+        self.deaths = array("q")
+        self.gold_in = array("q")
+        self.gold_out = array("q")
+        self.choices = {} # Page key -> array of picks per option
+        self.enemy_slots = {} # Enemy name -> index into wins/losses
+        self.wins = array("q")
+        self.losses = array("q")
+        self.type_gold = {} # Page type -> [gold_in, gold_out]
+        self._lock = threading.Lock() # Taken only to add a slot and to snapshot
+
+    # --- Slots ---
+    def _page(self, key):
+        slot = self.slots.get(key)
+        if slot is None:
+            with self._lock:
+                slot = self.slots.get(key)
+                if slot is None:
+                    for counters in (self.visits, self.deaths, self.gold_in, self.gold_out):
+                        counters.append(0)
+                    slot = self.slots[key] = len(self.slots)
+        return slot
+
+    def _enemy(self, name):
+        slot = self.enemy_slots.get(name)
+        if slot is None:
+            with self._lock:
+                slot = self.enemy_slots.get(name)
+                if slot is None:
+                    self.wins.append(0)
+                    self.losses.append(0)
+                    slot = self.enemy_slots[name] = len(self.enemy_slots)
+        return slot
+
+    # --- Ingest ---
+    def turn(self, page, gold_delta):
+        slot = self._page(page.key)
+        self.visits[slot] += 1
+        if gold_delta:
+            totals = self.type_gold.get(page.type)
+            if totals is None:
+                with self._lock:
+                    totals = self.type_gold.setdefault(page.type, [0, 0])
+            if gold_delta > 0:
+                self.gold_in[slot] += gold_delta
+                totals[0] += gold_delta
+            else:
+                self.gold_out[slot] -= gold_delta
+                totals[1] -= gold_delta
+
+    def death(self, key):
+        self.deaths[self._page(key)] += 1
+
+    def choice(self, page, index):
+        counts = self.choices.get(page.key)
+        if counts is None or len(counts) < len(page.choices): # New, or grown by a hot reload
+            with self._lock:
+                counts = self.choices.get(page.key, array("q"))
+                counts.extend([0] * (len(page.choices) - len(counts)))
+                self.choices[page.key] = counts
+        counts[index] += 1
+
+    def fight(self, name, won):
+        slot = self._enemy(name)
+        if won:
+            self.wins[slot] += 1
+        else:
+            self.losses[slot] += 1
+
+    # --- Queries ---
+    def page(self, key):
+        """{visits, deaths, gold_in, gold_out} for one page; zeros if never visited."""
+        slot = self.slots.get(key)
+        if slot is None:
+            return dict.fromkeys(PAGE_FIELDS, 0)
+        return {"visits": self.visits[slot], "deaths": self.deaths[slot],
+                "gold_in": self.gold_in[slot], "gold_out": self.gold_out[slot]}
+
+    def death_rate(self, key):
+        slot = self.slots.get(key)
+        if slot is None or not self.visits[slot]:
+            return 0.0
+        return self.deaths[slot] / self.visits[slot]
+
+    def choice_counts(self, key):
+        """Picks per option of a choice or transaction page, in option order."""
+        return list(self.choices.get(key, ()))
+
+    def enemy(self, name):
+        slot = self.enemy_slots.get(name)
+        if slot is None:
+            return {"wins": 0, "losses": 0}
+        return {"wins": self.wins[slot], "losses": self.losses[slot]}
+
+    def gold(self, page_type):
+        """(gold gained, gold spent) on all pages of one type."""
+        totals = self.type_gold.get(page_type, (0, 0))
+        return totals[0], totals[1]
+
+    def deadliest(self, top=10):
+        """Page keys with the most deaths. Ranks the pages, not the history."""
+        ranked = sorted(((deaths, key) for key, deaths in zip(self.slots, self.deaths) if deaths), key=lambda item: -item[0])
+        return [(key, deaths) for deaths, key in ranked[:top]]
+
+    # --- Persistence ---
+    def to_dict(self):
+        with self._lock:
+            return {
+                "pages": {key: [self.visits[slot], self.deaths[slot], self.gold_in[slot], self.gold_out[slot]]
+                          for key, slot in self.slots.items()},
+                "choices": {key: counts.tolist() for key, counts in self.choices.items()},
+                "enemies": {name: [self.wins[slot], self.losses[slot]] for name, slot in self.enemy_slots.items()},
+                "gold": {page_type: list(totals) for page_type, totals in self.type_gold.items()},
+            }
+
+    def merge(self, data):
+        """Adds the totals of a `to_dict()` (from a file or another process) to these."""
+        for key, (visits, deaths, gold_in, gold_out) in data.get("pages", {}).items():
+            slot = self._page(key)
+            self.visits[slot] += visits
+            self.deaths[slot] += deaths
+            self.gold_in[slot] += gold_in
+            self.gold_out[slot] += gold_out
+        for key, picks in data.get("choices", {}).items():
+            with self._lock:
+                counts = self.choices.setdefault(key, array("q"))
+                counts.extend([0] * (len(picks) - len(counts)))
+            for index, count in enumerate(picks):
+                counts[index] += count
+        for name, (wins, losses) in data.get("enemies", {}).items():
+            slot = self._enemy(name)
+            self.wins[slot] += wins
+            self.losses[slot] += losses
+        for page_type, (gained, spent) in data.get("gold", {}).items():
+            with self._lock:
+                totals = self.type_gold.setdefault(page_type, [0, 0])
+            totals[0] += gained
+            totals[1] += spent
+        return self
+
+class Analytics:
+    def __init__(self, path=None, interval=60.0):
+        self.path = path
+        self.interval = interval
+        self.books = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._saved = {} # to_dict() as of the last load or save; the rest is ours to add
+        self._stopped = threading.Event()
+        self._thread = None
+        if path and os.path.exists(path):
+            self._saved = self._read()
+            self.merge(self._saved)
+
+    def book(self, book_id=DEFAULT_BOOK):
+        stats = self.books.get(book_id)
+        if stats is None:
+            with self._lock:
+                stats = self.books.setdefault(book_id, BookStats())
+        return stats
+
+    def to_dict(self):
+        return {book_id: stats.to_dict() for book_id, stats in list(self.books.items())}
+
+    def merge(self, data):
+        for book_id, totals in data.items():
+            self.book(book_id).merge(totals)
+        return self
+
+    # --- Persistence ---
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self):
+        """Adds what was recorded since the last save to the file, keeping other processes' totals."""
+        from engine.storage import write_atomic
+        with self._save_lock:
+            lock_file = None
+            if fcntl is not None:
+                # A side file, because the atomic rename replaces the data file
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                lock_file = open(f"{self.path}.lock", "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                mine = self.to_dict()
+                totals = Analytics().merge(self._read()).merge(mine).merge(_negated(self._saved))
+                write_atomic(self.path, json.dumps(totals.to_dict(), separators=(",", ":")))
+                self._saved = mine
+            finally:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def start(self):
+        """Rewrites `path` every `interval` seconds from a background thread."""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.save()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.path:
+            self.save() # Leave the final numbers behind
+
+# --- Report ---
+def report(analytics, top=10):
+    lines = []
+    for book_id, stats in sorted(analytics.books.items()):
+        lines.append(f"== {book_id} ==")
+        lines.append("Deadliest pages:")
+        for key, deaths in stats.deadliest(top):
+            page = stats.page(key)
+            lines.append(f"  Page {key:<16} {deaths:>7} deaths / {page['visits']:>8} visits ({stats.death_rate(key):.1%})")
+        lines.append("Enemies (won / lost):")
+        records = sorted(stats.enemy_slots, key=lambda name: -stats.losses[stats.enemy_slots[name]])
+        for name in records[:top]:
+            record = stats.enemy(name)
+            lines.append(f"  {name:<28} {record['wins']:>7} / {record['losses']}")
+        lines.append("Gold by page type (gained / spent):")
+        for page_type in sorted(stats.type_gold):
+            gained, spent = stats.gold(page_type)
+            lines.append(f"  {page_type:<28} {gained:>7} / {spent}")
+    return "\n".join(lines) if lines else "No analytics recorded yet."
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise a gameplay analytics file.")
+    parser.add_argument("path", nargs="?", default=os.path.join(os.path.dirname(__file__), "..", "data", "analytics.json"))
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"{args.path}: no such file")
+        return 1
+    print(report(Analytics(args.path), args.top))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,220 @@
+import threading
+import time
+from engine.storage import SaveManager, StaleWriteError
+
+# Pages where a lost save would let a player re-roll a bad outcome
+RISKY_PAGE_TYPES = frozenset({
+    "combat", "multi_combat", "luck_test", "luck_test_double", "skill_test",
+    "random_test", "random_effect", "random_encounter", "dice_game",
+})
+
+class FlushPolicy:
+    def __init__(self, every_pages=10, every_seconds=5.0, risky_types=RISKY_PAGE_TYPES, retry_seconds=0.5, max_retries=5):
+        self.every_pages = every_pages
+        self.every_seconds = every_seconds
+        self.risky_types = frozenset(risky_types)
+        self.retry_seconds = retry_seconds # First wait after a failed write; doubles on each failure after that
+        self.max_retries = max_retries # Failed writes a flush() waits through before raising
+
+class CachedSaveManager:
+    """
+    Write-back cache in front of a SaveManager.
+
+    Saves snapshot the character and mark it dirty; a background writer
+    thread flushes the dirty snapshots in one batch when the policy says so
+    (page count, elapsed time, a risky page type, or an explicit flush on
+    quit). A delete still pending when its character is saved again goes to
+    the backend first, so the new character doesn't replace the old record.
+
+    A flush the backend rejects as stale evicts that character; the next
+    save of it raises the StaleWriteError to its session.
+
+    A write that fails puts its records back in the dirty set, and the writer
+    retries with exponential backoff. flush() and close() give up and raise
+    the last error after `policy.max_retries` failed writes.
+    """
+    def __init__(self, backend=None, policy=None):
+        self.backend = backend or SaveManager()
+        self.policy = policy or FlushPolicy()
+
+        self._characters = {}
+        self._snapshots = {} # user_id -> to_dict() of its latest unwritten save
+        self._dirty = set()
+        self._deleted = set()
+        self._stale = {} # user_id -> (rejected Character, StaleWriteError)
+        self._pages_since_flush = 0
+        self._risky_pending = False
+        self._last_flush = time.monotonic()
+
+        self._lock = threading.Lock()          # guards the cache state above
+        self._backend_lock = threading.Lock()  # serializes backend I/O
+        self._wake = threading.Condition(self._lock)
+        self._flush_requested = False
+        self._flush_generation = 0
+        self._flushed_generation = 0
+        self._running = True
+        self._failures = 0 # Failed writes in a row; sets the backoff
+        self._retry_at = 0.0
+        self._error = None # Why the last write failed
+
+        self.stats = {"saves": 0, "flushes": 0, "records_written": 0, "stale": 0, "failures": 0}
+
+        self._writer = threading.Thread(target=self._writer_loop, name="save-writer", daemon=True)
+        self._writer.start()
+
+    # --- Public API (mirrors SaveManager) ---
+    def load_character(self, user_id):
+        with self._lock:
+            if user_id in self._characters:
+                return self._characters[user_id]
+            if user_id in self._deleted:
+                return None
+        with self._backend_lock:
+            character = self.backend.load_character(user_id)
+        if character:
+            with self._lock:
+                self._characters.setdefault(user_id, character)
+        return character
+
+    def save_character(self, character):
+        with self._lock:
+            rejected, error = self._stale.get(character.user_id, (None, None))
+            if rejected is character:
+                del self._stale[character.user_id]
+                raise error
+            self._characters[character.user_id] = character
+            # Taken now, on the caller's thread: the game keeps changing the live object
+            self._snapshots[character.user_id] = character.to_dict()
+            self._dirty.add(character.user_id)
+            self._pages_since_flush += 1
+            self.stats["saves"] += 1
+
+            due = self._risky_pending or self._pages_since_flush >= self.policy.every_pages
+            self._risky_pending = False
+            if due:
+                self._request_flush()
+
+    def delete_character(self, user_id):
+        existed = self.load_character(user_id) is not None
+        with self._lock:
+            self._characters.pop(user_id, None)
+            self._snapshots.pop(user_id, None)
+            self._dirty.discard(user_id)
+            if existed:
+                self._deleted.add(user_id)
+                self._request_flush()
+        return existed
+
+    def note_page(self, page_type):
+        if page_type in self.policy.risky_types:
+            with self._lock:
+                self._risky_pending = True
+
+    def flush(self):
+        """
+        Blocks until everything dirty at call time is on disk. Raises the
+        last write error once `policy.max_retries` writes have failed meanwhile.
+        """
+        with self._lock:
+            target = self._request_flush()
+            failed_before = self.stats["failures"]
+            while (self._flushed_generation < target and self._writer.is_alive()
+                   and self.stats["failures"] - failed_before < self.policy.max_retries):
+                self._wake.wait()
+            if self._flushed_generation < target and self._error is not None:
+                raise self._error
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._running = False
+                self._wake.notify_all()
+            self._writer.join()
+            self.backend.close()
+
+    # --- Writer Thread ---
+    def _request_flush(self):
+        # Caller holds self._lock
+        self._flush_requested = True
+        self._flush_generation += 1
+        self._wake.notify_all()
+        return self._flush_generation
+
+    def _writer_loop(self):
+        while True:
+            with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self._retry_at:
+                        if not self._running and self._failures >= self.policy.max_retries:
+                            return # close() has already raised; stop retrying
+                        self._wake.wait(self._retry_at - now)
+                        continue
+                    if self._flush_requested or not self._running:
+                        break
+                    remaining = self.policy.every_seconds - (now - self._last_flush)
+                    if remaining <= 0:
+                        if self._dirty or self._deleted:
+                            break
+                        self._last_flush = now
+                        remaining = self.policy.every_seconds
+                    self._wake.wait(remaining)
+
+                if not self._running and not self._flush_requested and not self._dirty and not self._deleted:
+                    return
+
+                generation = self._flush_generation
+                self._flush_requested = False
+                records = {uid: self._snapshots.pop(uid) for uid in self._dirty}
+                deleted = tuple(self._deleted)
+                self._dirty.clear()
+                self._deleted.clear()
+                self._pages_since_flush = 0
+                self._last_flush = time.monotonic()
+
+            written, stale, removed = {}, {}, ()
+            if records or deleted:
+                try:
+                    with self._backend_lock:
+                        if deleted:
+                            # Deletes first: a character saved since is a new record, not an update of the old one
+                            self.backend.write_batch({}, deleted)
+                            removed, deleted = deleted, ()
+                        if records:
+                            written, stale = self.backend.write_batch(records, ())
+                except Exception as e:
+                    # What didn't reach disk stays pending, to try again after a backoff
+                    with self._lock:
+                        for uid, record in records.items():
+                            if uid in self._characters:
+                                self._snapshots.setdefault(uid, record) # Unless saved again meanwhile
+                                self._dirty.add(uid)
+                        self._deleted.update(deleted)
+                        self._failures += 1
+                        self._error = e
+                        self.stats["failures"] += 1
+                        self._retry_at = time.monotonic() + self.policy.retry_seconds * 2 ** min(self._failures - 1, 6)
+                        self._flush_requested = True
+                        self._wake.notify_all()
+                    continue
+
+            with self._lock:
+                self._failures = 0
+                self._error = None
+                for user_id, version in written.items():
+                    if user_id in self._characters:
+                        self._characters[user_id].version = version
+                    if user_id in self._snapshots:
+                        self._snapshots[user_id]["version"] = version # Taken before this write landed
+                for user_id, error in stale.items():
+                    # Someone else's write won; drop ours so the next load sees theirs
+                    self._stale[user_id] = (self._characters.pop(user_id, None), error)
+                    self._snapshots.pop(user_id, None)
+                    self._dirty.discard(user_id)
+                self.stats["stale"] += len(stale)
+                self.stats["flushes"] += 1
+                self.stats["records_written"] += len(written) + len(removed)
+                self._flushed_generation = max(self._flushed_generation, generation)
+                self._wake.notify_all()
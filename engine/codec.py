@@ -0,0 +1,249 @@
+"""
+Compact binary snapshot format for saved characters, an alternative to
+`characters.json` for large stores (`SaveManager(path, codec="binary")`).
+
+    magic "FFCS", u8 schema version
+    item table:  varint count, then each name as varint length + UTF-8
+    records:     varint count, then each as varint length + body
+    body (v1):   user_id, name, current_location (varint length + UTF-8),
+                 skill, stamina, luck, max_skill, max_stamina, max_luck,
+                 provisions (int16 each), gold (zigzag varint),
+                 inventory (varint count + item table indexes)
+    body (v2):   v1 body, then the storage version (varint)
+    body (v3):   v2 body, then the book ID (varint length + UTF-8)
+
+Every record carries its length, so a single character can be found without
+decoding the others. Older schema versions are decoded by their own reader and
+brought up to date by MIGRATIONS before they reach Character.from_dict.
+
+    python -m engine.codec export data/characters.ffc data/characters.json
+    python -m engine.codec import data/characters.json data/characters.ffc
+"""
+import argparse
+import json
+import struct
+
+from models.character import DEFAULT_BOOK
+
+MAGIC = b"FFCS"
+SCHEMA_VERSION = 3
+STATS_V1 = struct.Struct("<7h")
+STAT_FIELDS_V1 = ("skill", "stamina", "luck", "max_skill", "max_stamina", "max_luck", "provisions")
+
+class CodecError(ValueError):
+    pass
+
+# --- Primitives ---
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data, pos):
+    byte = data[pos]
+    if byte < 0x80: # Almost every length, count and index fits in one byte
+        return byte, pos + 1
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def _write_str(out, text):
+    raw = text.encode("utf-8")
+    _write_varint(out, len(raw))
+    out += raw
+
+def _read_str(data, pos):
+    length, pos = _read_varint(data, pos)
+    end = pos + length
+    if end > len(data):
+        raise IndexError("string runs past the end")
+    return data[pos:end].decode("utf-8"), end
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+# --- Schema v1 ---
+def _write_fields_v1(out, record, items):
+    _write_str(out, str(record["user_id"]))
+    _write_str(out, record["name"])
+    _write_str(out, str(record.get("current_location", "1")))
+    try:
+        out += STATS_V1.pack(*(record[field] for field in STAT_FIELDS_V1[:-1]), record.get("provisions", 10))
+    except struct.error as e:
+        raise CodecError(f"Stat out of range for {record['user_id']!r}: {e}") from None
+    _write_varint(out, _zigzag(record.get("gold", 0)))
+    inventory = record.get("inventory", ())
+    _write_varint(out, len(inventory))
+    for item in inventory:
+        index = items.get(item)
+        if index is None:
+            index = items[item] = len(items)
+        _write_varint(out, index)
+
+def _read_fields_v1(data, pos, items):
+    user_id, pos = _read_str(data, pos)
+    name, pos = _read_str(data, pos)
+    location, pos = _read_str(data, pos)
+    skill, stamina, luck, max_skill, max_stamina, max_luck, provisions = STATS_V1.unpack_from(data, pos)
+    gold, pos = _read_varint(data, pos + STATS_V1.size)
+    count, pos = _read_varint(data, pos)
+    indexes = data[pos:pos + count]
+    if len(indexes) == count and (not count or max(indexes) < 0x80):
+        inventory = [items[index] for index in indexes] # One byte per index
+        pos += count
+    else:
+        inventory = []
+        for _ in range(count):
+            index, pos = _read_varint(data, pos)
+            inventory.append(items[index])
+    return {"name": name, "user_id": user_id, "skill": skill, "stamina": stamina, "luck": luck,
+            "max_skill": max_skill, "max_stamina": max_stamina, "max_luck": max_luck, "inventory": inventory,
+            "gold": _unzigzag(gold), "provisions": provisions, "current_location": location}, pos
+
+def _read_record_v1(data, pos, items):
+    return _read_fields_v1(data, pos, items)[0]
+
+# --- Schema v2 ---
+def _read_fields_v2(data, pos, items):
+    record, pos = _read_fields_v1(data, pos, items)
+    record["version"], pos = _read_varint(data, pos)
+    return record, pos
+
+def _read_record_v2(data, pos, items):
+    return _read_fields_v2(data, pos, items)[0]
+
+# --- Schema v3 ---
+def _write_record_v3(out, record, items):
+    _write_fields_v1(out, record, items)
+    _write_varint(out, record.get("version", 0))
+    _write_str(out, record.get("book", DEFAULT_BOOK))
+
+def _read_record_v3(data, pos, items):
+    record, pos = _read_fields_v2(data, pos, items)
+    record["book"], _ = _read_str(data, pos)
+    return record
+
+# Schema version -> record reader. Only the current version has a writer.
+READERS = {1: _read_record_v1, 2: _read_record_v2, 3: _read_record_v3}
+
+# Schema version -> function upgrading a decoded record dict to version + 1
+MIGRATIONS = {
+    1: lambda record: dict(record, version=0), # v1 predates save versions
+    2: lambda record: dict(record, book=DEFAULT_BOOK), # v2 predates content packs
+}
+
+def migrate(record, version):
+    while version < SCHEMA_VERSION:
+        record = MIGRATIONS[version](record)
+        version += 1
+    return record
+
+# --- Files ---
+def encode(records):
+    """Serialises {user_id: Character.to_dict()} as a current-version snapshot."""
+    items = {}
+    body = bytearray()
+    _write_varint(body, len(records))
+    for record in records.values():
+        chunk = bytearray()
+        _write_record_v3(chunk, record, items)
+        _write_varint(body, len(chunk))
+        body += chunk
+
+    out = bytearray(MAGIC)
+    out.append(SCHEMA_VERSION)
+    _write_varint(out, len(items))
+    for item in items: # Dicts keep insertion order, which is index order
+        _write_str(out, item)
+    return bytes(out + body)
+
+def _open(data):
+    """Checks the header and returns (reader, version, item table, position of first record, record count)."""
+    if data[:4] != MAGIC or len(data) < 5:
+        raise CodecError("Not a character snapshot (bad magic)")
+    version = data[4]
+    reader = READERS.get(version)
+    if reader is None:
+        raise CodecError(f"Unsupported snapshot schema version {version} (this build reads up to {SCHEMA_VERSION})")
+    count, pos = _read_varint(data, 5)
+    items = []
+    for _ in range(count):
+        item, pos = _read_str(data, pos)
+        items.append(item)
+    records, pos = _read_varint(data, pos)
+    return reader, version, items, pos, records
+
+def decode(data):
+    """{user_id: record dict} for every record, migrated to the current schema."""
+    try:
+        reader, version, items, pos, count = _open(data)
+        records = {}
+        for _ in range(count):
+            length, pos = _read_varint(data, pos)
+            record = reader(data, pos, items)
+            records[record["user_id"]] = migrate(record, version)
+            pos += length
+        if pos != len(data):
+            raise IndexError("record runs past the end")
+        return records
+    except (IndexError, UnicodeDecodeError, struct.error) as e:
+        raise CodecError(f"Truncated or corrupt snapshot: {e}") from None
+
+def decode_one(data, user_id):
+    """The record for `user_id` only, skipping the others by length; None if absent."""
+    key = user_id.encode("utf-8")
+    try:
+        reader, version, items, pos, count = _open(data)
+        for _ in range(count):
+            length, pos = _read_varint(data, pos)
+            # Every record starts with its user_id, so compare raw bytes before decoding anything
+            size, start = _read_varint(data, pos)
+            if data[start:start + size] == key:
+                return migrate(reader(data, pos, items), version)
+            pos += length
+        return None
+    except (IndexError, UnicodeDecodeError, struct.error) as e:
+        raise CodecError(f"Truncated or corrupt snapshot: {e}") from None
+
+# --- JSON Import/Export ---
+def export_json(binary_path, json_path):
+    from engine.storage import write_atomic
+    with open(binary_path, "rb") as f:
+        records = decode(f.read())
+    write_atomic(json_path, json.dumps(records, indent=4))
+    return len(records)
+
+def import_json(json_path, binary_path):
+    from engine.storage import write_atomic
+    with open(json_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    write_atomic(binary_path, encode(records))
+    return len(records)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert character saves between JSON and the binary snapshot format.")
+    parser.add_argument("command", choices=("export", "import"), help="export: binary -> JSON, import: JSON -> binary")
+    parser.add_argument("source")
+    parser.add_argument("destination")
+    args = parser.parse_args(argv)
+
+    convert = export_json if args.command == "export" else import_json
+    try:
+        count = convert(args.source, args.destination)
+    except CodecError as e:
+        print(f"{args.source}: {e}")
+        return 1
+    print(f"Wrote {count} characters to {args.destination}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,72 @@
+"""
+Per-session dice. Every roll in the engine comes from a Dice stream instead of
+the global `random` module, so a session is reproducible from its seed and
+parallel sessions never share a generator.
+
+Draws are served from NumPy-filled blocks of raw 62-bit words; one word is
+used per draw of any kind, which makes (seed, drawn) an exact position in the
+stream for bug reports and replays.
+"""
+import os
+
+BLOCK = 1024
+WORD_LIMIT = 1 << 62
+
+class Dice:
+    def __init__(self, seed=None):
+        self.seed = int.from_bytes(os.urandom(8), "little") >> 2 if seed is None else int(seed)
+        self._gen = None
+        self._words = []
+        self._pos = 0
+        self._blocks = 0
+
+    def _refill(self):
+        import numpy as np # Deferred so importing the engine stays cheap
+        if self._gen is None:
+            self._gen = np.random.default_rng(self.seed)
+        self._words = self._gen.integers(0, WORD_LIMIT, size=BLOCK, dtype=np.int64).tolist()
+        self._pos = 0
+        self._blocks += 1
+
+    def _word(self):
+        if self._pos == len(self._words):
+            self._refill()
+        word = self._words[self._pos]
+        self._pos += 1
+        return word
+
+    @property
+    def drawn(self):
+        return max(0, self._blocks - 1) * BLOCK + self._pos
+
+    def d6(self):
+        return self._word() % 6 + 1
+
+    def two_d6(self):
+        return self._word() % 6 + self._word() % 6 + 2
+
+    def roll(self, count):
+        return sum(self._word() % 6 + 1 for _ in range(count))
+
+    def below(self, n):
+        return self._word() % n
+
+    def choice(self, seq):
+        return seq[self._word() % len(seq)]
+
+    def skip(self, count):
+        for _ in range(count):
+            self._word()
+
+    # --- State ---
+    def state(self):
+        return {"seed": self.seed, "drawn": self.drawn}
+
+    @classmethod
+    def from_state(cls, state):
+        dice = cls(state["seed"])
+        dice.skip(state.get("drawn", 0))
+        return dice
+
+    def __repr__(self):
+        return f"<Dice seed={self.seed} drawn={self.drawn}>"
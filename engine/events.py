@@ -0,0 +1,147 @@
+"""
+Per-session event logs: every page entered, input read, die rolled and stat
+change applied during one `GameEngine.play()` call, plus the state needed to
+start it again (character, dice position, runtime flags).
+
+    {"v": 1, "user_id": "...", "dice": {"seed": ..., "drawn": ...},
+     "character": {...}, "events": [["p", "1"], ["i", "2"], ["d", 7], ["e", {"stamina": -2}], ...],
+     "outcome": "death", "final": {...}}
+
+Logging is off unless GameEngine gets a `log_dir`; `engine.replay` re-executes
+saved logs and reports where a run diverges.
+"""
+import json
+import os
+import time
+
+from engine.storage import write_atomic
+
+LOG_VERSION = 1
+STAT_FIELDS = ("skill", "stamina", "luck", "max_skill", "max_stamina", "max_luck", "gold", "provisions")
+
+# --- Recording Proxies ---
+class LoggedIO:
+    """Wraps an IO port and records every answer it reads."""
+    def __init__(self, io, log):
+        self._io = io
+        self._log = log
+
+    async def read(self, prompt="", options=None):
+        answer = await self._io.read(prompt, options)
+        self._log.events.append(("i", answer))
+        return answer
+
+    def __getattr__(self, name):
+        return getattr(self._io, name)
+
+class LoggedDice:
+    """Wraps a Dice stream and records every result it hands out."""
+    def __init__(self, dice, log):
+        self._dice = dice
+        self._log = log
+
+    def _record(self, value):
+        self._log.events.append(("d", value))
+        return value
+
+    def d6(self):
+        return self._record(self._dice.d6())
+
+    def two_d6(self):
+        return self._record(self._dice.two_d6())
+
+    def roll(self, count):
+        return self._record(self._dice.roll(count))
+
+    def below(self, n):
+        return self._record(self._dice.below(n))
+
+    def choice(self, seq):
+        index = self._record(self._dice.below(len(seq)))
+        return seq[index]
+
+    def __getattr__(self, name):
+        return getattr(self._dice, name)
+
+def state(character):
+    """Saved fields minus the storage version, which depends on who else wrote the record."""
+    data = character.to_dict()
+    del data["version"]
+    return data
+
+def snapshot(character):
+    return {name: getattr(character, name) for name in STAT_FIELDS}, list(character.inventory)
+
+def diff(before, character):
+    """Stat deltas and inventory changes since `before`; empty if nothing changed."""
+    stats, inventory = before
+    changes = {}
+    for name in STAT_FIELDS:
+        delta = getattr(character, name) - stats[name]
+        if delta:
+            changes[name] = delta
+    gained = [item for item in character.inventory if item not in inventory]
+    lost = [item for item in inventory if item not in character.inventory]
+    if gained:
+        changes["gained"] = gained
+    if lost:
+        changes["lost"] = lost
+    return changes
+
+# --- Log ---
+class EventLog:
+    def __init__(self, header):
+        self.header = header
+        self.events = []
+        self.outcome = None
+        self.final = None
+        self._game = None
+        self._io = None
+        self._dice = None
+
+    @classmethod
+    def begin(cls, game):
+        """Starts recording `game` by swapping in recording proxies for its IO and dice."""
+        log = cls({
+            "v": LOG_VERSION,
+            "user_id": game.user_id,
+            "started": time.time(),
+            "dice": game.dice.state(),
+            "character": state(game.character),
+            "last_enemy_fought": game.last_enemy_fought,
+        })
+        log._game, log._io, log._dice = game, game.io, game.dice
+        game.io = LoggedIO(game.io, log)
+        game.dice = LoggedDice(game.dice, log)
+        return log
+
+    def page(self, key):
+        self.events.append(("p", key))
+
+    def effects(self, before, character):
+        changes = diff(before, character)
+        if changes:
+            self.events.append(("e", changes))
+
+    def end(self):
+        game = self._game
+        if game is not None:
+            game.io, game.dice = self._io, self._dice
+            self.outcome = game.outcome
+            self.final = state(game.character) if game.character else None
+            self._game = None
+        return self
+
+    def to_dict(self):
+        return dict(self.header, events=[list(event) for event in self.events], outcome=self.outcome, final=self.final)
+
+    def save(self, log_dir):
+        dice = self.header["dice"]
+        name = f"{self.header['user_id']}-{int(self.header['started'] * 1000)}-{dice['seed']:x}-{dice['drawn']}.json"
+        path = os.path.join(log_dir, name)
+        write_atomic(path, json.dumps(self.to_dict(), separators=(",", ":")))
+        return path
+
+def load_log(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
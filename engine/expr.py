@@ -0,0 +1,148 @@
+"""
+Dice expressions for page data, compiled once when the story is loaded.
+
+    "1d6"  "2d6+1"  "{roll}"  "-{roll}*3"  "(1d6+2)*2"
+
+Integers, NdM dice, `{roll}` (the page's own roll), unary minus, + - * and
+parentheses. Anything else is rejected with an ExprError. Compiled
+expressions are plain closures called as `fn(roll, dice)`; nothing is
+formatted or eval'd at play time.
+"""
+import re
+
+TOKEN = re.compile(r"\s*(?:(\{roll\})|(\d+)d(\d+)|(\d+)|([-+*()]))")
+LITERALS = frozenset({"set_to_0"}) # Effect values that are keywords, not expressions
+
+class ExprError(ValueError):
+    pass
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN.match(text, pos)
+        if match is None:
+            raise ExprError(f"unsupported syntax at {text[pos:].strip()!r} in {text!r}")
+        tokens.append(match.groups())
+        pos = match.end()
+    return tokens
+
+def _dice(count, sides):
+    if count < 1 or sides < 1:
+        raise ExprError(f"bad dice {count}d{sides}")
+    # Six-sided rolls use the same draws as the handlers always did, so replays line up
+    if sides == 6:
+        if count == 1:
+            return lambda roll, dice: dice.d6()
+        return lambda roll, dice: dice.roll(count)
+    return lambda roll, dice: sum(dice.below(sides) + 1 for _ in range(count))
+
+class _Parser:
+    # Each node is (fn, constant); constant is the folded value or None
+    def __init__(self, text, allow_roll):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.allow_roll = allow_roll
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise ExprError(f"unexpected end of {self.text!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ExprError("empty expression")
+        node = self.sum()
+        if self.peek() is not None:
+            raise ExprError(f"unexpected {self.peek()[4] or 'term'!r} in {self.text!r}")
+        return node
+
+    def sum(self):
+        node = self.product()
+        while self.peek() is not None and self.peek()[4] in ("+", "-"):
+            op = self.take()[4]
+            node = _binary(op, node, self.product())
+        return node
+
+    def product(self):
+        node = self.unary()
+        while self.peek() is not None and self.peek()[4] == "*":
+            self.take()
+            node = _binary("*", node, self.unary())
+        return node
+
+    def unary(self):
+        if self.peek() is not None and self.peek()[4] == "-":
+            self.take()
+            fn, constant = self.unary()
+            if constant is not None:
+                return _const(-constant)
+            return (lambda roll, dice: -fn(roll, dice)), None
+        return self.atom()
+
+    def atom(self):
+        roll, count, sides, number, op = self.take()
+        if roll:
+            if not self.allow_roll:
+                raise ExprError(f"{{roll}} is not available in {self.text!r}")
+            return (lambda roll, dice: roll), None
+        if count:
+            return _dice(int(count), int(sides)), None
+        if number:
+            return _const(int(number))
+        if op == "(":
+            node = self.sum()
+            if self.take()[4] != ")":
+                raise ExprError(f"missing ')' in {self.text!r}")
+            return node
+        raise ExprError(f"unexpected {op!r} in {self.text!r}")
+
+def _const(value):
+    return (lambda roll, dice: value), value
+
+def _binary(op, left, right):
+    (lf, lc), (rf, rc) = left, right
+    if lc is not None and rc is not None:
+        return _const(lc + rc if op == "+" else lc - rc if op == "-" else lc * rc)
+    if op == "+":
+        return (lambda roll, dice: lf(roll, dice) + rf(roll, dice)), None
+    if op == "-":
+        return (lambda roll, dice: lf(roll, dice) - rf(roll, dice)), None
+    return (lambda roll, dice: lf(roll, dice) * rf(roll, dice)), None
+
+def compile_expr(text, allow_roll=True):
+    """`fn(roll, dice) -> int` for a dice expression; plain ints compile to constants."""
+    if isinstance(text, bool) or not isinstance(text, (int, str)):
+        raise ExprError(f"expected a number or dice expression, got {text!r}")
+    if isinstance(text, int):
+        return _const(text)[0]
+    return _Parser(text, allow_roll).parse()[0]
+
+class EffectTemplate:
+    """An `effect_template`: literal values copied as-is, expressions evaluated per visit."""
+    __slots__ = ("constants", "exprs")
+
+    def __init__(self, template):
+        self.constants = {}
+        self.exprs = []
+        for key, value in template.items():
+            if isinstance(value, str) and value not in LITERALS:
+                try:
+                    self.exprs.append((key, compile_expr(value)))
+                except ExprError as e:
+                    raise ExprError(f"{key}: {e}") from None
+            else:
+                self.constants[key] = value
+
+    def evaluate(self, roll, dice):
+        effects = dict(self.constants)
+        for key, fn in self.exprs:
+            effects[key] = fn(roll, dice)
+        return effects
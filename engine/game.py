@@ -1,23 +1,60 @@
-import sys
-from colorama import Fore, Style
-from models.character import Character
-from engine.storage import SaveManager
-from engine.utils import clear_screen, print_header, print_error, print_success, print_warning, print_wrapped, print_bold
+import asyncio
+import os
+from time import perf_counter
+from models.character import Character, DEFAULT_BOOK
+from engine.storage import JournaledSaveManager, StaleWriteError
+from engine.cache import CachedSaveManager
+from engine.io import TerminalIO, YES_NO
+from engine.graph import PAGE_TYPES, compile_story
+from engine.packs import PackError
+from engine.dice import Dice
+from engine.events import EventLog, snapshot
+from engine import metrics
 
 # Import handlers
 from engine.handlers import CombatHandler, StoryHandler, CommerceHandler, CheckHandler
 
+async def off_loop(work):
+    """Runs blocking `work` in an executor when on an event loop, so other sessions keep going."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return work() # Driven by run_sync: only this player waits
+    return await loop.run_in_executor(None, work)
+
 class GameEngine:
-    def __init__(self, story_data, enemy_data):
+    def __init__(self, story_data=None, enemy_data=None, save_manager=None, io=None, user_id="local_player", graph_loader=None, clock=None, dice=None, log_dir=None, story=None, books=None, analytics=None):
         self.story_data = story_data
         self.enemy_data = enemy_data
-        self.user_id = "local_player"
+        # With a graph_loader, pages are only read and compiled on first play()
+        self.graph_loader = graph_loader
+        self.story = story # A StoryWatcher; its graph is looked up afresh at every page
+        self.books = books # A PackLibrary; the graph then follows the character's book
+        self.book = DEFAULT_BOOK # Book for newly created characters
+        self._pack = None
+        self._graph = None if graph_loader or story or books else compile_story(story_data, enemy_data)
+        self.page_id = None # Integer ID of the current page in self.graph
+        self.user_id = str(user_id)
+        self.io = io or TerminalIO()
+        self.clock = clock or self.io.clock # Ports bring a sensible default pacing
+        self.dice = dice or Dice() # Per-session stream; dice.seed reproduces the run
+        self.log_dir = log_dir # Where each play() leaves its event log, if anywhere
+        self.record_events = log_dir is not None
+        self.event_log = None
+        self.analytics = analytics # Running gameplay totals, if anyone collects them
+        self._stats = None # The analytics of the book being played
+        self.paused = 0.0 # Seconds spent in pacing pauses, tracked while metrics are on
         self.character = None
         self.running = False
         self.last_enemy_fought = "" # Runtime state for conditions
+        self.outcome = None # "death" / "victory" once the adventure ends
+        self.last_page = None
+        self.turns = 0
+        self.show_odds = False
+        self.superseded = False # Set when another session's save of this adventure won
         
-        # 1. Init Storage
-        self.save_manager = SaveManager()
+        # 1. Init Storage: page turns stay in memory and reach the journal in batches (see FlushPolicy)
+        self.save_manager = save_manager or CachedSaveManager(JournaledSaveManager())
 
         # 2. Init Handlers
         self.handlers = {
@@ -27,124 +64,237 @@ class GameEngine:
             'check': CheckHandler(self)
         }
 
+        # 3. Bind page kinds to handler methods once
+        self.dispatch_table = [getattr(self.handlers[key], method) for key, method in PAGE_TYPES.values()]
+
+    @property
+    def graph(self):
+        if self.books is not None:
+            book = self.character.book if self.character else self.book
+            if self.story is not None and book == DEFAULT_BOOK:
+                return self.story.graph # The watcher follows the built-in book
+            if self._pack is None or self._pack.id != book:
+                self._pack = self.books.get(book) # Held for the session, so eviction can't pull it mid-page
+            return self._pack.graph
+        if self.story is not None:
+            return self.story.graph
+        if self._graph is None:
+            self._graph = self.graph_loader()
+        return self._graph
+
     # --- Persistence Wrappers ---
     def save_character(self):
-        if self.character: self.save_manager.save_character(self.character)
+        if not self.character: return
+        try:
+            if metrics.enabled:
+                start = perf_counter()
+                self.save_manager.save_character(self.character)
+                metrics.observe("ff_storage_seconds", perf_counter() - start, "save")
+            else:
+                self.save_manager.save_character(self.character)
+        except StaleWriteError:
+            # Another session saved this adventure since we loaded it; theirs wins
+            self.io.error("\nThis adventure was continued somewhere else. Stopping here so that progress is kept.")
+            self.running = False
+            self.superseded = True
 
     def load_character(self):
+        if metrics.enabled:
+            start = perf_counter()
+            character = self.save_manager.load_character(self.user_id)
+            metrics.observe("ff_storage_seconds", perf_counter() - start, "load")
+            return character
         return self.save_manager.load_character(self.user_id)
 
     def delete_character(self):
+        if metrics.enabled:
+            start = perf_counter()
+            deleted = self.save_manager.delete_character(self.user_id)
+            metrics.observe("ff_storage_seconds", perf_counter() - start, "delete")
+            return deleted
         return self.save_manager.delete_character(self.user_id)
 
     # --- Global Input ---
-    def get_input_cmd(self):
-        print(f"\n{Fore.LIGHTBLACK_EX}[Commands: # to choose, 's' for stats, 'e' to eat, 'q' to quit]{Style.RESET_ALL}")
-        return input("> ").strip().lower()
+    async def get_input_cmd(self, options=None):
+        metrics_cmd = "'m' for metrics, " if metrics.enabled else "" # Only worth offering while they're recorded
+        self.io.write("\n" + self.io.paint(f"[Commands: # to choose, 's' for stats, 'e' to eat, 'o' for combat odds, 'h' for a hint, {metrics_cmd}'q' to quit]", "dim"))
+        return (await self.io.read("> ", options)).strip().lower()
 
-    def handle_global_commands(self, cmd):
+    async def handle_global_commands(self, cmd):
         if cmd == 'q': 
             self.running = False
             return True
         if cmd == 's': 
-            print(self.character)
+            self.io.write(self.character)
             return True
         if cmd == 'e': 
-            print_bold(self.character.eat_provision())
+            self.io.bold(self.character.eat_provision())
+            return True
+        if cmd == 'o':
+            self.show_odds = not self.show_odds
+            self.io.info(f"Combat odds {'on' if self.show_odds else 'off'}.")
+            return True
+        if cmd == 'm':
+            self.io.write(metrics.summary() if metrics.enabled else "Metrics are off.")
+            return True
+        if cmd == 'h':
+            self.io.info(await self.best_play_hint())
             return True
         return False
 
-    def display_page_text(self, page_data):
-        print_header(f"Page {self.character.current_location}")
-        if "text" in page_data and page_data["text"]:
-            print_wrapped(page_data['text'])
-            print("-" * 60)
+    # --- Analytics ---
+    def note_choice(self, page, index):
+        if self._stats is not None:
+            self._stats.choice(page, index)
 
-    # --- The Dispatcher ---
-    def dispatch(self, page_data):
-        ptype = page_data.get("type", "choice")
-        
-        mapping = {
-            # Story
-            "choice":           self.handlers['story'].handle_choice,
-            "auto":             self.handlers['story'].handle_auto,
-            "game_over":        self.handlers['story'].handle_game_over,
-            "victory":          self.handlers['story'].handle_victory,
-            
-            # Combat
-            "combat":           self.handlers['combat'].handle_combat,
-            "multi_combat":     self.handlers['combat'].handle_multi_combat,
-            
-            # Commerce
-            "transaction":      self.handlers['commerce'].handle_transaction,
-            "shop":             self.handlers['commerce'].handle_shop,
-            "shop_multi":       self.handlers['commerce'].handle_shop_multi,
-            "pawn_shop":        self.handlers['commerce'].handle_pawn_shop,
-            "dice_game":        self.handlers['commerce'].handle_dice_game,
-            
-            # Checks/Conditions
-            "luck_test":        self.handlers['check'].handle_luck_test,
-            "luck_test_double": self.handlers['check'].handle_luck_test_double,
-            "skill_test":       self.handlers['check'].handle_skill_test,
-            "random_test":      self.handlers['check'].handle_random_test,
-            "effect":           self.handlers['check'].handle_effect,
-            "random_effect":    self.handlers['check'].handle_random_effect,
-            "condition_item":   self.handlers['check'].handle_condition_item,
-            "condition_multi":  self.handlers['check'].handle_condition_multi,
-            "condition_item_any": self.handlers['check'].handle_condition_item_any,
-            "condition_gold":   self.handlers['check'].handle_condition_gold,
-            "condition_combat": self.handlers['check'].handle_condition_combat,
-            "random_encounter": self.handlers['check'].handle_random_encounter,
-            "special_heal":     self.handlers['check'].handle_special_heal,
-        }
+    def note_fight(self, name, won):
+        if self._stats is not None:
+            self._stats.fight(name, won)
+
+    def fight_odds_summary(self, enemy, rules, enemy_id=None):
+        from engine.odds import TABLE_NAME, TABLE_PATH, CombatRules, fight_odds, load_table, summarize # NumPy is only needed once odds are on
+        c = self.character
+        # Plain fights are looked up in the book's precomputed table, when it has one that covers them
+        if enemy_id is not None and CombatRules(rules).key() == CombatRules().key():
+            table = load_table(os.path.join(self._pack.directory, TABLE_NAME) if self._pack else TABLE_PATH)
+            found = table.lookup(enemy_id, c.skill, c.stamina, enemy) if table else None
+            if found:
+                return summarize(*found)
+        return fight_odds(c.skill, c.stamina, c.luck, [enemy], rules).summary()
 
-        if ptype in mapping:
-            mapping[ptype](page_data)
+    async def best_play_hint(self):
+        from engine.solver import StateLimitError, solver_for # Only solved on request
+        c = self.character
+        solver = solver_for(self.graph, c.max_skill, c.max_stamina, c.max_luck)
+        solve = lambda: solver.hint(self.graph[self.page_id], c, self.last_enemy_fought)
+        try:
+            return await off_loop(solve) # A solve can take seconds
+        except StateLimitError:
+            return "Too many possibilities from here to work out the best play. Ask again further on."
+
+    def display_page_text(self, page):
+        self.io.header(f"Page {self.character.current_location}")
+        if page.text:
+            self.io.wrapped(page.text)
+            self.io.write("-" * 60)
+
+    # --- Pacing ---
+    async def pause(self, seconds, fight=False):
+        if fight and self.clock.collapse_fights:
+            return
+        self.io.flush()
+        if metrics.enabled:
+            start = perf_counter()
+            await self.clock.pause(seconds)
+            self.paused += perf_counter() - start
         else:
-            print_error(f"Unknown Page Type: {ptype}")
-            self.running = False
-            input("Press Enter...")
+            await self.clock.pause(seconds)
+
+    # --- Navigation ---
+    def goto(self, page_id):
+        self.page_id = page_id
+        self.character.current_location = self.graph.keys[page_id]
+
+    # --- The Dispatcher ---
+    async def dispatch(self, page):
+        await self.dispatch_table[page.kind](page)
 
     # --- Main Loop ---
-    def play(self):
+    async def play(self):
         self.character = self.load_character()
         if not self.character:
-            print_error("No character found. Create one first!")
-            input("Press Enter...")
+            self.io.error("No character found. Create one first!")
+            await self.io.read("Press Enter...")
+            return
+        try:
+            graph = self.graph
+        except PackError as e:
+            self.io.error(f"{e}. Install it under data/books/ to continue this adventure.")
+            await self.io.read("Press Enter...")
             return
 
         self.running = True
-        while self.running:
-            clear_screen()
-            page_id = self.character.current_location
-            page_data = self.story_data.get(page_id)
+        self.superseded = False
+        self.outcome = None
+        self.turns = 0
+        self.page_id = graph.index.get(self.character.current_location)
+        if self.page_id is None:
+            self.io.error(f"FATAL: Page {self.character.current_location} missing.")
+            self.running = False
 
-            if not page_data:
-                print_error(f"FATAL: Page {page_id} missing.")
-                self.running = False
-                break
+        log = self.event_log = EventLog.begin(self) if self.record_events else None
+        self._stats = self.analytics.book(self.character.book) if self.analytics is not None else None
+        try:
+            await self._loop(log)
+        finally:
+            self._stats = None
+            if log:
+                log.end()
+                if self.log_dir:
+                    log.save(self.log_dir)
+            # Write-back storage must not hold progress past the session, however it ended
+            await off_loop(self.save_manager.flush)
+        self._pack = None # Let the library evict the book once no session is in it
 
-            self.dispatch(page_data)
+    async def _loop(self, log):
+        stats = self._stats
+        previous = None
+        while self.running:
+            self.io.clear()
+            # Fetched per page so a hot reload applies from the next page on
+            pages = self.graph.pages
+            page = pages[self.page_id]
+
+            self.last_page = page.key
+            self.turns += 1
+            if log:
+                log.page(page.key)
+                before = snapshot(self.character)
+            if stats is not None:
+                gold = self.character.gold
+            timed = metrics.enabled
+            if timed:
+                start, idle = perf_counter(), self.io.input_wait + self.paused
+            await self.dispatch_table[page.kind](page)
+            if timed:
+                # Waiting on the player or on a dramatic pause is not engine time
+                busy = perf_counter() - start - (self.io.input_wait + self.paused - idle)
+                metrics.observe("ff_turn_seconds", busy, page.type)
+            if log:
+                log.effects(before, self.character)
 
             if self.character.is_dead():
-                print_error("\nYour STAMINA has reached 0.")
-                self.handlers['story'].handle_game_over({"text": "You have died."})
-            
+                self.io.error("\nYour STAMINA has reached 0.")
+                await self.handlers['story'].handle_game_over(pages[self.graph.game_over])
+
+            if stats is not None:
+                stats.turn(page, self.character.gold - gold)
+                if self.outcome == "death":
+                    # A game_over page is where the body lands; the page that sent us there killed us
+                    stats.death(previous if page.type == "game_over" and previous else page.key)
+            previous = page.key
+
             if self.running:
+                self.save_manager.note_page(page.type)
                 self.save_character()
+                if self.superseded:
+                    await self.io.read("Press Enter to return to menu...") # Or the menu clears the message at once
 
-    def create_character_flow(self):
-        clear_screen()
-        print_header("NEW ADVENTURE")
-        if self.load_character():
-            print_warning("Character exists. Overwrite? (y/n)")
-            if input("> ").lower() != 'y': return False
+    async def create_character_flow(self):
+        self.io.clear()
+        self.io.header("NEW ADVENTURE")
+        existing = self.load_character()
+        if existing:
+            self.io.warning("Character exists. Overwrite? (y/n)")
+            if (await self.io.read("> ", YES_NO)).lower() != 'y': return False
 
-        name = input("\nName: ").strip() or "Adventurer"
-        self.character = Character(name=name, user_id=self.user_id)
+        name = (await self.io.read("\nName: ")).strip() or "Adventurer"
+        self.character = Character(name=name, user_id=self.user_id, dice=self.dice, book=self.book)
+        if existing:
+            self.character.version = existing.version # A deliberate overwrite, not a stale write
         
         if name.lower() == "ian livingstone":
-            print_success("GOD MODE")
+            self.io.success("GOD MODE")
             self.character.skill = 12
             self.character.stamina = 24
             self.character.luck = 12
@@ -153,7 +303,16 @@ class GameEngine:
             self.character.max_luck = 12
             self.character.gold = 50
 
+        self.superseded = False
         self.save_character()
-        print(self.character)
-        input("\nPress Enter...")
-        return True
\ No newline at end of file
+        self.io.write(self.character)
+        await self.io.read("\nPress Enter...")
+        return not self.superseded
+
+    async def show_stats(self):
+        character = self.load_character()
+        if character:
+            self.io.write(character)
+        else:
+            self.io.error("No character found. Create one first!")
+        await self.io.read("\nPress Enter...")
\ No newline at end of file
@@ -0,0 +1,279 @@
+"""
+Load-time compilation of pages.json / enemies.json into an immutable page graph.
+
+Page IDs are interned to integers, every `next` / `outcomes` / `choices`
+target and enemy reference is resolved up front, and each page is bound to
+its handler slot once. Broken content fails here with a StoryError instead of
+"FATAL: Page missing" halfway through someone's adventure.
+
+Recompiling with `previous` (hot reload) keeps page IDs stable and reuses
+every page whose content is unchanged.
+"""
+import json
+from engine.expr import EffectTemplate, ExprError, compile_expr
+
+GAME_OVER = "GAME_OVER"
+START_PAGE = "1"
+
+# Page type -> (handler key, method name). The order defines Page.kind.
+PAGE_TYPES = {
+    # Story
+    "choice":             ("story", "handle_choice"),
+    "auto":               ("story", "handle_auto"),
+    "game_over":          ("story", "handle_game_over"),
+    "victory":            ("story", "handle_victory"),
+
+    # Combat
+    "combat":             ("combat", "handle_combat"),
+    "multi_combat":       ("combat", "handle_multi_combat"),
+
+    # Commerce
+    "transaction":        ("commerce", "handle_transaction"),
+    "shop":               ("commerce", "handle_shop"),
+    "shop_multi":         ("commerce", "handle_shop_multi"),
+    "pawn_shop":          ("commerce", "handle_pawn_shop"),
+    "dice_game":          ("commerce", "handle_dice_game"),
+
+    # Checks/Conditions
+    "luck_test":          ("check", "handle_luck_test"),
+    "luck_test_double":   ("check", "handle_luck_test_double"),
+    "skill_test":         ("check", "handle_skill_test"),
+    "random_test":        ("check", "handle_random_test"),
+    "effect":             ("check", "handle_effect"),
+    "random_effect":      ("check", "handle_random_effect"),
+    "condition_item":     ("check", "handle_condition_item"),
+    "condition_multi":    ("check", "handle_condition_multi"),
+    "condition_item_any": ("check", "handle_condition_item_any"),
+    "condition_gold":     ("check", "handle_condition_gold"),
+    "condition_combat":   ("check", "handle_condition_combat"),
+    "random_encounter":   ("check", "handle_random_encounter"),
+    "special_heal":       ("check", "handle_special_heal"),
+}
+PAGE_KINDS = {name: kind for kind, name in enumerate(PAGE_TYPES)}
+
+# Outcome keys each page type must provide
+REQUIRED_OUTCOMES = {
+    "combat":           ("win", "lose"),
+    "multi_combat":     ("win", "lose"),
+    "random_encounter": ("win", "lose"),
+    "luck_test":        ("lucky", "unlucky"),
+    "luck_test_double": ("lucky_lucky", "lucky_unlucky", "unlucky_lucky", "unlucky_unlucky"),
+    "skill_test":       ("success", "failure"),
+    "condition_item":   ("success", "failure"),
+    "condition_multi":  ("success", "failure"),
+    "condition_item_any": ("success", "failure"),
+    "condition_gold":   ("success", "failure"),
+    "condition_combat": ("success", "failure"),
+}
+ROLLING_TYPES = frozenset({"random_effect", "random_test"}) # Roll `dice_roll` (default 1d6) on entry
+REQUIRES_NEXT = frozenset({"auto", "effect", "random_effect", "special_heal", "pawn_shop", "dice_game", "shop_multi"})
+
+class StoryError(ValueError):
+    pass
+
+class Page:
+    """
+    A compiled page. Targets are integer page IDs into `StoryGraph.pages`;
+    `data` is the raw JSON entry for type-specific fields (items, checks...).
+    `roll` and `effects` are the compiled `dice_roll` and `effect_template`.
+    """
+    __slots__ = ("id", "key", "type", "kind", "text", "next", "outcomes", "choices", "enemies", "encounters", "data", "roll", "effects")
+
+    def __init__(self, id, key, type, text=None, next=None, outcomes=None, choices=(), enemies=(), encounters=None, data=None, roll=None, effects=None):
+        self.id = id
+        self.key = key
+        self.type = type
+        self.kind = PAGE_KINDS[type]
+        self.text = text
+        self.next = next
+        self.outcomes = outcomes or {}
+        self.choices = choices      # ((label, target, option), ...)
+        self.enemies = enemies      # ((enemy_id, stats), ...)
+        self.encounters = encounters or {}
+        self.data = data or {}
+        self.roll = roll            # fn(roll, dice) -> int
+        self.effects = effects      # EffectTemplate
+
+    def targets(self):
+        """Every page ID this page can lead to."""
+        found = [] if self.next is None else [self.next]
+        found.extend(self.outcomes.values())
+        found.extend(target for _, target, _ in self.choices)
+        for encounter in self.encounters.values():
+            found.extend(encounter.targets())
+        return found
+
+    def __repr__(self):
+        return f"<Page {self.key} ({self.type})>"
+
+class StoryGraph:
+    def __init__(self, pages, keys, index, enemy_data, rebuilt=None):
+        self.pages = pages
+        self.keys = keys
+        self.index = index # Live keys only; a removed key keeps its slot in pages/keys
+        self.enemy_data = enemy_data
+        self.start = index.get(START_PAGE)
+        self.game_over = index[GAME_OVER]
+        self.rebuilt = rebuilt # Keys compiled afresh by a reload; None for a full compile
+        self.solvers = {} # Hint solvers by initial stats, freed with the graph (see solver.solver_for)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, page_id):
+        return self.pages[page_id]
+
+    def get(self, key):
+        page_id = self.index.get(key)
+        return None if page_id is None else self.pages[page_id]
+
+class _Compiler:
+    def __init__(self, story_data, enemy_data, previous=None):
+        self.story_data = story_data
+        self.enemy_data = enemy_data
+        self.index = {}
+        for key in previous.keys if previous is not None else ():
+            self.index[key] = len(self.index)
+        for key in story_data:
+            self.index.setdefault(key, len(self.index))
+        self.index.setdefault(GAME_OVER, len(self.index))
+        self.keys = list(self.index)
+
+    def target(self, page_key, target, where):
+        if not isinstance(target, str) or (target not in self.story_data and target != GAME_OVER):
+            raise StoryError(f"Page {page_key}: {where} points to missing page {target!r}")
+        return self.index[target]
+
+    def enemy(self, page_key, enemy_id):
+        if enemy_id not in self.enemy_data:
+            raise StoryError(f"Page {page_key}: unknown enemy {enemy_id!r}")
+        return (enemy_id, self.enemy_data[enemy_id])
+
+    def compile_page(self, key, data):
+        if not isinstance(data, dict):
+            raise StoryError(f"Page {key}: expected an object")
+        ptype = data.get("type", "choice")
+        if ptype not in PAGE_TYPES:
+            raise StoryError(f"Page {key}: unknown page type {ptype!r}")
+
+        next_id = None
+        if "next" in data:
+            next_id = self.target(key, data["next"], "next")
+        elif ptype in REQUIRES_NEXT:
+            raise StoryError(f"Page {key}: {ptype} page needs a 'next'")
+
+        raw_outcomes = data.get("outcomes", {})
+        required = REQUIRED_OUTCOMES.get(ptype, ())
+        if ptype == "combat" and "max_rounds" in data.get("rules", {}):
+            required = ("win_fast", "win_slow", "lose")
+        for name in required:
+            if name not in raw_outcomes:
+                raise StoryError(f"Page {key}: missing outcome {name!r}")
+        outcomes = {name: self.target(key, t, f"outcome {name!r}") for name, t in raw_outcomes.items()}
+
+        escape = data.get("rules", {}).get("escape_after_rounds")
+        if escape:
+            outcomes["escape"] = self.target(key, escape["page"], "escape_after_rounds")
+
+        choices = ()
+        if ptype in ("choice", "transaction"):
+            if not data.get("choices"):
+                raise StoryError(f"Page {key}: {ptype} page has no choices")
+            compiled = []
+            for label, option in data["choices"].items():
+                if isinstance(option, dict):
+                    compiled.append((label, self.target(key, option.get("next"), f"choice {label!r}"), option))
+                else:
+                    compiled.append((label, self.target(key, option, f"choice {label!r}"), {}))
+            choices = tuple(compiled)
+
+        enemies = tuple(self.enemy(key, eid) for eid in data.get("enemies", ()))
+        if ptype in ("combat", "multi_combat") and not enemies:
+            raise StoryError(f"Page {key}: {ptype} page has no enemies")
+        if ptype == "condition_combat":
+            target = data.get("check", {}).get("last_enemy_fought", "")
+            if target in self.enemy_data:
+                enemies = (self.enemy(key, target),)
+
+        encounters = {}
+        if ptype == "random_encounter":
+            for roll in map(str, range(1, 7)):
+                if roll not in data.get("encounters", {}):
+                    raise StoryError(f"Page {key}: no encounter for a roll of {roll}")
+                eid, stats = self.enemy(key, data["encounters"][roll])
+                encounters[roll] = Page(
+                    self.index[key], key, "combat",
+                    text=f"A creature appears! It is a {stats['name']}!",
+                    outcomes=outcomes, enemies=((eid, stats),),
+                )
+
+        roll = effects = None
+        try:
+            if "dice_roll" in data or ptype in ROLLING_TYPES:
+                roll = compile_expr(data.get("dice_roll", "1d6"), allow_roll=False)
+            if "effect_template" in data:
+                effects = EffectTemplate(data["effect_template"])
+        except ExprError as e:
+            raise StoryError(f"Page {key}: {e}") from None
+        if ptype == "random_effect" and effects is None:
+            raise StoryError(f"Page {key}: random_effect page needs an 'effect_template'")
+
+        return Page(
+            self.index[key], key, ptype,
+            text=data.get("text"), next=next_id, outcomes=outcomes, choices=choices,
+            enemies=enemies, encounters=encounters, data=data, roll=roll, effects=effects,
+        )
+
+    def game_over_page(self):
+        data = self.story_data.get(GAME_OVER)
+        if data is not None:
+            return self.compile_page(GAME_OVER, data)
+        return Page(self.index[GAME_OVER], GAME_OVER, "game_over", text="You have died.")
+
+def page_digest(data, enemy_data):
+    """Content hash of a page entry plus the enemies it names."""
+    import hashlib
+    refs = []
+    if isinstance(data, dict):
+        refs.extend(data.get("enemies", ()))
+        refs.extend(data.get("encounters", {}).values())
+        refs.append(data.get("check", {}).get("last_enemy_fought"))
+    blob = json.dumps([data, [enemy_data.get(ref) for ref in refs if isinstance(ref, str)]], sort_keys=True, default=str)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=16).digest()
+
+def compile_story(story_data, enemy_data, previous=None):
+    """
+    Compiles the whole book, or with `previous` (the graph being replaced)
+    only the pages whose digest changed or that pointed at a removed page.
+    Known keys keep their IDs and new keys are appended. A removed key keeps
+    its slot, holding its old page, so a session standing on it can finish,
+    but it leaves the index and nothing may point at it any more.
+    """
+    compiler = _Compiler(story_data, enemy_data, previous)
+    if START_PAGE not in story_data:
+        raise StoryError(f"Story has no start page {START_PAGE!r}")
+
+    pages = [None] * len(compiler.index)
+    live = {key: page_id for key, page_id in compiler.index.items() if key in story_data or key == GAME_OVER}
+    rebuilt = None
+    if previous is not None:
+        rebuilt = []
+        removed = {page_id for page_id in range(len(previous.keys)) if previous.keys[page_id] not in live}
+        for page_id in removed:
+            pages[page_id] = previous.pages[page_id] # Tombstone for in-flight sessions
+
+    for key, data in story_data.items():
+        page_id = compiler.index[key]
+        if previous is not None:
+            old = previous.get(key)
+            if (old is not None and page_digest(old.data, previous.enemy_data) == page_digest(data, enemy_data)
+                    and not removed.intersection(old.targets())):
+                pages[page_id] = old
+                continue
+            rebuilt.append(key)
+        pages[page_id] = compiler.compile_page(key, data)
+    if story_data.get(GAME_OVER) is None:
+        old = previous.get(GAME_OVER) if previous is not None else None
+        pages[compiler.index[GAME_OVER]] = old if old is not None and not old.data else compiler.game_over_page()
+
+    return StoryGraph(pages, compiler.keys, live, enemy_data, rebuilt)
@@ -1,6 +1,10 @@
 class BaseHandler:
     def __init__(self, game_engine):
         self.game = game_engine
+
+    @property
+    def io(self):
+        return self.game.io
         
-    def display(self, page_data):
-        self.game.display_page_text(page_data)
\ No newline at end of file
+    def display(self, page):
+        self.game.display_page_text(page)
\ No newline at end of file
@@ -1,117 +1,114 @@
-import time
-import random
 from .base import BaseHandler
-from engine.utils import print_bold, print_error, print_success, print_info, print_warning
+from engine.io import numbered
+from engine.graph import GAME_OVER, Page
+
+def random_test_target(outcomes, roll):
+    """Page a random_test roll leads to: an exact match, then "2-6", then the first outcome."""
+    key = str(roll)
+    if key in outcomes:
+        return outcomes[key]
+    if "2-6" in outcomes and roll >= 2:
+        return outcomes["2-6"]
+    return next(iter(outcomes.values()))
 
 class CheckHandler(BaseHandler):
 
-    def handle_effect(self, page_data):
-        self.display(page_data)
-        if "effects" in page_data:
-            summary = self.game.character.apply_effects(page_data["effects"])
-            print_success(f"Update: {summary}")
+    async def handle_effect(self, page):
+        self.display(page)
+        if "effects" in page.data:
+            summary = self.game.character.apply_effects(page.data["effects"], self.game.dice)
+            self.io.success(f"Update: {summary}")
         
-        input("\nPress Enter...")
-        self.game.character.current_location = page_data["next"]
-
-    def handle_random_effect(self, page_data):
-        self.display(page_data)
-        input("Press Enter to roll die...")
-        roll = random.randint(1, 6)
-        print_info(f"You rolled a {roll}!")
+        await self.io.read("\nPress Enter...")
+        self.game.goto(page.next)
+
+    async def handle_random_effect(self, page):
+        self.display(page)
+        await self.io.read("Press Enter to roll die...")
+        roll = page.roll(None, self.game.dice)
+        self.io.info(f"You rolled a {roll}!")
         
-        effects = page_data["effect_template"].copy()
-        for key, val in effects.items():
-            if isinstance(val, str) and "{roll}" in val:
-                expr = val.format(roll=roll)
-                effects[key] = eval(expr) 
+        effects = page.effects.evaluate(roll, self.game.dice)
+        summary = self.game.character.apply_effects(effects, self.game.dice)
+        self.io.success(f"Result: {summary}")
+        await self.io.read("Press Enter...")
+        self.game.goto(page.next)
+
+    async def handle_luck_test(self, page):
+        self.display(page)
+        self.io.info(f"Your Luck: {self.game.character.luck}")
+        await self.io.read("Press Enter to Test Your Luck...")
         
-        summary = self.game.character.apply_effects(effects)
-        print_success(f"Result: {summary}")
-        input("Press Enter...")
-        self.game.character.current_location = page_data["next"]
-
-    def handle_luck_test(self, page_data):
-        self.display(page_data)
-        print_info(f"Your Luck: {self.game.character.luck}")
-        input("Press Enter to Test Your Luck...")
-        
-        if self.game.character.test_luck():
-            print_success("LUCKY! ✨")
-            self.game.character.current_location = page_data["outcomes"]["lucky"]
+        if self.game.character.test_luck(self.game.dice):
+            self.io.success("LUCKY! ✨")
+            self.game.goto(page.outcomes["lucky"])
         else:
-            print_error("UNLUCKY! 💀")
-            self.game.character.current_location = page_data["outcomes"]["unlucky"]
-        time.sleep(1)
-
-    def handle_luck_test_double(self, page_data):
-        self.display(page_data)
-        print_bold(f"\n--- First Test (Luck: {self.game.character.luck}) ---")
-        input("Press Enter...")
-        res1 = "lucky" if self.game.character.test_luck() else "unlucky"
-        print(res1.upper())
+            self.io.error("UNLUCKY! 💀")
+            self.game.goto(page.outcomes["unlucky"])
+        await self.game.pause(1)
+
+    async def handle_luck_test_double(self, page):
+        self.display(page)
+        self.io.bold(f"\n--- First Test (Luck: {self.game.character.luck}) ---")
+        await self.io.read("Press Enter...")
+        res1 = "lucky" if self.game.character.test_luck(self.game.dice) else "unlucky"
+        self.io.write(res1.upper())
         
-        time.sleep(1)
-        print_bold(f"\n--- Second Test (Luck: {self.game.character.luck}) ---")
-        input("Press Enter...")
-        res2 = "lucky" if self.game.character.test_luck() else "unlucky"
-        print(res2.upper())
+        await self.game.pause(1)
+        self.io.bold(f"\n--- Second Test (Luck: {self.game.character.luck}) ---")
+        await self.io.read("Press Enter...")
+        res2 = "lucky" if self.game.character.test_luck(self.game.dice) else "unlucky"
+        self.io.write(res2.upper())
 
         outcome_key = f"{res1}_{res2}"
-        self.game.character.current_location = page_data["outcomes"][outcome_key]
+        self.game.goto(page.outcomes[outcome_key])
 
-    def handle_skill_test(self, page_data):
-        self.display(page_data)
-        print_info(f"Your Skill: {self.game.character.skill}")
-        input("Press Enter to Test Your Skill...")
+    async def handle_skill_test(self, page):
+        self.display(page)
+        self.io.info(f"Your Skill: {self.game.character.skill}")
+        await self.io.read("Press Enter to Test Your Skill...")
         
-        if self.game.character.test_skill():
-            print_success("SUCCESS!")
-            self.game.character.current_location = page_data["outcomes"]["success"]
+        if self.game.character.test_skill(self.game.dice):
+            self.io.success("SUCCESS!")
+            self.game.goto(page.outcomes["success"])
         else:
-            print_error("FAILURE!")
-            self.game.character.current_location = page_data["outcomes"]["failure"]
-        time.sleep(1)
-
-    def handle_random_test(self, page_data):
-        self.display(page_data)
-        input("Press Enter to roll...")
-        roll = str(random.randint(1, 6))
-        print_info(f"You rolled a {roll}.")
+            self.io.error("FAILURE!")
+            self.game.goto(page.outcomes["failure"])
+        await self.game.pause(1)
+
+    async def handle_random_test(self, page):
+        self.display(page)
+        await self.io.read("Press Enter to roll...")
+        roll = page.roll(None, self.game.dice)
+        self.io.info(f"You rolled a {roll}.")
         
-        outcomes = page_data["outcomes"]
-        if roll in outcomes:
-            res = outcomes[roll]
-        elif "2-6" in outcomes and int(roll) >= 2:
-            res = outcomes["2-6"]
-        else:
-            res = list(outcomes.values())[0]
-
-        if res == "GAME_OVER":
-            self.game.handlers['story'].handle_game_over({"text": "Bad luck."})
-        else:
-            self.game.character.current_location = res
-
-    def handle_condition_item(self, page_data):
-        if self.game.character.has_item(page_data["check"]["item"]):
-            self.game.character.current_location = page_data["outcomes"]["success"]
+        target = random_test_target(page.outcomes, roll)
+        if target == self.game.graph.game_over:
+            # A roll that kills has always said so in its own words, not the death page's
+            await self.game.handlers['story'].handle_game_over(Page(target, GAME_OVER, "game_over", text="Bad luck."))
+            return
+        self.game.goto(target)
+
+    async def handle_condition_item(self, page):
+        if self.game.character.has_item(page.data["check"]["item"]):
+            self.game.goto(page.outcomes["success"])
         else:
-            self.game.character.current_location = page_data["outcomes"]["failure"]
+            self.game.goto(page.outcomes["failure"])
 
-    def handle_condition_item_any(self, page_data):
-        checks = page_data["checks"]
+    async def handle_condition_item_any(self, page):
+        checks = page.data["checks"]
         found_item = False
         for check in checks:
             if self.game.character.has_item(check["item"]):
                 found_item = True
                 break
         if found_item:
-            self.game.character.current_location = page_data["outcomes"]["success"]
+            self.game.goto(page.outcomes["success"])
         else:
-            self.game.character.current_location = page_data["outcomes"]["failure"]
+            self.game.goto(page.outcomes["failure"])
 
-    def handle_condition_multi(self, page_data):
-        checks = page_data["checks"]
+    async def handle_condition_multi(self, page):
+        checks = page.data["checks"]
         passed = True
         for check in checks:
             if check["type"] == "item":
@@ -119,48 +116,46 @@ class CheckHandler(BaseHandler):
                     passed = False
                     break
         if passed:
-            self.game.character.current_location = page_data["outcomes"]["success"]
+            self.game.goto(page.outcomes["success"])
         else:
-            self.game.character.current_location = page_data["outcomes"]["failure"]
+            self.game.goto(page.outcomes["failure"])
 
-    def handle_condition_gold(self, page_data):
-        if self.game.character.gold >= page_data["check"]["amount"]:
-            self.game.character.current_location = page_data["outcomes"]["success"]
+    async def handle_condition_gold(self, page):
+        if self.game.character.gold >= page.data["check"]["amount"]:
+            self.game.goto(page.outcomes["success"])
         else:
-            self.game.character.current_location = page_data["outcomes"]["failure"]
+            self.game.goto(page.outcomes["failure"])
 
-    def handle_condition_combat(self, page_data):
+    async def handle_condition_combat(self, page):
         """Checks who we fought recently (Page 138)."""
-        target_enemy = page_data["check"].get("last_enemy_fought", "").lower()
+        if page.enemies:
+            target_enemy = page.enemies[0][1]["name"].lower()
+        else:
+            # Loose ids like "ape_man_1" should still match "Wandering Ape Man"
+            target_enemy = page.data["check"].get("last_enemy_fought", "").lower().replace("_", " ").rstrip(" 0123456789")
         # Game engine needs to track this during combat
         last_fought = getattr(self.game, "last_enemy_fought", "").lower()
         
         # Flexible matching
         if target_enemy in last_fought:
-            self.game.character.current_location = page_data["outcomes"]["success"]
+            self.game.goto(page.outcomes["success"])
         else:
-            self.game.character.current_location = page_data["outcomes"]["failure"]
-
-    def handle_random_encounter(self, page_data):
-        self.display(page_data)
-        input("Press Enter to see what appears...")
-        roll = str(random.randint(1, 6))
-        enemy_id = page_data["encounters"][roll]
-        
-        combat_data = {
-            "text": f"A creature appears! It is a {self.game.enemy_data[enemy_id]['name']}!",
-            "enemies": [enemy_id],
-            "outcomes": page_data["outcomes"]
-        }
-        self.game.handlers['combat'].handle_combat(combat_data)
-
-    def handle_special_heal(self, page_data):
-        self.display(page_data)
-        heal_unit = page_data.get("heal_per_arrow", 2)
-        print_info("The old man looks at your wounds...")
+            self.game.goto(page.outcomes["failure"])
+
+    async def handle_random_encounter(self, page):
+        self.display(page)
+        await self.io.read("Press Enter to see what appears...")
+        roll = str(self.game.dice.d6())
+        # Prebuilt combat page for this roll
+        await self.game.handlers['combat'].handle_combat(page.encounters[roll])
+
+    async def handle_special_heal(self, page):
+        self.display(page)
+        heal_unit = page.data.get("heal_per_arrow", 2)
+        self.io.info("The old man looks at your wounds...")
         while True:
             try:
-                arrows = int(input("How many arrows hit you? (0 if none): "))
+                arrows = int(await self.io.read("How many arrows hit you? (0 if none): ", numbered(7, start=0)))
                 if arrows < 0: continue
                 break
             except ValueError: pass
@@ -168,11 +163,11 @@ class CheckHandler(BaseHandler):
         if arrows > 0:
             total = arrows * heal_unit
             self.game.character.heal(total)
-            print_success(f"Regained {total} STAMINA.")
+            self.io.success(f"Regained {total} STAMINA.")
         
-        if "effects" in page_data:
-            summary = self.game.character.apply_effects(page_data["effects"])
-            print_warning(f"Exchange: {summary}")
+        if "effects" in page.data:
+            summary = self.game.character.apply_effects(page.data["effects"], self.game.dice)
+            self.io.warning(f"Exchange: {summary}")
 
-        input("\nPress Enter...")
-        self.game.character.current_location = page_data["next"]
\ No newline at end of file
+        await self.io.read("\nPress Enter...")
+        self.game.goto(page.next)
\ No newline at end of file
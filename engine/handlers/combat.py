@@ -1,35 +1,31 @@
-import time
-import random
-from colorama import Fore, Style
 from .base import BaseHandler
-from engine.utils import print_bold, print_error, print_success, print_warning, print_info
+from engine.io import YES_NO, numbered
 
 class CombatHandler(BaseHandler):
 
-    def handle_combat(self, page_data):
-        if "text" in page_data: 
-            self.display(page_data)
+    async def handle_combat(self, page):
+        if page.text is not None: 
+            self.display(page)
         
-        print_warning("⚔️  COMBAT BEGINS  ⚔️")
+        self.io.warning("⚔️  COMBAT BEGINS  ⚔️")
         
-        # Load enemies
-        enemies = []
-        if "enemies" in page_data:
-            for eid in page_data["enemies"]:
-                 enemies.append(self.game.enemy_data[eid].copy())
+        # Enemies are resolved at load time; fight on copies
+        enemies = [stats.copy() for _, stats in page.enemies]
         
-        rules = page_data.get("rules", {})
+        rules = page.data.get("rules", {})
         combat_rounds = 0
         escaped = False
 
-        for enemy in enemies:
+        for (enemy_id, _), enemy in zip(page.enemies, enemies):
             if self.game.character.is_dead() or escaped: break
             
             # Track for condition_combat checks later
             self.game.last_enemy_fought = enemy['name'] 
 
-            print_bold(f"\nEnemy: {enemy['name']} (SKILL: {enemy['skill']}, STAMINA: {enemy['stamina']})")
-            input("Press Enter to engage...")
+            self.io.bold(f"\nEnemy: {enemy['name']} (SKILL: {enemy['skill']}, STAMINA: {enemy['stamina']})")
+            if self.game.show_odds:
+                self.io.info(f"Odds: {self.game.fight_odds_summary(enemy, rules, enemy_id)}")
+            await self.io.read("Press Enter to engage...")
 
             while not self.game.character.is_dead() and enemy['stamina'] > 0:
                 combat_rounds += 1
@@ -37,8 +33,8 @@ class CombatHandler(BaseHandler):
                 # Check escape rules
                 if "escape_after_rounds" in rules:
                     if combat_rounds > rules["escape_after_rounds"]["rounds"]:
-                        print_info("You manage to escape!")
-                        self.game.character.current_location = rules["escape_after_rounds"]["page"]
+                        self.io.info("You manage to escape!")
+                        self.game.goto(page.outcomes["escape"])
                         escaped = True
                         break
                 
@@ -49,66 +45,73 @@ class CombatHandler(BaseHandler):
                      pass 
 
                 # Rolls
-                p_roll = random.randint(1,6) + random.randint(1,6)
+                p_roll = self.game.dice.two_d6()
                 p_attack = p_roll + self.game.character.skill
                 
-                e_roll = random.randint(1,6) + random.randint(1,6)
+                e_roll = self.game.dice.two_d6()
                 e_attack = e_roll + enemy['skill']
 
                 # Modifiers (e.g. fight with wooden stick -2)
                 if "player_attack_modifier" in rules:
                     p_attack += rules["player_attack_modifier"]
 
-                print(f"Round {combat_rounds}: You {p_attack} ({p_roll}) vs Enemy {e_attack} ({e_roll})")
-                time.sleep(0.3)
+                self.io.write(f"Round {combat_rounds}: You {p_attack} ({p_roll}) vs Enemy {e_attack} ({e_roll})")
+                await self.game.pause(0.3, fight=True)
 
                 damage = 2
                 if "player_extra_damage_on_hit" in rules:
                     damage += rules["player_extra_damage_on_hit"]
                 
                 if p_attack > e_attack:
-                    print_success("HIT!")
+                    self.io.success("HIT!")
                     if self.game.character.luck > 0:
-                        want_luck = input("Test Luck for double damage? (y/n): ").lower()
+                        want_luck = (await self.io.read("Test Luck for double damage? (y/n): ", YES_NO)).lower()
                         if want_luck == 'y':
-                            if self.game.character.test_luck():
-                                print_success("LUCKY! Double Damage!")
+                            if self.game.character.test_luck(self.game.dice):
+                                self.io.success("LUCKY! Double Damage!")
                                 damage *= 2
                             else:
-                                print_error("Unlucky. 1 Damage.")
+                                self.io.error("Unlucky. 1 Damage.")
                                 damage = 1
                     
                     enemy['stamina'] -= damage
-                    print(f"{enemy['name']} HP: {enemy['stamina']}")
+                    self.io.write(f"{enemy['name']} HP: {enemy['stamina']}")
 
                 elif e_attack > p_attack:
-                    print_error("OUCH!")
+                    self.io.error("OUCH!")
                     
                     # Special damage rules (e.g. snakes extra poison)
                     if "enemy_extra_damage" in rules:
                         damage += rules["enemy_extra_damage"]
 
                     if self.game.character.luck > 0:
-                        want_luck = input("Test Luck to reduce damage? (y/n): ").lower()
+                        want_luck = (await self.io.read("Test Luck to reduce damage? (y/n): ", YES_NO)).lower()
                         if want_luck == 'y':
-                            if self.game.character.test_luck():
-                                print_success("LUCKY! 1 Damage taken.")
+                            if self.game.character.test_luck(self.game.dice):
+                                self.io.success("LUCKY! 1 Damage taken.")
                                 damage = 1
                             else:
-                                print_error("Unlucky. +1 Damage taken.")
+                                self.io.error("Unlucky. +1 Damage taken.")
                                 damage += 1
                     
                     self.game.character.take_damage(damage)
-                    print(f"Your HP: {self.game.character.stamina}")
+                    self.io.write(f"Your HP: {self.game.character.stamina}")
 
                 else:
-                    print("Clash! No damage.")
+                    self.io.write("Clash! No damage.")
+
+        if self.game.clock.collapse_fights:
+            self.io.info(f"The fight lasted {combat_rounds} rounds. Your STAMINA: {self.game.character.stamina}")
 
         # Determine outcome
         if self.game.character.is_dead():
-            self.game.character.current_location = page_data["outcomes"]["lose"]
+            self.game.note_fight(self.game.last_enemy_fought, False)
+            self.game.goto(page.outcomes["lose"])
         
         elif not escaped:
+            for enemy in enemies:
+                self.game.note_fight(enemy['name'], True)
+
             # Special win condition (Page 73 Troll escape)
             if "escape_after" in rules and "enemy" in rules["escape_after"]:
                 # Logic: If we killed the specific enemy, we jump to special page
@@ -118,44 +121,41 @@ class CombatHandler(BaseHandler):
             # Check for special time-based win conditions
             if "max_rounds" in rules:
                 if combat_rounds <= rules["max_rounds"]:
-                    print_success("You defeated him quickly!")
-                    self.game.character.current_location = page_data["outcomes"]["win_fast"]
+                    self.io.success("You defeated him quickly!")
+                    self.game.goto(page.outcomes["win_fast"])
                 else:
-                    print_warning("The fight took too long...")
-                    self.game.character.current_location = page_data["outcomes"]["win_slow"]
+                    self.io.warning("The fight took too long...")
+                    self.game.goto(page.outcomes["win_slow"])
             else:
-                self.game.character.current_location = page_data["outcomes"]["win"]
+                self.game.goto(page.outcomes["win"])
 
-    def handle_multi_combat(self, page_data):
+    async def handle_multi_combat(self, page):
         """Simultaneous combat (1 vs 2)."""
-        if "text" in page_data:
-            self.display(page_data)
+        if page.text is not None:
+            self.display(page)
         
-        print_warning("⚔️  SIMULTANEOUS COMBAT!  ⚔️")
-        print_info("You must defend against all enemies, but you can only hurt one per round.")
+        self.io.warning("⚔️  SIMULTANEOUS COMBAT!  ⚔️")
+        self.io.info("You must defend against all enemies, but you can only hurt one per round.")
 
-        enemies = []
-        if "enemies" in page_data:
-            for eid in page_data["enemies"]:
-                 enemies.append(self.game.enemy_data[eid].copy())
+        enemies = [stats.copy() for _, stats in page.enemies]
         
         combat_round = 0
 
         while not self.game.character.is_dead() and any(e['stamina'] > 0 for e in enemies):
             combat_round += 1
-            print_bold(f"\n--- Round {combat_round} ---")
+            self.io.bold(f"\n--- Round {combat_round} ---")
             
             active_enemies = [e for e in enemies if e['stamina'] > 0]
             
             # Player chooses target
             target = None
             if len(active_enemies) > 1:
-                print("Choose your target:")
+                self.io.write("Choose your target:")
                 for i, e in enumerate(active_enemies, 1):
-                    print(f"{i}. {e['name']} (SK: {e['skill']}, ST: {e['stamina']})")
+                    self.io.write(f"{i}. {e['name']} (SK: {e['skill']}, ST: {e['stamina']})")
                 while not target:
                     try:
-                        choice = int(input("> ")) - 1
+                        choice = int(await self.io.read("> ", numbered(len(active_enemies)))) - 1
                         if 0 <= choice < len(active_enemies):
                             target = active_enemies[choice]
                     except ValueError:
@@ -163,47 +163,55 @@ class CombatHandler(BaseHandler):
             else:
                 target = active_enemies[0]
 
-            print_info(f"Targeting: {target['name']}")
-            time.sleep(0.5)
+            self.io.info(f"Targeting: {target['name']}")
+            await self.game.pause(0.5, fight=True)
 
             # Roll Player
-            p_roll = random.randint(1, 6) + random.randint(1, 6)
+            p_roll = self.game.dice.two_d6()
             p_attack = p_roll + self.game.character.skill
-            print(f"You rolled {p_roll} + {self.game.character.skill} Skill = {Fore.CYAN}{p_attack} AS{Style.RESET_ALL}")
+            self.io.write(f"You rolled {p_roll} + {self.game.character.skill} Skill = {self.io.paint(f'{p_attack} AS', 'cyan')}")
 
             # Process Enemies
             for enemy in active_enemies:
-                e_roll = random.randint(1, 6) + random.randint(1, 6)
+                e_roll = self.game.dice.two_d6()
                 e_attack = e_roll + enemy['skill']
-                print(f"{enemy['name']} rolled {e_roll} + {enemy['skill']} Skill = {Fore.RED}{e_attack} AS{Style.RESET_ALL}")
-                time.sleep(0.3)
+                self.io.write(f"{enemy['name']} rolled {e_roll} + {enemy['skill']} Skill = {self.io.paint(f'{e_attack} AS', 'red')}")
+                await self.game.pause(0.3, fight=True)
 
                 damage = 2
                 if enemy == target:
                     if p_attack > e_attack:
-                        print_success(f"--> You HIT {enemy['name']}!")
+                        self.io.success(f"--> You HIT {enemy['name']}!")
                         enemy['stamina'] -= damage
                     elif e_attack > p_attack:
-                        print_error(f"<-- {enemy['name']} HITS YOU!")
+                        self.io.error(f"<-- {enemy['name']} HITS YOU!")
                         self.game.character.take_damage(damage)
                     else:
-                        print_info("-- Clash.")
+                        self.io.info("-- Clash.")
                 else:
                     if e_attack > p_attack:
-                        print_error(f"<-- {enemy['name']} HITS YOU (Flanked)!")
+                        self.io.error(f"<-- {enemy['name']} HITS YOU (Flanked)!")
                         self.game.character.take_damage(damage)
                     else:
-                        print_info(f"-- You parried {enemy['name']}.")
+                        self.io.info(f"-- You parried {enemy['name']}.")
                 
                 if self.game.character.is_dead(): break
             
-            print(f"Your Stamina: {self.game.character.stamina}")
-            time.sleep(1)
+            self.io.write(f"Your Stamina: {self.game.character.stamina}")
+            await self.game.pause(1, fight=True)
+
+        if self.game.clock.collapse_fights:
+            self.io.info(f"The fight lasted {combat_round} rounds. Your STAMINA: {self.game.character.stamina}")
 
         if self.game.character.is_dead():
-            self.game.character.current_location = page_data["outcomes"]["lose"]
+            for enemy in enemies:
+                if enemy['stamina'] > 0:
+                    self.game.note_fight(enemy['name'], False)
+            self.game.goto(page.outcomes["lose"])
         else:
-            print_success("\nYou have defeated the pair!")
-            self.game.character.current_location = page_data["outcomes"]["win"]
+            for enemy in enemies:
+                self.game.note_fight(enemy['name'], True)
+            self.io.success("\nYou have defeated the pair!")
+            self.game.goto(page.outcomes["win"])
         
-        input("\nPress Enter...")
\ No newline at end of file
+        await self.io.read("\nPress Enter...")
\ No newline at end of file
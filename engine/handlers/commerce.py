@@ -1,67 +1,67 @@
-import time
-import random
-from colorama import Fore, Style
 from .base import BaseHandler
-from engine.utils import print_bold, print_error, print_success, print_warning, print_info
+from engine.io import YES_NO, numbered
 
 class CommerceHandler(BaseHandler):
 
-    def handle_transaction(self, page_data):
-        self.display(page_data)
-        choices = page_data["choices"]
-        options = list(choices.items())
+    async def handle_transaction(self, page):
+        self.display(page)
+        options = page.choices
 
-        for i, (text, data) in enumerate(options, 1):
+        for i, (text, _, data) in enumerate(options, 1):
             cost = data.get("cost", 0)
-            cost_str = f"{Fore.YELLOW}({cost} Gold){Style.RESET_ALL}" if cost > 0 else ""
-            print(f"{i}. {text} {cost_str}")
+            cost_str = self.io.paint(f"({cost} Gold)", "yellow") if cost > 0 else ""
+            self.io.write(f"{i}. {text} {cost_str}")
 
         while True:
-            cmd = self.game.get_input_cmd()
-            if self.game.handle_global_commands(cmd): continue
+            # Only what the character can pay for counts as an answer
+            gold = self.game.character.gold
+            affordable = tuple(str(i) for i, (_, _, data) in enumerate(options, 1) if data.get("cost", 0) <= gold)
+            cmd = await self.game.get_input_cmd(affordable)
+            if await self.game.handle_global_commands(cmd): continue
 
             try:
                 idx = int(cmd) - 1
                 if 0 <= idx < len(options):
-                    _, data = options[idx]
+                    _, target, data = options[idx]
                     cost = data.get("cost", 0)
                     
                     if self.game.character.gold < cost:
-                        print_warning(f"Not enough gold! You have {self.game.character.gold}.")
+                        self.io.warning(f"Not enough gold! You have {self.game.character.gold}.")
                         continue
                     
                     if cost > 0:
                         self.game.character.gold -= cost
-                        print_info(f"You pay {cost} Gold.")
+                        self.io.info(f"You pay {cost} Gold.")
 
                     if "effect" in data:
-                        summary = self.game.character.apply_effects(data["effect"])
-                        print_success(f"Gained: {summary}")
-                        time.sleep(1)
+                        summary = self.game.character.apply_effects(data["effect"], self.game.dice)
+                        self.io.success(f"Gained: {summary}")
+                        await self.game.pause(1)
 
-                    self.game.character.current_location = data["next"]
+                    self.game.note_choice(page, idx)
+                    self.game.goto(target)
                     return
             except ValueError:
                 pass
 
-    def handle_shop(self, page_data):
+    async def handle_shop(self, page):
         """Simple wrapper for shop_multi."""
-        self.handle_shop_multi(page_data)
+        await self.handle_shop_multi(page)
 
-    def handle_shop_multi(self, page_data):
-        self.display(page_data)
-        items = page_data["items"] # Dict of "Item Name": Cost
+    async def handle_shop_multi(self, page):
+        self.display(page)
+        items = page.data["items"] # Dict of "Item Name": Cost
         
         while True:
-            print_bold(f"\nYour Gold: {self.game.character.gold}")
+            self.io.bold(f"\nYour Gold: {self.game.character.gold}")
             item_list = list(items.items())
             
             for i, (name, cost) in enumerate(item_list, 1):
-                print(f"{i}. {name} - {Fore.YELLOW}{cost} Gold{Style.RESET_ALL}")
-            print(f"{len(item_list)+1}. Leave Shop")
+                self.io.write(f"{i}. {name} - {self.io.paint(f'{cost} Gold', 'yellow')}")
+            self.io.write(f"{len(item_list)+1}. Leave Shop")
 
             try:
-                choice = input("\nBuy which item? > ").strip()
+                choice = (await self.io.read("\nBuy which item? > ", numbered(len(item_list) + 1))).strip()
                 if choice == str(len(item_list) + 1):
                     break
                 
@@ -71,39 +71,39 @@ class CommerceHandler(BaseHandler):
                     if self.game.character.gold >= cost:
                         self.game.character.gold -= cost
                         self.game.character.add_item(name)
-                        print_success(f"Bought {name}!")
+                        self.io.success(f"Bought {name}!")
                     else:
-                        print_warning("Not enough gold!")
+                        self.io.warning("Not enough gold!")
                 else:
-                    print_error("Invalid number.")
+                    self.io.error("Invalid number.")
             except ValueError:
-                print_error("Invalid input.")
+                self.io.error("Invalid input.")
 
-        if "next" in page_data:
-            self.game.character.current_location = page_data["next"]
+        if page.next is not None:
+            self.game.goto(page.next)
 
-    def handle_pawn_shop(self, page_data):
-        self.display(page_data)
-        sellable_items = page_data["items"] # Dict "Item": Value
+    async def handle_pawn_shop(self, page):
+        self.display(page)
+        sellable_items = page.data["items"] # Dict "Item": Value
 
         while True:
-            print_bold(f"\nYour Inventory: {', '.join(self.game.character.inventory)}")
-            print_bold(f"Your Gold: {self.game.character.gold}")
+            self.io.bold(f"\nYour Inventory: {', '.join(self.game.character.inventory)}")
+            self.io.bold(f"Your Gold: {self.game.character.gold}")
             
             user_has = [item for item in sellable_items if self.game.character.has_item(item)]
             
             if not user_has:
-                print_warning("You have nothing else to sell here.")
-                input("Press Enter to leave...")
+                self.io.warning("You have nothing else to sell here.")
+                await self.io.read("Press Enter to leave...")
                 break
 
             for i, item in enumerate(user_has, 1):
                 val = sellable_items[item]
-                print(f"{i}. Sell {item} for {Fore.YELLOW}{val} Gold{Style.RESET_ALL}")
-            print(f"{len(user_has)+1}. Leave")
+                self.io.write(f"{i}. Sell {item} for {self.io.paint(f'{val} Gold', 'yellow')}")
+            self.io.write(f"{len(user_has)+1}. Leave")
 
             try:
-                choice = input("\nSell what? > ").strip()
+                choice = (await self.io.read("\nSell what? > ", numbered(len(user_has) + 1))).strip()
                 if choice == str(len(user_has) + 1):
                     break
                 
@@ -113,17 +113,17 @@ class CommerceHandler(BaseHandler):
                     val = sellable_items[item_name]
                     self.game.character.remove_item(item_name)
                     self.game.character.gold += val
-                    print_success(f"Sold {item_name} for {val} Gold.")
+                    self.io.success(f"Sold {item_name} for {val} Gold.")
                 else:
-                    print_error("Invalid number.")
+                    self.io.error("Invalid number.")
             except ValueError:
-                print_error("Invalid input.")
+                self.io.error("Invalid input.")
 
-        self.game.character.current_location = page_data["next"]
+        self.game.goto(page.next)
 
-    def handle_dice_game(self, page_data):
-        self.display(page_data)
-        rules = page_data.get("rules", {})
+    async def handle_dice_game(self, page):
+        self.display(page)
+        rules = page.data.get("rules", {})
         game_type = rules.get("game_type", "high_roll")
         
         if game_type == "high_roll":
@@ -132,43 +132,43 @@ class CommerceHandler(BaseHandler):
             plays = 0
             
             while plays < max_plays and self.game.character.gold >= stake:
-                print_info(f"Gold: {self.game.character.gold}. Stake: {stake}")
-                choice = input("Play a round? (y/n): ").lower()
+                self.io.info(f"Gold: {self.game.character.gold}. Stake: {stake}")
+                choice = (await self.io.read("Play a round? (y/n): ", YES_NO)).lower()
                 if choice != 'y': break
                 
                 plays += 1
-                my_roll = random.randint(1, 6) + random.randint(1, 6)
-                dwarf_roll = random.randint(1, 6) + random.randint(1, 6)
+                my_roll = self.game.dice.two_d6()
+                dwarf_roll = self.game.dice.two_d6()
                 
-                print(f"You rolled: {my_roll} | Dwarf rolled: {dwarf_roll}")
+                self.io.write(f"You rolled: {my_roll} | Dwarf rolled: {dwarf_roll}")
                 if my_roll > dwarf_roll:
-                    print_success(f"You win {stake*4} gold!")
+                    self.io.success(f"You win {stake*4} gold!")
                     self.game.character.gold += (stake * 4)
                 elif dwarf_roll > my_roll:
-                    print_error("You lost.")
+                    self.io.error("You lost.")
                     self.game.character.gold -= stake
                 else:
-                    print("Draw.")
+                    self.io.write("Draw.")
             
-            self.game.character.current_location = page_data["next"]
+            self.game.goto(page.next)
 
         elif game_type == "hot_potato":
             wager = rules.get("wager", 5)
             while True:
-                input("Press Enter to roll...")
-                roll = random.randint(1, 6)
-                print(f"You rolled: {roll}")
+                await self.io.read("Press Enter to roll...")
+                roll = self.game.dice.d6()
+                self.io.write(f"You rolled: {roll}")
                 if roll == 1:
-                    print_error("You rolled a 1! You lose.")
+                    self.io.error("You rolled a 1! You lose.")
                     self.game.character.gold -= wager
                     break
                 
-                time.sleep(0.5)
-                opp_roll = random.randint(1, 6)
-                print(f"Opponent rolled: {opp_roll}")
+                await self.game.pause(0.5)
+                opp_roll = self.game.dice.d6()
+                self.io.write(f"Opponent rolled: {opp_roll}")
                 if opp_roll == 1:
-                    print_success("Opponent rolled a 1! You win.")
+                    self.io.success("Opponent rolled a 1! You win.")
                     self.game.character.gold += wager
                     break
             
-            self.game.character.current_location = page_data["next"]
\ No newline at end of file
+            self.game.goto(page.next)
\ No newline at end of file
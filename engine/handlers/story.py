@@ -1,47 +1,49 @@
 from .base import BaseHandler
-from engine.utils import print_error, print_success, clear_screen, print_header, print_wrapped
+from engine.io import numbered
 
 class StoryHandler(BaseHandler):
     
-    def handle_choice(self, page_data):
-        self.display(page_data)
-        choices = page_data["choices"]
-        options = list(choices.keys())
+    async def handle_choice(self, page):
+        self.display(page)
+        options = page.choices
         
-        for i, text in enumerate(options, 1):
-            print(f"{i}. {text}")
+        for i, (text, _, _) in enumerate(options, 1):
+            self.io.write(f"{i}. {text}")
 
         while True:
-            cmd = self.game.get_input_cmd()
-            if self.game.handle_global_commands(cmd): continue
+            cmd = await self.game.get_input_cmd(numbered(len(options)))
+            if await self.game.handle_global_commands(cmd): continue
 
             try:
                 idx = int(cmd) - 1
                 if 0 <= idx < len(options):
-                    self.game.character.current_location = choices[options[idx]]
+                    self.game.note_choice(page, idx)
+                    self.game.goto(options[idx][1])
                     return
             except ValueError:
                 pass
-            print_error("Invalid choice.")
+            self.io.error("Invalid choice.")
 
-    def handle_auto(self, page_data):
-        self.display(page_data)
-        input("\nPress Enter to continue...")
-        self.game.character.current_location = page_data["next"]
+    async def handle_auto(self, page):
+        self.display(page)
+        await self.io.read("\nPress Enter to continue...")
+        self.game.goto(page.next)
 
-    def handle_game_over(self, page_data):
-        clear_screen()
-        print_header("GAME OVER")
-        print_wrapped(page_data.get('text', ''))
+    async def handle_game_over(self, page):
+        self.io.clear()
+        self.io.header("GAME OVER")
+        self.game.outcome = "death"
+        self.io.wrapped(page.text or '')
         self.game.delete_character()
         self.game.running = False
-        input("\nPress Enter to return to menu...")
+        await self.io.read("\nPress Enter to return to menu...")
 
-    def handle_victory(self, page_data):
-        clear_screen()
-        print_header("VICTORY!")
-        print_wrapped(page_data.get('text', ''))
-        print_success("You have conquered the City of Thieves!")
+    async def handle_victory(self, page):
+        self.io.clear()
+        self.io.header("VICTORY!")
+        self.game.outcome = "victory"
+        self.io.wrapped(page.text or '')
+        self.io.success("You have conquered the City of Thieves!")
         self.game.delete_character()
         self.game.running = False
-        input("\nPress Enter to return to menu...")
\ No newline at end of file
+        await self.io.read("\nPress Enter to return to menu...")
\ No newline at end of file
@@ -0,0 +1,100 @@
+from time import perf_counter
+from engine import metrics, render
+from engine.pacing import RealtimeClock
+
+# Every read() may name the answers it accepts so non-human ports (policies,
+# scripted runs) can answer without parsing prompts. None means "free text or Enter".
+YES_NO = ("y", "n")
+
+def numbered(count, start=1):
+    return tuple(str(i) for i in range(start, start + count))
+
+def run_sync(coro):
+    """
+    Drives an engine coroutine to completion without an event loop.
+    Only valid with ports whose coroutines never suspend (terminal, headless).
+    """
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise RuntimeError("Coroutine suspended; run it on an event loop with an async IO port.")
+
+class TerminalIO:
+    """
+    Blocking stdin/stdout port. Its coroutines never actually suspend.
+    Output is composed into a Frame and written once per prompt or pause.
+    """
+    def __init__(self, backend=None, stream=None, clock=None):
+        self.clock = clock or RealtimeClock()
+        self.backend = backend or render.select_backend(stream)
+        self.frame = render.Frame(self.backend, stream)
+        self.input_wait = 0.0
+
+    async def read(self, prompt="", options=None):
+        self.frame.raw(prompt)
+        if not metrics.enabled:
+            self.frame.flush()
+            return input()
+
+        start = perf_counter()
+        self.frame.flush()
+        waiting = perf_counter()
+        answer = input()
+        done = perf_counter()
+        metrics.observe("ff_render_seconds", waiting - start, "write")
+        metrics.observe("ff_input_wait_seconds", done - waiting)
+        self.input_wait += done - waiting
+        return answer
+
+    def flush(self):
+        if metrics.enabled:
+            start = perf_counter()
+            self.frame.flush()
+            metrics.observe("ff_render_seconds", perf_counter() - start, "write")
+        else:
+            self.frame.flush()
+
+    def paint(self, text, color):
+        return self.backend.paint(text, color)
+
+    def write(self, text=""):
+        self.frame.line(text)
+
+    def clear(self):
+        self.frame.clear()
+
+    def header(self, text):
+        if metrics.enabled:
+            start = perf_counter()
+            self.frame.header(text)
+            metrics.observe("ff_render_seconds", perf_counter() - start, "header")
+        else:
+            self.frame.header(text)
+
+    def wrapped(self, text):
+        if metrics.enabled:
+            start = perf_counter()
+            self.frame.wrapped(text)
+            metrics.observe("ff_render_seconds", perf_counter() - start, "text")
+        else:
+            self.frame.wrapped(text)
+
+    def bold(self, text):
+        self.frame.line(text, "bright")
+
+    def error(self, text):
+        self.frame.line(text, "red")
+
+    def success(self, text):
+        self.frame.line(text, "green")
+
+    def warning(self, text):
+        self.frame.line(text, "yellow")
+
+    def info(self, text):
+        self.frame.line(text, "blue")
+
+    def close(self):
+        self.frame.flush()
@@ -0,0 +1,171 @@
+"""
+Per-process latency and I/O histograms for the hot paths.
+
+Off by default: every instrumented site checks `metrics.enabled` first, so a
+disabled process pays one attribute lookup per page. Turn it on with
+`metrics.enable()`, optionally with a Prometheus text file that is rewritten
+every `interval` seconds (point node_exporter's textfile collector at it).
+
+    ff_turn_seconds{page_type}   engine time per page, excluding input waits
+    ff_input_wait_seconds        time spent waiting for the player
+    ff_render_seconds{op}        header/text rendering and terminal writes
+    ff_storage_seconds{op}       character load/save/delete, as seen by the engine
+    ff_storage_bytes{op}         bytes read/written by the storage backends
+"""
+import sys
+import threading
+from bisect import bisect_left
+
+SECONDS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+HELP = {
+    "ff_turn_seconds": "Engine time per page, excluding input waits.",
+    "ff_input_wait_seconds": "Time spent waiting for player input.",
+    "ff_render_seconds": "Rendering and terminal write time.",
+    "ff_storage_seconds": "Character storage operation time.",
+    "ff_storage_bytes": "Bytes read or written by character storage.",
+}
+
+enabled = False
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "total")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Upper bucket bound below which a fraction `q` of observations fall."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+class Registry:
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, label=None, buckets=SECONDS_BUCKETS):
+        key = (name, label)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram(buckets))
+        histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+    # --- Exposition ---
+    def _series(self):
+        # Copied under the lock: a request thread may add a series while the writer thread reads
+        with self._lock:
+            items = list(self.histograms.items())
+        return sorted(items, key=lambda item: (item[0][0], item[0][1] or ""))
+
+    def prometheus(self):
+        lines = []
+        by_name = {}
+        for (name, label), histogram in self._series():
+            by_name.setdefault(name, []).append((label, histogram))
+        for name, series in by_name.items():
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for label, histogram in series:
+                tag = f'{_label_name(name)}="{label}",' if label is not None else ""
+                running = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    running += count
+                    lines.append(f'{name}_bucket{{{tag}le="{bound:g}"}} {running}')
+                lines.append(f'{name}_bucket{{{tag}le="+Inf"}} {histogram.count}')
+                suffix = f"{{{tag.rstrip(',')}}}" if tag else ""
+                lines.append(f"{name}_sum{suffix} {histogram.total:.9g}")
+                lines.append(f"{name}_count{suffix} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Human-readable table: count, mean, p50 and p95 per series."""
+        rows = []
+        for (name, label), histogram in self._series():
+            series = f"{name}{{{label}}}" if label is not None else name
+            mean = histogram.total / histogram.count if histogram.count else 0.0
+            unit = _format_bytes if name.endswith("_bytes") else _format_seconds
+            rows.append(f"{series:<44} n={histogram.count:<6} mean={unit(mean):>9} p50<={unit(histogram.quantile(0.5)):>9} p95<={unit(histogram.quantile(0.95)):>9}")
+        return "\n".join(rows) if rows else "No metrics recorded yet."
+
+def _label_name(name):
+    return {"ff_turn_seconds": "page_type", "ff_render_seconds": "op"}.get(name, "op")
+
+def _format_seconds(value):
+    if value == float("inf"):
+        return "inf"
+    return f"{value * 1000:.2f}ms"
+
+def _format_bytes(value):
+    if value == float("inf"):
+        return "inf"
+    return f"{value / 1024:.1f}KiB"
+
+registry = Registry()
+
+# --- Module API ---
+def observe(name, value, label=None):
+    registry.observe(name, value, label)
+
+def observe_bytes(name, value, label=None):
+    registry.observe(name, value, label, BYTES_BUCKETS)
+
+def summary():
+    return registry.summary()
+
+class _TextfileWriter(threading.Thread):
+    def __init__(self, path, interval):
+        super().__init__(name="metrics-textfile", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                write_textfile(self.path)
+            except Exception as e:
+                # Try again next interval rather than let the export stop for good
+                print(f"Metrics export to {self.path} failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+_writer = None
+
+def write_textfile(path):
+    from engine.storage import write_atomic
+    write_atomic(path, registry.prometheus())
+
+def enable(textfile=None, interval=15.0):
+    global enabled, _writer
+    enabled = True
+    if textfile and _writer is None:
+        _writer = _TextfileWriter(textfile, interval)
+        _writer.start()
+
+def disable():
+    global enabled, _writer
+    enabled = False
+    if _writer is not None:
+        _writer.stopped.set()
+        write_textfile(_writer.path) # Leave the final numbers behind
+        _writer = None
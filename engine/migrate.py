@@ -0,0 +1,57 @@
+"""
+Splits a single-file character store into a ShardedSaveManager directory.
+
+    python -m engine.migrate data/characters.json data/characters --shards 64
+    python -m engine.migrate data/characters.ffc data/characters --codec binary
+
+The source may be JSON or a binary snapshot (detected from its header) and is
+left untouched. Refuses to write into a directory that already holds shards
+unless --force is given, which replaces the old shard files.
+"""
+import argparse
+import glob
+import os
+
+from engine import codec as snapshot_codec
+from engine.storage import SaveManager, ShardedSaveManager
+
+def read_store(path):
+    with open(path, "rb") as f:
+        binary = f.read(len(snapshot_codec.MAGIC)) == snapshot_codec.MAGIC
+    return SaveManager(path, "binary" if binary else "json")._load_all()
+
+def split_store(source, directory, shards=64, codec="json", force=False):
+    """Copies every character in `source` into shard files; returns the record count."""
+    if os.path.exists(os.path.join(directory, "shards.json")) and not force:
+        raise FileExistsError(f"{directory} already holds a sharded store (use --force to overwrite)")
+    records = read_store(source)
+    if force:
+        # Old shards would otherwise linger if the shard count shrinks
+        for path in glob.glob(os.path.join(directory, "shard-*.*")) + glob.glob(os.path.join(directory, "shards.json")):
+            os.remove(path)
+    manager = ShardedSaveManager(directory, shards, codec)
+    try:
+        manager._save_all(records)
+    finally:
+        manager.close()
+    return len(records)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split characters.json into a sharded save directory.")
+    parser.add_argument("source", help="Existing characters.json or binary snapshot")
+    parser.add_argument("directory", help="Directory for the shard files")
+    parser.add_argument("--shards", type=int, default=64)
+    parser.add_argument("--codec", choices=("json", "binary"), default="json")
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing sharded store")
+    args = parser.parse_args(argv)
+
+    try:
+        count = split_store(args.source, args.directory, args.shards, args.codec, args.force)
+    except (FileExistsError, snapshot_codec.CodecError) as e:
+        print(e)
+        return 1
+    print(f"Split {count} characters into {args.shards} shards in {args.directory}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
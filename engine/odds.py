@@ -0,0 +1,337 @@
+"""
+Exact combat odds for `CombatHandler.handle_combat`.
+
+A fight is a Markov chain over (player STAMINA, enemy STAMINA, LUCK). Each
+round both sides roll 2d6 + SKILL; the higher Attack Strength wounds the other,
+optionally modified by Testing Luck. We push the whole probability tensor
+through one round at a time with NumPy shifts instead of sampling.
+
+    python -m engine.odds --build   # regenerate data/combat_odds.npz
+"""
+import argparse
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+TABLE_NAME = "combat_odds.npz" # Next to a book's enemies.json
+TABLE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", TABLE_NAME)
+TABLE_SKILLS = np.arange(1, 13)
+TABLE_STAMINAS = np.arange(1, 25)
+
+EPSILON = 1e-12
+MAX_ROUNDS = 2000
+
+def _two_dice():
+    dist = np.zeros(13)
+    for a in range(1, 7):
+        for b in range(1, 7):
+            dist[a + b] += 1 / 36
+    return dist
+
+TWO_DICE = _two_dice()
+# P(2d6 <= n) for n = 0..12
+LUCK_CHANCE = np.concatenate(([0.0], np.cumsum(TWO_DICE)[1:]))
+# Distribution of (player roll - enemy roll), index 0 is a difference of -10
+ROLL_DIFF = np.convolve(TWO_DICE[2:], TWO_DICE[2:][::-1])
+
+def round_chances(skill_delta):
+    """(P(player hits), P(enemy hits), P(clash)) for a given player-minus-enemy SKILL delta."""
+    diffs = np.arange(-10, 11) + skill_delta
+    p_hit = ROLL_DIFF[diffs > 0].sum()
+    p_hurt = ROLL_DIFF[diffs < 0].sum()
+    return p_hit, p_hurt, 1.0 - p_hit - p_hurt
+
+def luck_chance(luck):
+    return LUCK_CHANCE[min(max(luck, 0), 12)]
+
+def policy_mask(luck_policy, max_luck):
+    """Which LUCK levels Test Luck when offered: 'never', 'always' or a minimum LUCK."""
+    levels = np.arange(max_luck + 1)
+    if luck_policy in (None, "never"):
+        return np.zeros(max_luck + 1, dtype=bool)
+    if luck_policy == "always":
+        return levels > 0
+    return (levels > 0) & (levels >= int(luck_policy))
+
+class CombatRules:
+    """The subset of a combat page's `rules` that changes the odds."""
+    __slots__ = ("player_attack_modifier", "player_damage", "enemy_damage", "escape_after_rounds", "max_rounds")
+
+    def __init__(self, rules=None):
+        rules = rules or {}
+        self.player_attack_modifier = rules.get("player_attack_modifier", 0)
+        # Mirrors the handler: enemy hits start from the same base damage
+        self.player_damage = 2 + rules.get("player_extra_damage_on_hit", 0)
+        self.enemy_damage = self.player_damage + rules.get("enemy_extra_damage", 0)
+        escape = rules.get("escape_after_rounds")
+        self.escape_after_rounds = escape["rounds"] if escape else None
+        self.max_rounds = rules.get("max_rounds")
+
+    def key(self):
+        return (self.player_attack_modifier, self.player_damage, self.enemy_damage, self.escape_after_rounds, self.max_rounds)
+
+class CombatOdds:
+    """
+    Outcome probabilities of a fight. `final` maps each outcome to a
+    [STAMINA, LUCK] probability array of the player's state afterwards.
+    """
+    def __init__(self, start_stamina, final, win_fast=0.0, expected_rounds=0.0):
+        self.start_stamina = start_stamina
+        self.final = final
+        self.win_fast = win_fast
+        self.expected_rounds = expected_rounds
+
+    @property
+    def win(self):
+        return float(self.final["win"].sum())
+
+    @property
+    def lose(self):
+        return float(self.final["lose"].sum())
+
+    @property
+    def escape(self):
+        return float(self.final["escape"].sum())
+
+    @property
+    def win_slow(self):
+        return self.win - self.win_fast
+
+    @property
+    def expected_stamina_loss(self):
+        staminas = np.arange(self.final["win"].shape[0])
+        remaining = sum((dist.sum(axis=1) * staminas).sum() for dist in self.final.values())
+        return float(self.start_stamina - remaining)
+
+    def summary(self):
+        return summarize(self.win, self.expected_stamina_loss, self.escape)
+
+def summarize(win, stamina_loss, escape=0.0):
+    text = f"{win:.1%} to win, ~{stamina_loss:.1f} STAMINA lost"
+    if escape > EPSILON:
+        text += f", {escape:.1%} to escape"
+    return text
+
+def _shift(tensor, axis, amount):
+    """Moves probability mass `amount` steps towards index 0, piling overflow onto 0."""
+    if amount <= 0:
+        return tensor
+    out = np.zeros_like(tensor)
+    size = tensor.shape[axis]
+    amount = min(amount, size)
+    keep = [slice(None)] * tensor.ndim
+    dest = [slice(None)] * tensor.ndim
+    keep[axis] = slice(amount, size)
+    dest[axis] = slice(0, size - amount)
+    out[tuple(dest)] = tensor[tuple(keep)]
+    floor = [slice(None)] * tensor.ndim
+    floor[axis] = slice(0, amount)
+    zero = [slice(None)] * tensor.ndim
+    zero[axis] = 0
+    out[tuple(zero)] += tensor[tuple(floor)].sum(axis=axis)
+    return out
+
+def _lower_luck(tensor):
+    # LUCK is the last axis; testing always costs one point
+    out = np.zeros_like(tensor)
+    out[..., :-1] = tensor[..., 1:]
+    return out
+
+@lru_cache(maxsize=4096)
+def _single_fight(skill_delta, stamina, enemy_stamina, luck, rules_key, luck_policy):
+    """Memoized on (SKILL delta, STAMINA pair, LUCK, rules, policy)."""
+    modifier, player_damage, enemy_damage, escape_after, max_rounds = rules_key
+    p_hit, p_hurt, p_clash = round_chances(skill_delta + modifier)
+
+    lucky = LUCK_CHANCE[np.minimum(np.arange(luck + 1), 12)]
+    uses_luck = policy_mask(luck_policy, luck).astype(float)
+    plain = 1.0 - uses_luck
+
+    state = np.zeros((stamina + 1, enemy_stamina + 1, luck + 1))
+    state[stamina, enemy_stamina, luck] = 1.0
+    win = np.zeros((stamina + 1, luck + 1))
+    lose = np.zeros((stamina + 1, luck + 1))
+    win_fast = 0.0
+    expected_rounds = 0.0
+
+    rounds = 0
+    limit = escape_after if escape_after is not None else MAX_ROUNDS
+    while rounds < limit and state.sum() > EPSILON:
+        rounds += 1
+        expected_rounds += state.sum()
+
+        hit = state * p_hit
+        hurt = state * p_hurt
+        nxt = state * p_clash
+
+        # Player wounds the enemy
+        nxt += _shift(hit * plain, 1, player_damage)
+        nxt += _lower_luck(_shift(hit * uses_luck * lucky, 1, player_damage * 2))
+        nxt += _lower_luck(_shift(hit * uses_luck * (1 - lucky), 1, 1))
+
+        # Enemy wounds the player
+        nxt += _shift(hurt * plain, 0, enemy_damage)
+        nxt += _lower_luck(_shift(hurt * uses_luck * lucky, 0, 1))
+        nxt += _lower_luck(_shift(hurt * uses_luck * (1 - lucky), 0, enemy_damage + 1))
+
+        won = nxt[1:, 0, :]
+        win[1:] += won
+        if max_rounds is not None and rounds <= max_rounds:
+            win_fast += won.sum()
+        lose[0] += nxt[0].sum(axis=0)
+
+        nxt[:, 0, :] = 0.0
+        nxt[0, :, :] = 0.0
+        state = nxt
+
+    escape = state.sum(axis=1)  # Whatever is still fighting when the round limit hits
+    return win, lose, escape, win_fast, expected_rounds
+
+def fight_odds(skill, stamina, luck, enemies, rules=None, luck_policy="never"):
+    """
+    Exact odds for `handle_combat` against `enemies` (dicts with skill/stamina)
+    fought one after another. Round limits are applied per enemy; the book only
+    uses them on single-enemy fights.
+    """
+    rules = rules if isinstance(rules, CombatRules) else CombatRules(rules)
+    rules_key = rules.key()
+    if isinstance(luck_policy, int):
+        luck_policy = str(luck_policy)
+
+    carry = np.zeros((stamina + 1, luck + 1))
+    carry[stamina, luck] = 1.0
+    lose = np.zeros_like(carry)
+    escape = np.zeros_like(carry)
+    win_fast = 0.0
+    expected_rounds = 0.0
+
+    for enemy in enemies:
+        won = np.zeros_like(carry)
+        for st, lu in zip(*np.nonzero(carry > EPSILON)):
+            mass = carry[st, lu]
+            if st == 0:
+                lose[0, lu] += mass
+                continue
+            w, l, e, fast, rounds = _single_fight(skill - enemy["skill"], int(st), enemy["stamina"], int(lu), rules_key, luck_policy)
+            won[:st + 1, :lu + 1] += mass * w
+            lose[:st + 1, :lu + 1] += mass * l
+            escape[:st + 1, :lu + 1] += mass * e
+            win_fast += mass * fast
+            expected_rounds += mass * rounds
+        carry = won
+
+    final = {"win": carry, "lose": lose, "escape": escape}
+    return CombatOdds(stamina, final, win_fast, expected_rounds)
+
+@lru_cache(maxsize=256)
+def fight_table(skill_delta, enemy_stamina, stamina, luck, rules_key, luck_policy):
+    """
+    How one fight ends from every starting (STAMINA, LUCK) at once, by
+    backward induction: result[st, lu] is a (2, stamina + 1, luck + 1) array,
+    [0] the player's STAMINA/LUCK after winning and [1] after losing. Every
+    wound lowers one side's STAMINA, so a single pass in STAMINA order settles
+    each state; clashes only rescale. Round limits (escape_after_rounds,
+    max_rounds) depend on the round count and need `fight_odds` instead.
+    """
+    modifier, player_damage, enemy_damage, _, _ = rules_key
+    p_hit, p_hurt, p_clash = round_chances(skill_delta + modifier)
+    uses_luck = policy_mask(luck_policy, luck)
+    scale = 1.0 / (1.0 - p_clash)
+
+    ends = np.zeros((stamina + 1, enemy_stamina + 1, luck + 1, 2, stamina + 1, luck + 1))
+    for st in range(1, stamina + 1):
+        for lu in range(luck + 1):
+            ends[st, 0, lu, 0, st, lu] = 1.0 # Enemy down
+    for est in range(1, enemy_stamina + 1):
+        for lu in range(luck + 1):
+            ends[0, est, lu, 1, 0, lu] = 1.0 # Player down
+
+    for st in range(1, stamina + 1):
+        for est in range(1, enemy_stamina + 1):
+            for lu in range(luck + 1):
+                if uses_luck[lu]:
+                    lucky = LUCK_CHANCE[min(lu, 12)]
+                    hit = lucky * ends[st, max(est - player_damage * 2, 0), lu - 1] + (1 - lucky) * ends[st, est - 1, lu - 1]
+                    hurt = lucky * ends[st - 1, est, lu - 1] + (1 - lucky) * ends[max(st - enemy_damage - 1, 0), est, lu - 1]
+                else:
+                    hit = ends[st, max(est - player_damage, 0), lu]
+                    hurt = ends[max(st - enemy_damage, 0), est, lu]
+                ends[st, est, lu] = (p_hit * hit + p_hurt * hurt) * scale
+    return ends[:, enemy_stamina]
+
+def page_odds(character, page_data, enemy_data, luck_policy="never"):
+    enemies = [enemy_data[eid] for eid in page_data.get("enemies", [])]
+    return fight_odds(character.skill, character.stamina, character.luck, enemies, page_data.get("rules"), luck_policy)
+
+# --- Precomputed Table ---
+class OddsTable:
+    """
+    Win probability / expected loss per enemy for SKILL 1-12 and STAMINA 1-24,
+    no Luck and no special rules. `stats` holds each enemy's (SKILL, STAMINA)
+    at build time, so edited enemies miss instead of reading stale odds.
+    """
+    def __init__(self, enemy_ids, win, loss, stats):
+        self.index = {eid: i for i, eid in enumerate(enemy_ids)}
+        self.win = win
+        self.loss = loss
+        self.stats = stats
+
+    def lookup(self, enemy_id, skill, stamina, enemy):
+        i = self.index.get(enemy_id)
+        if i is None or not (1 <= skill <= 12 and 1 <= stamina <= 24):
+            return None
+        if tuple(self.stats[i]) != (enemy["skill"], enemy["stamina"]):
+            return None
+        return float(self.win[i, skill - 1, stamina - 1]), float(self.loss[i, skill - 1, stamina - 1])
+
+def build_table(enemy_data):
+    enemy_ids = sorted(enemy_data)
+    stats = np.array([[enemy_data[eid]["skill"], enemy_data[eid]["stamina"]] for eid in enemy_ids], dtype=np.int16)
+    win = np.zeros((len(enemy_ids), len(TABLE_SKILLS), len(TABLE_STAMINAS)), dtype=np.float32)
+    loss = np.zeros_like(win)
+    for i, eid in enumerate(enemy_ids):
+        for s, skill in enumerate(TABLE_SKILLS):
+            for t, stamina in enumerate(TABLE_STAMINAS):
+                odds = fight_odds(int(skill), int(stamina), 0, [enemy_data[eid]])
+                win[i, s, t] = odds.win
+                loss[i, s, t] = odds.expected_stamina_loss
+    return OddsTable(enemy_ids, win, loss, stats)
+
+def save_table(table, path=TABLE_PATH):
+    enemy_ids = sorted(table.index, key=table.index.get)
+    np.savez_compressed(path, enemy_ids=np.array(enemy_ids), win=table.win, loss=table.loss, stats=table.stats)
+
+@lru_cache(maxsize=8)
+def load_table(path=TABLE_PATH):
+    """The table at `path`, or None if there is none (or it predates `stats`)."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if "stats" not in data:
+            return None
+        return OddsTable([str(eid) for eid in data["enemy_ids"]], data["win"], data["loss"], data["stats"])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exact combat odds.")
+    parser.add_argument("--build", action="store_true", help="Regenerate the precomputed odds table")
+    parser.add_argument("--enemy", help="Enemy id to evaluate")
+    parser.add_argument("--skill", type=int, default=9)
+    parser.add_argument("--stamina", type=int, default=18)
+    parser.add_argument("--luck", type=int, default=9)
+    parser.add_argument("--luck-policy", default="never")
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(os.path.dirname(TABLE_PATH), "enemies.json"), "r", encoding="utf-8") as f:
+        enemy_data = json.load(f)
+
+    if args.build:
+        save_table(build_table(enemy_data))
+        print(f"Wrote {os.path.normpath(TABLE_PATH)}")
+    if args.enemy:
+        odds = fight_odds(args.skill, args.stamina, args.luck, [enemy_data[args.enemy]], luck_policy=args.luck_policy)
+        print(f"{enemy_data[args.enemy]['name']}: {odds.summary()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Pacing clocks for dramatic pauses (combat rounds, luck and skill results).
+
+Handlers never sleep directly; they call `GameEngine.pause()`, which flushes
+the IO port and defers to the engine's clock:
+
+    InstantClock   no delay at all (headless runs, simulations, tests)
+    RealtimeClock  blocking time.sleep (terminal)
+    AsyncClock     asyncio.sleep, so a paused fight never blocks the loop (sessions)
+
+With `collapse_fights=True` a fight's per-round pauses are skipped and the
+whole fight reaches the player as one frame with a closing summary.
+"""
+import time
+
+class InstantClock:
+    def __init__(self, scale=0.0, collapse_fights=False):
+        self.scale = scale
+        self.collapse_fights = collapse_fights
+
+    async def pause(self, seconds):
+        pass
+
+class RealtimeClock(InstantClock):
+    def __init__(self, scale=1.0, collapse_fights=False):
+        super().__init__(scale, collapse_fights)
+
+    async def pause(self, seconds):
+        if seconds * self.scale > 0:
+            time.sleep(seconds * self.scale)
+
+class AsyncClock(InstantClock):
+    def __init__(self, scale=1.0, collapse_fights=False):
+        super().__init__(scale, collapse_fights)
+
+    async def pause(self, seconds):
+        import asyncio # Only async sessions pay for the event loop machinery
+        await asyncio.sleep(seconds * self.scale)
+
+CLOCKS = {"instant": InstantClock, "realtime": RealtimeClock, "async": AsyncClock}
@@ -0,0 +1,121 @@
+"""
+Content packs: one Fighting Fantasy book per directory.
+
+    data/pack.json                    metadata for the built-in book (City of Thieves)
+    data/pages.json, data/enemies.json
+    data/books/<book_id>/pack.json    {"title": ..., "author": ..., "number": ...}
+    data/books/<book_id>/pages.json
+    data/books/<book_id>/enemies.json
+
+A PackLibrary only lists installed books until a session asks for one. It
+then reads and compiles that book, and keeps the compiled pack in a shared
+LRU of at most `maxsize` books. A book evicted while sessions still play it
+stays alive through them, and a weak reference lets the next lookup reuse
+it instead of loading a second copy. Memory follows the books in use, not
+the books installed.
+"""
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from engine.graph import compile_story
+from models.character import DEFAULT_BOOK
+
+class PackError(LookupError):
+    pass
+
+class ContentPack:
+    __slots__ = ("id", "meta", "graph", "directory", "__weakref__")
+
+    def __init__(self, book_id, meta, graph, directory):
+        self.id = book_id
+        self.meta = meta
+        self.graph = graph
+        self.directory = directory
+
+    @property
+    def title(self):
+        return self.meta.get("title", self.id)
+
+    def __repr__(self):
+        return f"<ContentPack {self.id} ({len(self.graph)} pages)>"
+
+def read_meta(directory):
+    path = os.path.join(directory, "pack.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_pack(book_id, directory):
+    """Reads and compiles one book. Raises OSError, JSONDecodeError or StoryError."""
+    with open(os.path.join(directory, "pages.json"), "r", encoding="utf-8") as f:
+        story = json.load(f)
+    with open(os.path.join(directory, "enemies.json"), "r", encoding="utf-8") as f:
+        enemies = json.load(f)
+    return ContentPack(book_id, read_meta(directory), compile_story(story, enemies), directory)
+
+class PackLibrary:
+    def __init__(self, root="data", maxsize=4, loader=load_pack, on_load=None, directories=None):
+        self.root = root
+        self.maxsize = maxsize
+        self.loader = loader
+        self.on_load = on_load # Called with each freshly loaded pack (e.g. to prerender it)
+        self._directories = directories # {book_id: directory}; None to discover them under root
+        self._packs = OrderedDict()
+        self._alive = weakref.WeakValueDictionary() # Every pack still referenced anywhere
+        self._lock = threading.Lock()
+        self.loads = self.hits = self.evictions = 0
+
+    # --- Discovery ---
+    def installed(self):
+        """{book_id: directory} for every installed (or given) book; no pages are read."""
+        if self._directories is None:
+            directories = {DEFAULT_BOOK: self.root}
+            books = os.path.join(self.root, "books")
+            if os.path.isdir(books):
+                for name in sorted(os.listdir(books)):
+                    if os.path.exists(os.path.join(books, name, "pages.json")):
+                        directories[name] = os.path.join(books, name)
+            self._directories = directories
+        return self._directories
+
+    def titles(self):
+        """{book_id: title} from each book's pack.json."""
+        return {book_id: read_meta(directory).get("title", book_id) for book_id, directory in self.installed().items()}
+
+    # --- Lookup ---
+    def get(self, book_id):
+        with self._lock:
+            pack = self._packs.get(book_id)
+            if pack is not None:
+                self._packs.move_to_end(book_id)
+                self.hits += 1
+                return pack
+            pack = self._alive.get(book_id)
+            if pack is None:
+                directory = self.installed().get(book_id)
+                if directory is None:
+                    raise PackError(f"Book {book_id!r} is not installed")
+                pack = self._alive[book_id] = self.loader(book_id, directory)
+                self.loads += 1
+                if self.on_load:
+                    self.on_load(pack)
+            else:
+                self.hits += 1
+            self._packs[book_id] = pack
+            while len(self._packs) > self.maxsize:
+                self._packs.popitem(last=False)
+                self.evictions += 1
+            return pack
+
+    def loaded(self):
+        """Book IDs held by the LRU or still in use by a session."""
+        with self._lock:
+            return sorted(set(self._packs) | set(self._alive.keys()))
+
+    def stats(self):
+        return {"loads": self.loads, "hits": self.hits, "evictions": self.evictions,
+                "cached": len(self._packs), "maxsize": self.maxsize}
@@ -0,0 +1,89 @@
+"""
+Hot reload of pages.json / enemies.json.
+
+A StoryWatcher polls the two files from a background thread. When either
+changes it parses and compiles the new content off the hot path, recompiling
+only pages whose content changed, and swaps the finished graph in with a
+single reference assignment. Engines built with `GameEngine(story=watcher)`
+look the graph up at every page boundary, so a session finishes the page it
+is on with the old page object and moves on into the new book. Broken
+content never replaces a working graph; the error is kept in `last_error`.
+"""
+import json
+import os
+import sys
+import threading
+
+from engine.graph import StoryError, compile_story
+
+class StoryWatcher:
+    def __init__(self, data_dir, interval=1.0, on_reload=None):
+        self.pages_path = os.path.join(data_dir, "pages.json")
+        self.enemies_path = os.path.join(data_dir, "enemies.json")
+        self.interval = interval
+        self.on_reload = on_reload # Called with each new graph, from the watcher thread
+        self.reloads = 0
+        self.last_error = None
+        self._stamps = self._stat()
+        self.graph = compile_story(*self._read()) # Broken content at startup is fatal, as before
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        stamps = []
+        for path in (self.pages_path, self.enemies_path):
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return stamps
+
+    def _read(self):
+        with open(self.pages_path, "r", encoding="utf-8") as f:
+            story = json.load(f)
+        with open(self.enemies_path, "r", encoding="utf-8") as f:
+            enemies = json.load(f)
+        return story, enemies
+
+    # --- Reloading ---
+    def check(self):
+        """Reloads if either file changed since the last look. Returns True if a new graph went live."""
+        stamps = self._stat()
+        if stamps == self._stamps:
+            return False
+        self._stamps = stamps
+        return self.reload()
+
+    def reload(self):
+        try:
+            story, enemies = self._read()
+            graph = compile_story(story, enemies, previous=self.graph)
+        except (OSError, json.JSONDecodeError, StoryError) as e:
+            # Half-written or broken files: keep serving the current book
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Story reload failed, keeping the current version. {self.last_error}", file=sys.stderr)
+            return False
+        if self.on_reload:
+            self.on_reload(graph) # e.g. prerender the new pages before anyone sees them
+        self.graph = graph
+        self.reloads += 1
+        self.last_error = None
+        return True
+
+    # --- Thread ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="story-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,223 @@
+"""
+Terminal rendering: colour backends, buffered frames and memoized page art.
+
+Page text never changes at runtime, so each header (per font and color mode)
+and wrapped text (per width) is rendered once and served from a bounded LRU. `prerender()` pins a whole
+book's art up front, turning a page turn into a lookup; the pins last as long
+as that book's graph (or until `unpin()`).
+
+A Frame collects everything written between two prompts and hands it to the
+terminal in a single write. The backend (ANSI colour or plain text) is picked
+once at startup; call sites only name a colour.
+"""
+import json
+import os
+import re
+import sys
+import textwrap
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+
+from colorama import Fore, Style
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+HEADER_FONT = "small"
+TEXT_WIDTH = 70
+RULE_WIDTH = 60
+
+@lru_cache(maxsize=None)
+def _figlet(font):
+    import pyfiglet # Presentation only; headless and bot processes never load it
+    return pyfiglet.Figlet(font=font)
+
+def render_header(text, font=HEADER_FONT, color=True):
+    art = _figlet(font).renderText(text)
+    rule = "=" * RULE_WIDTH
+    if color:
+        return f"{Fore.CYAN}{art}{Style.RESET_ALL}\n{Fore.CYAN}{rule}{Style.RESET_ALL}"
+    return f"{art}\n{rule}"
+
+def render_wrapped(text, width=TEXT_WIDTH):
+    text = textwrap.dedent(text).strip()
+    return "".join(textwrap.fill(paragraph, width=width) + "\n" for paragraph in text.splitlines()) + "\n"
+
+class RenderCache:
+    """Bounded LRU of rendered strings, plus pinned entries for prerendered books and loaded bundles."""
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._pinned = {}
+        self._pins = {} # Pinned key -> number of prerendered graphs holding it; bundle entries stay for good
+        self._owners = {} # id(graph) -> keys it pinned
+        self._lock = threading.RLock() # Reentrant: a graph's finalizer may run inside prerender
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries) + len(self._pinned)
+
+    def _get(self, key, build):
+        rendered = self._pinned.get(key)
+        if rendered is not None:
+            self.hits += 1
+            return rendered
+        rendered = self._entries.get(key)
+        if rendered is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return rendered
+
+        self.misses += 1
+        rendered = build()
+        self._entries[key] = rendered
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return rendered
+
+    def header(self, text, font=HEADER_FONT, color=True):
+        return self._get(("header", text, None, font, color), lambda: render_header(text, font, color))
+
+    def wrapped(self, text, width=TEXT_WIDTH, color=True):
+        # Wrapped text carries no colour codes, so both modes share one entry
+        return self._get(("text", text, width, None, None), lambda: render_wrapped(text, width))
+
+    # --- Bundles ---
+    def prerender(self, graph, width=TEXT_WIDTH, font=HEADER_FONT, color=True):
+        """Renders every page header and text of a compiled book and pins them while the graph lives."""
+        with self._lock:
+            if id(graph) in self._owners:
+                return len(self._pinned)
+            keys = []
+            for page in graph.pages:
+                self._pin(keys, ("header", f"Page {page.key}", None, font, color),
+                          lambda: render_header(f"Page {page.key}", font, color))
+                if page.text:
+                    self._pin(keys, ("text", page.text, width, None, None), lambda: render_wrapped(page.text, width))
+            self._owners[id(graph)] = keys
+            weakref.finalize(graph, self._release, id(graph))
+            return len(self._pinned)
+
+    def _pin(self, keys, key, build):
+        if key in self._pinned and key not in self._pins:
+            return # Loaded from a bundle
+        if key not in self._pinned:
+            self._pinned[key] = build()
+        self._pins[key] = self._pins.get(key, 0) + 1
+        keys.append(key)
+
+    def unpin(self, graph):
+        """Releases a prerendered graph's pins; art no other graph pinned falls back to the LRU."""
+        self._release(id(graph))
+
+    def _release(self, owner):
+        with self._lock:
+            for key in self._owners.pop(owner, ()):
+                self._pins[key] -= 1
+                if not self._pins[key]:
+                    del self._pins[key]
+                    del self._pinned[key]
+
+    def dump_bundle(self):
+        """The pinned bundle as zlib-compressed JSON, for shipping alongside a book."""
+        entries = [[list(key), rendered] for key, rendered in self._pinned.items()]
+        return zlib.compress(json.dumps(entries, separators=(",", ":")).encode("utf-8"), 9)
+
+    def load_bundle(self, blob):
+        for key, rendered in json.loads(zlib.decompress(blob).decode("utf-8")):
+            self._pinned[tuple(key)] = rendered
+        return len(self._pinned)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self._pins.clear()
+            self._owners.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "pinned": len(self._pinned),
+        }
+
+render_cache = RenderCache()
+
+# --- Backends ---
+class ColorBackend:
+    color = True
+    clear = "\x1b[2J\x1b[H"
+    palette = {
+        "red": Fore.RED,
+        "green": Fore.GREEN,
+        "yellow": Fore.YELLOW,
+        "blue": Fore.BLUE,
+        "cyan": Fore.CYAN,
+        "dim": Fore.LIGHTBLACK_EX,
+        "bright": Style.BRIGHT,
+    }
+
+    def paint(self, text, color):
+        return f"{self.palette[color]}{text}{Style.RESET_ALL}"
+
+    def plain(self, text):
+        return text
+
+class PlainBackend:
+    """For pipes, logs and bots: no escape codes at all, not even for clearing."""
+    color = False
+    clear = ""
+
+    def paint(self, text, color):
+        return text
+
+    def plain(self, text):
+        return ANSI_ESCAPE.sub("", text)
+
+def select_backend(stream=None):
+    stream = stream or sys.stdout
+    if os.environ.get("NO_COLOR") or os.environ.get("TERM") == "dumb" or not stream.isatty():
+        return PlainBackend()
+    return ColorBackend()
+
+# --- Frames ---
+class Frame:
+    """One screen of output, emitted in a single write on flush()."""
+    def __init__(self, backend, stream=None, cache=None):
+        self.backend = backend
+        self.stream = stream or sys.stdout
+        self.cache = cache or render_cache
+        self._parts = []
+
+    def clear(self):
+        if self.backend.clear:
+            # Anything still pending would be wiped off the screen anyway
+            self._parts = [self.backend.clear]
+        # Without a clear code nothing leaves the screen, so pending text stays and is still shown
+
+    def line(self, text="", color=None):
+        text = self.backend.plain(str(text))
+        self._parts.append((self.backend.paint(text, color) if color else text) + "\n")
+
+    def header(self, text):
+        self._parts.append(self.cache.header(text, color=self.backend.color) + "\n")
+
+    def wrapped(self, text):
+        self._parts.append(self.cache.wrapped(text, color=self.backend.color))
+
+    def raw(self, text):
+        self._parts.append(text)
+
+    def flush(self):
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts = []
+        self.stream.flush()
@@ -0,0 +1,144 @@
+"""
+Replays event logs (see engine.events) through GameEngine at full speed and
+checks that each one still produces the same pages, dice, stat changes and
+final character.
+
+    python -m engine.replay logs/            # every *.json under logs/
+    python -m engine.replay a.json b.json --processes 8
+
+Exits with status 1 if any log diverges.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+
+from engine.dice import Dice
+from engine.events import load_log
+from engine.game import GameEngine
+from engine.io import run_sync
+from engine.pacing import InstantClock
+from engine.simulator import HeadlessIO, ScriptedPolicy, SimulationAborted
+from engine.storage import MemorySaveManager
+from models.character import Character
+
+class ReplayResult:
+    def __init__(self, path, ok, index=None, expected=None, got=None, error=None):
+        self.path = path
+        self.ok = ok
+        self.index = index # First diverging event, if any
+        self.expected = expected
+        self.got = got
+        self.error = error
+
+    def describe(self):
+        if self.ok:
+            return f"OK    {self.path}"
+        if self.error:
+            return f"ERROR {self.path}: {self.error}"
+        return f"DIFF  {self.path} at event {self.index}: expected {self.expected!r}, got {self.got!r}"
+
+class Replayer:
+    """One engine (and one compiled graph) reused for every log a worker replays."""
+    def __init__(self, story_data, enemy_data):
+        self.io = HeadlessIO(None)
+        self.io.clock = InstantClock()
+        self.game = GameEngine(story_data, enemy_data, save_manager=MemorySaveManager(), io=self.io)
+        self.game.record_events = True
+        self.io.game = self.game
+
+    def replay(self, log, path=None):
+        game = self.game
+        inputs = [value for kind, value in log["events"] if kind == "i"]
+        self.io.policy = ScriptedPolicy(inputs) # Raises SimulationAborted once the recording runs out
+        self.io.reads = 0
+        self.io.max_reads = len(inputs) + 1
+        self.io.max_turns = len(log["events"]) + 1
+
+        game.user_id = log["user_id"]
+        game.dice = Dice.from_state(log["dice"])
+        game.last_enemy_fought = log.get("last_enemy_fought", "")
+        game.outcome = None
+        game.save_manager.save_character(Character.from_dict(json.loads(json.dumps(log["character"]))))
+
+        try:
+            run_sync(game.play())
+        except SimulationAborted:
+            game.event_log.end() # The recording stopped mid-prompt; compare what we have
+        except Exception as e:
+            return ReplayResult(path, False, error=f"{type(e).__name__}: {e}")
+        finally:
+            game.running = False
+            game.delete_character()
+
+        got = json.loads(json.dumps(game.event_log.to_dict()))
+        return compare(log, got, path)
+
+def compare(expected, got, path=None):
+    for index, (want, have) in enumerate(zip(expected["events"], got["events"])):
+        if want != have:
+            return ReplayResult(path, False, index, want, have)
+    if len(expected["events"]) != len(got["events"]):
+        index = min(len(expected["events"]), len(got["events"]))
+        want = expected["events"][index] if index < len(expected["events"]) else None
+        have = got["events"][index] if index < len(got["events"]) else None
+        return ReplayResult(path, False, index, want, have)
+    if expected.get("outcome") != got.get("outcome"):
+        return ReplayResult(path, False, "outcome", expected.get("outcome"), got.get("outcome"))
+    want, have = expected.get("final"), got.get("final")
+    if want is not None and have is not None:
+        have = {key: have.get(key) for key in want} # Fields added after the log was written are not compared
+    if want != have:
+        return ReplayResult(path, False, "final", want, have)
+    return ReplayResult(path, True)
+
+# --- Process Pool ---
+_worker = None
+
+def _init_worker(story_data, enemy_data):
+    global _worker
+    _worker = Replayer(story_data, enemy_data)
+
+def _replay_path(path):
+    return _worker.replay(load_log(path), path)
+
+def replay_all(story_data, enemy_data, paths, processes=None):
+    if processes == 1:
+        _init_worker(story_data, enemy_data)
+        return [_replay_path(path) for path in paths]
+    with multiprocessing.Pool(processes, _init_worker, (story_data, enemy_data)) as pool:
+        return pool.map(_replay_path, paths, chunksize=max(1, len(paths) // ((processes or os.cpu_count()) * 4)))
+
+def find_logs(targets):
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(sorted(glob.glob(os.path.join(target, "*.json"))))
+        else:
+            paths.append(target)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay event logs and check they still end the same way.")
+    parser.add_argument("logs", nargs="+", help="Log files or directories of logs")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(__file__), "..", "data"))
+    parser.add_argument("--verbose", action="store_true", help="List passing logs too")
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(args.data, "pages.json"), "r", encoding="utf-8") as f:
+        story = json.load(f)
+    with open(os.path.join(args.data, "enemies.json"), "r", encoding="utf-8") as f:
+        enemies = json.load(f)
+
+    results = replay_all(story, enemies, find_logs(args.logs), args.processes)
+    failed = [r for r in results if not r.ok]
+    for result in results:
+        if args.verbose or not result.ok:
+            print(result.describe())
+    print(f"{len(results) - len(failed)}/{len(results)} logs replayed identically")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,170 @@
+import asyncio
+from time import perf_counter
+from engine import metrics
+from engine.game import GameEngine
+from engine.graph import compile_story
+from engine.pacing import AsyncClock
+from engine.render import ANSI_ESCAPE
+
+class MemoryIO:
+    """
+    In-memory transport standing in for a chat gateway.
+    Output is plain text, buffered until the engine asks for input and then
+    delivered as a single message on `outbox`.
+    """
+    def __init__(self, clock=None):
+        # Chat transports get fights as one message; other pauses emit what was said so far
+        self.clock = clock or AsyncClock(collapse_fights=True)
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        self._buffer = []
+        self.input_wait = 0.0
+
+    def _emit(self):
+        if self._buffer:
+            self.outbox.put_nowait("\n".join(self._buffer))
+            self._buffer = []
+
+    async def read(self, prompt="", options=None):
+        if prompt:
+            self._buffer.append(prompt.strip("\n"))
+        self._emit()
+        if not metrics.enabled:
+            return await self.inbox.get()
+        start = perf_counter()
+        answer = await self.inbox.get()
+        waited = perf_counter() - start
+        metrics.observe("ff_input_wait_seconds", waited)
+        self.input_wait += waited
+        return answer
+
+    def flush(self):
+        self._emit()
+
+    def write(self, text=""):
+        self._buffer.append(ANSI_ESCAPE.sub("", str(text)))
+
+    def close(self):
+        self._emit()
+
+    def paint(self, text, color):
+        return text
+
+    def clear(self):
+        pass
+
+    def header(self, text):
+        self.write(f"== {text} ==")
+
+    def wrapped(self, text):
+        self.write(" ".join(text.split()))
+
+    bold = error = success = warning = info = write
+
+class Session:
+    def __init__(self, user_id, engine, io):
+        self.user_id = user_id
+        self.engine = engine
+        self.io = io
+        self.task = None
+
+class SessionManager:
+    """
+    Runs one GameEngine per user_id as an asyncio task in a single process.
+    Story data and storage are shared; each session gets its own IO port.
+    With `story` (a StoryWatcher) every session follows its hot reloads; with
+    `books` (a PackLibrary) each session plays its character's book. One
+    `analytics` (an Analytics) collects the totals of every session.
+    """
+    def __init__(self, story_data, enemy_data, save_manager=None, io_factory=MemoryIO, log_dir=None, story=None, books=None, analytics=None):
+        self.story_data = story_data
+        self.enemy_data = enemy_data
+        self.save_manager = save_manager
+        self.io_factory = io_factory
+        self.log_dir = log_dir
+        self.story = story
+        self.books = books
+        self.analytics = analytics
+        # Compiled once for every session, which then share its hint solvers too
+        self.graph = compile_story(story_data, enemy_data) if story is None and books is None else None
+        self._sessions = {}
+        self._ended = {} # Finished sessions whose output (and end marker) no one has received yet
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, user_id):
+        return self._sessions.get(str(user_id))
+
+    def open(self, user_id):
+        """Starts (or returns) the session for a user. Must be called inside a running loop."""
+        user_id = str(user_id)
+        if user_id in self._sessions:
+            return self._sessions[user_id]
+
+        ended = self._ended.pop(user_id, None)
+        io = self.io_factory()
+        if ended is not None:
+            # What the last session said before ending still goes out first
+            while not ended.io.outbox.empty():
+                message = ended.io.outbox.get_nowait()
+                if message is not None:
+                    io.outbox.put_nowait(message)
+        graph_loader = (lambda: self.graph) if self.graph is not None else None
+        engine = GameEngine(self.story_data, self.enemy_data, save_manager=self.save_manager, io=io, user_id=user_id, graph_loader=graph_loader, log_dir=self.log_dir, story=self.story, books=self.books, analytics=self.analytics)
+        if self.save_manager is None:
+            self.save_manager = engine.save_manager
+
+        session = Session(user_id, engine, io)
+        self._sessions[user_id] = session
+        session.task = asyncio.create_task(self._run(session), name=f"session-{user_id}")
+        return session
+
+    async def _run(self, session):
+        engine = session.engine
+        try:
+            if engine.load_character() is None:
+                if not await engine.create_character_flow():
+                    return
+            await engine.play()
+        finally:
+            session.io.close()
+            session.io.outbox.put_nowait(None)  # End-of-session marker for receivers
+            if self._sessions.get(session.user_id) is session:
+                del self._sessions[session.user_id]
+                self._ended[session.user_id] = session # Until receive() drains it
+
+    async def send(self, user_id, text):
+        session = self.open(user_id)
+        session.io.inbox.put_nowait(text)
+
+    async def receive(self, user_id, timeout=None):
+        """Returns the next output message, or None once the session has ended."""
+        user_id = str(user_id)
+        session = self._sessions.get(user_id) or self._ended.get(user_id)
+        if session is None:
+            return None
+        message = await asyncio.wait_for(session.io.outbox.get(), timeout)
+        if message is None and self._ended.get(user_id) is session:
+            del self._ended[user_id]
+        return message
+
+    async def close(self, user_id):
+        session = self.get(user_id)
+        if session is None:
+            return
+        session.engine.running = False
+        session.task.cancel()
+        try:
+            await session.task
+        except asyncio.CancelledError:
+            pass
+        # Keep whatever page the player reached
+        session.engine.save_character()
+
+    async def shutdown(self):
+        for user_id in list(self._sessions):
+            await self.close(user_id)
+        self._ended.clear()
+        if self.save_manager is not None:
+            self.save_manager.flush()
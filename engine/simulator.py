@@ -0,0 +1,266 @@
+"""
+Headless Monte Carlo playthroughs.
+
+    python -m engine.simulator --runs 100000 --policy greedy
+
+Runs are seeded (run i uses seed `base_seed + i`), so any single run can be
+reproduced by re-running its seed with the same policy.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+from collections import Counter
+
+from engine.analytics import Analytics, simulated
+from engine.dice import Dice
+from engine.game import GameEngine
+from engine.io import YES_NO, run_sync
+from engine.pacing import InstantClock
+from engine.storage import MemorySaveManager
+from models.character import Character
+
+class SimulationAborted(Exception):
+    pass
+
+# --- Policies ---
+class RandomPolicy:
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+
+    def choose(self, game, prompt, options):
+        if not options:
+            return ""
+        return self.rng.choice(options)
+
+class GreedyPolicy(RandomPolicy):
+    """
+    One-step lookahead: never picks a choice leading straight to a game_over
+    page, takes a victory page if offered, and only Tests Luck when the odds
+    are in its favour (2d6 <= LUCK is better than even from LUCK 7).
+    """
+    def choose(self, game, prompt, options):
+        if not options:
+            return ""
+        if options == YES_NO:
+            if "Luck" in prompt:
+                return "y" if game.character.luck >= 7 else "n"
+            return "y"
+
+        page = game.graph[game.page_id]
+        if page.choices and prompt == "> ":
+            scored = [(self._score(game, page.choices[int(o) - 1][1]), o) for o in options]
+            best = max(score for score, _ in scored)
+            return self.rng.choice([o for score, o in scored if score == best])
+        return self.rng.choice(options)
+
+    @staticmethod
+    def _score(game, target):
+        page_type = game.graph[target].type
+        if page_type == "victory":
+            return 1
+        if page_type == "game_over":
+            return -1
+        return 0
+
+class ScriptedPolicy:
+    """Answers prompts from a fixed list, then falls back to another policy (or aborts)."""
+    def __init__(self, answers, fallback=None):
+        self.answers = list(answers)
+        self.position = 0
+        self.fallback = fallback
+
+    def choose(self, game, prompt, options):
+        if self.position < len(self.answers):
+            answer = self.answers[self.position]
+            self.position += 1
+            return answer
+        if self.fallback is None:
+            raise SimulationAborted("Script exhausted")
+        return self.fallback.choose(game, prompt, options)
+
+POLICIES = {"random": RandomPolicy, "greedy": GreedyPolicy}
+
+# --- Headless Port ---
+class HeadlessIO:
+    """Answers every prompt from a policy; all output, clearing and pacing are no-ops."""
+    def __init__(self, policy, max_reads=2000, max_turns=300):
+        self.policy = policy
+        self.max_reads = max_reads
+        self.max_turns = max_turns
+        self.reads = 0
+        self.game = None
+        self.clock = InstantClock()
+        self.input_wait = 0.0 # Policies answer instantly
+
+    async def read(self, prompt="", options=None):
+        self.reads += 1
+        if self.reads > self.max_reads or self.game.turns > self.max_turns:
+            raise SimulationAborted("Run limit reached")  # Stuck in a loop or a shop
+        if options == ():
+            raise SimulationAborted("No valid answer")  # e.g. nothing affordable; waiting out max_reads changes nothing
+        return self.policy.choose(self.game, prompt, options)
+
+    def write(self, text=""):
+        pass
+
+    def paint(self, text, color):
+        return text
+
+    clear = flush = header = wrapped = bold = error = success = warning = info = write
+
+# --- Runner ---
+class SimulationStats:
+    def __init__(self):
+        self.runs = 0
+        self.victories = 0
+        self.deaths = 0
+        self.aborted = 0
+        self.errors = 0
+        self.turns = 0
+        self.death_pages = Counter()
+        self.analytics = None # Analytics.to_dict() of one chunk, when collected
+
+    def merge(self, other):
+        self.runs += other.runs
+        self.victories += other.victories
+        self.deaths += other.deaths
+        self.aborted += other.aborted
+        self.errors += other.errors
+        self.turns += other.turns
+        self.death_pages.update(other.death_pages)
+        return self
+
+    def to_dict(self, top=10):
+        runs = self.runs or 1
+        # Runs cut off by the read/turn limits (or broken by an engine error) never ended: they count as
+        # survivors, but not towards victory_rate, and aborted_rate says how many there were
+        finished = self.runs - self.aborted - self.errors
+        return {
+            "runs": self.runs,
+            "finished": finished,
+            "survival_rate": (self.runs - self.deaths) / runs,
+            "victory_rate": self.victories / finished if finished else 0.0,
+            "aborted_rate": self.aborted / runs,
+            "aborted": self.aborted,
+            "errors": self.errors,
+            "average_turns": self.turns / runs,
+            "death_pages": dict(self.death_pages.most_common(top)),
+        }
+
+class Simulator:
+    def __init__(self, story_data, enemy_data, policy="random", max_reads=2000, max_turns=300, analytics=False):
+        self.policy_name = policy
+        self.collect = analytics
+        self.io = HeadlessIO(None, max_reads=max_reads, max_turns=max_turns)
+        self.game = GameEngine(story_data, enemy_data, save_manager=MemorySaveManager(), io=self.io, user_id="sim",
+                               analytics=Analytics() if analytics else None)
+        self.io.game = self.game
+
+    def make_policy(self, seed):
+        rng = random.Random(seed)
+        if isinstance(self.policy_name, list):
+            return ScriptedPolicy(self.policy_name, fallback=RandomPolicy(rng))
+        return POLICIES[self.policy_name](rng)
+
+    def run_one(self, seed, stats):
+        self.game.dice = Dice(seed)
+        self.io.policy = self.make_policy(seed)
+        self.io.reads = 0
+        self.game.last_enemy_fought = ""
+        self.game.save_manager.delete_character("sim") # A fresh character, not a stale write over the last run
+        self.game.save_manager.save_character(Character(name="Sim", user_id="sim", dice=self.game.dice))
+
+        stats.runs += 1
+        try:
+            run_sync(self.game.play())
+        except SimulationAborted:
+            stats.aborted += 1
+            self.game.running = True  # Not an engine error
+        stats.turns += self.game.turns
+
+        if self.game.outcome == "victory":
+            stats.victories += 1
+        elif self.game.outcome == "death":
+            stats.deaths += 1
+            stats.death_pages[self.game.last_page] += 1
+        elif self.game.outcome is None and not self.game.running:
+            stats.errors += 1  # e.g. a missing page
+        self.game.running = False
+        self.game.delete_character()
+
+    def run(self, seeds):
+        stats = SimulationStats()
+        if self.collect:
+            self.game.analytics = Analytics() # Per chunk, so the parent can add them up
+        for seed in seeds:
+            self.run_one(seed, stats)
+        if self.collect:
+            # Filed apart from real players' totals, even in a shared file
+            stats.analytics = {simulated(book): totals for book, totals in self.game.analytics.to_dict().items()}
+        return stats
+
+# --- Process Pool ---
+_worker = None
+
+def _init_worker(story_data, enemy_data, policy, max_reads, max_turns, analytics):
+    global _worker
+    _worker = Simulator(story_data, enemy_data, policy, max_reads, max_turns, analytics)
+
+def _run_chunk(bounds):
+    start, stop = bounds
+    return _worker.run(range(start, stop))
+
+def simulate(story_data, enemy_data, runs, policy="random", seed=0, processes=None, chunk_size=2000, max_reads=2000, max_turns=300, analytics=None):
+    """Runs the playthroughs; with an Analytics, every run's page, choice, fight and gold totals are added to it (under `<book>:simulated`)."""
+    chunks = [(s, min(s + chunk_size, seed + runs)) for s in range(seed, seed + runs, chunk_size)]
+    stats = SimulationStats()
+    collect = analytics is not None
+    if processes == 1:
+        simulator = Simulator(story_data, enemy_data, policy, max_reads, max_turns, collect)
+        partials = (simulator.run(range(start, stop)) for start, stop in chunks)
+        for partial in partials:
+            stats.merge(partial)
+            if collect:
+                analytics.merge(partial.analytics)
+        return stats
+
+    with multiprocessing.Pool(processes, _init_worker, (story_data, enemy_data, policy, max_reads, max_turns, collect)) as pool:
+        for partial in pool.imap_unordered(_run_chunk, chunks):
+            stats.merge(partial)
+            if collect:
+                analytics.merge(partial.analytics)
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Monte Carlo playthroughs.")
+    parser.add_argument("--runs", type=int, default=10000)
+    parser.add_argument("--policy", default="random", choices=sorted(POLICIES) + ["scripted"])
+    parser.add_argument("--script", help="JSON list of answers for the scripted policy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--analytics", help="Add page, choice, fight and gold totals to this analytics file, as <book>:simulated")
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(__file__), "..", "data"))
+    args = parser.parse_args(argv)
+    if args.policy == "scripted" and not args.script:
+        parser.error("--policy scripted needs --script")
+
+    with open(os.path.join(args.data, "pages.json"), "r", encoding="utf-8") as f:
+        story = json.load(f)
+    with open(os.path.join(args.data, "enemies.json"), "r", encoding="utf-8") as f:
+        enemies = json.load(f)
+
+    policy = args.policy
+    if policy == "scripted":
+        with open(args.script, "r", encoding="utf-8") as f:
+            policy = json.load(f)
+
+    analytics = Analytics(args.analytics) if args.analytics else None
+    stats = simulate(story, enemies, args.runs, policy, args.seed, args.processes, analytics=analytics)
+    print(json.dumps(stats.to_dict(), indent=4))
+    if analytics is not None:
+        analytics.save()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,734 @@
+"""
+Best play and the true chance of victory from any point in the book.
+
+    python -m engine.solver --skill 9 --stamina 18 --luck 9 --gold 9
+    python -m engine.solver --page 108 --skill 11 --stamina 20 --luck 10 --items "Hag's Hair" "Six Black Pearls" "Lotus Flower" "Unicorn Tattoo"
+
+An adventure is a Markov decision process over (page, STAMINA, SKILL, LUCK,
+gold, key items). Only what the book can test is kept: items named by a
+condition_* page or bought by a pawn shop, gold capped at GOLD_CAP, and one
+bit per condition_combat page for "the last enemy fought matches". The states
+reachable from a start are expanded once and deduplicated on that key, then
+solved by value iteration one strongly connected component at a time, sinks
+first, so the acyclic bulk of the book needs a single backup per state.
+
+Chance nodes are exact: 2d6 against LUCK (which drops by one per test) and
+SKILL, every outcome of a page's dice expressions, and the STAMINA/LUCK
+distributions of engine.odds for fights, where Testing Luck is decided per
+fight ("never" or "always"). Known approximations: provisions are not part of
+the state, so the solver never eats and its chances are a floor;
+multi_combat is solved as one fight after another; and lose_random_items
+draws among the key items held plus the three starting items.
+
+Every key item picked up along the way multiplies the states behind it, so
+from page 1 the whole book runs to around a billion states. Tables are capped
+at `max_states`; a start whose reachable states don't fit raises
+StateLimitError and leaves the tables as they were. From the later pages,
+where the hint command is most useful, the reachable part fits easily.
+"""
+import argparse
+import json
+import os
+import threading
+from array import array
+from functools import lru_cache
+
+from engine.graph import compile_story
+from engine.handlers.checks import random_test_target
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+
+GOLD_CAP = 40 # More gold than this never changes what the book lets you do
+GOLD_FLOOR = -20 # Hot potato can leave you owing
+GOLD_EXACT = 10 # Gold is tracked to the piece up to here...
+GOLD_STEP = 5 # ...and above it in buckets this wide, rounded down
+LUCK_POLICIES = ("never", "always")
+UNTRACKED_ITEMS = 3 # Inventory slots lose_random_items may hit besides the key items
+TOLERANCE = 1e-10
+FIGHT_EPSILON = 1e-12
+MAX_STATES = 1_000_000 # Roughly 300 MB of tables
+HINT_STATES = 200_000 # A few seconds of solving, so the in-game hint stays responsive
+LOSS, WIN = 0, 1 # Table positions of the two absorbing outcomes
+PASS_TYPES = frozenset({"auto", "effect", "condition_item", "condition_item_any", "condition_multi", "condition_gold", "condition_combat"})
+
+# P(2d6 <= n) for n = 0..12
+AT_MOST = [sum(1 for a in range(1, 7) for b in range(1, 7) if a + b <= n) / 36 for n in range(13)]
+
+def chance_at_most(target):
+    return AT_MOST[min(max(target, 0), 12)]
+
+# --- Dice Outcomes ---
+@lru_cache(maxsize=None)
+def _sums(count):
+    """((total, probability), ...) for `count` six-sided dice."""
+    dist = {0: 1.0}
+    for _ in range(count):
+        nxt = {}
+        for total, p in dist.items():
+            for face in range(1, 7):
+                nxt[total + face] = nxt.get(total + face, 0.0) + p / 6
+        dist = nxt
+    return tuple(sorted(dist.items()))
+
+class _Branches:
+    """Dice stand-in that follows one path through every draw a function makes."""
+    def __init__(self, path):
+        self.path = path
+        self.sizes = []
+        self.probability = 1.0
+
+    def _draw(self, weights):
+        position = len(self.sizes)
+        if position == len(self.path):
+            self.path.append(0)
+        self.sizes.append(len(weights))
+        value, p = weights[self.path[position]]
+        self.probability *= p
+        return value
+
+    def d6(self):
+        return self._draw(_sums(1))
+
+    def two_d6(self):
+        return self._draw(_sums(2))
+
+    def roll(self, count):
+        return self._draw(_sums(count))
+
+    def below(self, n):
+        return self._draw([(i, 1 / n) for i in range(n)])
+
+    def choice(self, seq):
+        return seq[self.below(len(seq))]
+
+def outcomes(fn):
+    """{result: probability} over every outcome of the dice `fn(dice)` draws."""
+    found = {}
+    pending = [[]]
+    while pending:
+        prefix = pending.pop()
+        start = len(prefix)
+        dice = _Branches(prefix)
+        result = fn(dice)
+        for position in range(start, len(dice.sizes)):
+            for alternative in range(1, dice.sizes[position]):
+                pending.append(dice.path[:position] + [alternative])
+        found[result] = found.get(result, 0.0) + dice.probability
+    return found
+
+class StateLimitError(Exception):
+    pass
+
+def _freeze(effects):
+    return tuple(sorted((key, tuple(value) if isinstance(value, list) else value) for key, value in effects.items()))
+
+# --- Model ---
+class Solver:
+    """
+    Value table for one book and one set of initial (maximum) stats. States
+    are (page ID, phase, stamina, skill, luck, gold, mask); `phase` counts
+    rounds inside a dice game. Tables only grow, so later queries from states
+    already explored are a lookup.
+    """
+    def __init__(self, graph, max_skill, max_stamina, max_luck, gold_cap=GOLD_CAP, gold_step=GOLD_STEP, luck_policies=LUCK_POLICIES, max_states=MAX_STATES):
+        self.graph = graph
+        self.max_states = max_states
+        self.lock = threading.Lock() # Hints may solve from executor threads; tables take one writer at a time
+        self._too_large = set() # Starts already known to exceed max_states
+        self.max_skill = max_skill
+        self.max_stamina = max_stamina
+        self.max_luck = max_luck
+        self.gold_cap = max([gold_cap] + [page.data["check"]["amount"] for page in graph.pages if page.type == "condition_gold"])
+        self.gold_step = gold_step
+        self.luck_policies = luck_policies
+
+        self.item_bits = {} # Casefolded key item -> bit
+        for page in graph.pages:
+            for item in _gate_items(page):
+                self._bit(item)
+            if page.type == "pawn_shop":
+                for item in page.data["items"]:
+                    self._bit(item)
+        self.items_mask = (1 << len(self.item_bits)) - 1
+        self.tags = [] # (bit, enemy name fragment) per condition_combat page
+        self._tag_bits = {}
+        for page in graph.pages:
+            if page.type == "condition_combat":
+                bit = self._tag_bits[page.id] = 1 << (len(self.item_bits) + len(self.tags))
+                self.tags.append((bit, _combat_target(page)))
+        self._needed, self._gold_needed, self._passes = self._relevance()
+        self._terminal = {page.id: WIN if page.type == "victory" else LOSS
+                          for page in graph.pages if page.type in ("victory", "game_over")}
+        self._tagged_cache = {}
+        self._fights = {}
+        self._rolls = {}
+
+        # Flat transition table: state i owns actions state_ends[i]:state_ends[i + 1],
+        # action a owns edges edge_ends[a]:edge_ends[a + 1]
+        self.index = {}
+        self.states = [None, None]
+        self.values = array("d", [0.0, 1.0])
+        self.state_ends = array("l", [0, 0, 0])
+        self.edge_ends = array("l", [0])
+        self.targets = array("l")
+        self.probs = array("d")
+
+    def _relevance(self):
+        """
+        Per page, the items and tags this page or any page after it reads (as
+        one bitset), and the most gold it or any page after it can spend or
+        test for. Gold beyond that makes no difference from there on.
+        """
+        reads, spends, passes = [], [], set()
+        for page in self.graph.pages:
+            needed = 0
+            for item in _gate_items(page):
+                needed |= self.item_bits[item.casefold()]
+            spend = 0
+            ptype = page.type
+            if ptype == "pawn_shop":
+                needed |= sum(self.item_bits[item.casefold()] for item in page.data["items"])
+            elif ptype == "condition_combat":
+                needed |= self._tag_bits[page.id]
+            elif ptype == "condition_gold":
+                spend = page.data["check"]["amount"]
+            elif ptype == "transaction":
+                spend = max(option.get("cost", 0) for _, _, option in page.choices)
+            elif ptype in ("shop", "shop_multi"):
+                spend = sum(cost for item, cost in page.data["items"].items() if item.casefold() in self.item_bits)
+            elif ptype == "dice_game":
+                rules = page.data.get("rules", {})
+                if rules.get("game_type", "high_roll") == "high_roll":
+                    spend = rules.get("stake", 2) * rules.get("max_plays", 4) # Enough to lose every round
+            reads.append(needed)
+            spends.append(spend)
+        # Pages that loop back on each other share one answer; each of their prices counts once
+        pages = self.graph.pages
+        needed, most = list(reads), list(spends)
+        for component in _tarjan(len(pages), lambda page_id: pages[page_id].targets()):
+            members = set(component)
+            page = pages[component[0]]
+            if len(component) == 1 and page.type in PASS_TYPES and page.id not in page.targets():
+                passes.add(page.id)
+            merged = spend = 0
+            for page_id in component:
+                merged |= reads[page_id]
+                for target in pages[page_id].targets():
+                    if target not in members:
+                        merged |= needed[target]
+                        spend = max(spend, most[target])
+            spend = min(self.gold_cap, spend + sum(spends[page_id] for page_id in component))
+            for page_id in component:
+                needed[page_id], most[page_id] = merged, spend
+        return needed, most, passes
+
+    def _bit(self, item):
+        key = item.casefold()
+        if key not in self.item_bits:
+            self.item_bits[key] = 1 << len(self.item_bits)
+        return self.item_bits[key]
+
+    def __len__(self):
+        return len(self.states) - 2
+
+    # --- States ---
+    def at(self, page_id, stamina, skill, luck, gold, mask, phase=0):
+        """The state for standing on `page_id`, or LOSS/WIN if the adventure is over."""
+        if stamina <= 0:
+            return LOSS
+        terminal = self._terminal.get(page_id)
+        if terminal is not None:
+            return terminal
+        # Forget what nothing ahead can test, so states that only differ there merge
+        gold = min(max(gold, GOLD_FLOOR), self._gold_needed[page_id])
+        if gold > GOLD_EXACT:
+            gold -= (gold - GOLD_EXACT) % self.gold_step
+        state = (page_id, phase, stamina, skill, luck, gold, mask & self._needed[page_id])
+        if page_id in self._passes:
+            # Nothing to decide or roll here: stand on wherever it leads instead
+            (_, edges), = self.actions(state)
+            if len(edges) == 1:
+                return edges[0][1]
+        return state
+
+    def state_for(self, character, page_id, last_enemy=""):
+        mask = 0
+        for item in character.inventory:
+            mask |= self.item_bits.get(item.casefold(), 0)
+        return self.at(page_id, character.stamina, character.skill, character.luck, character.gold, self._tagged(mask, last_enemy))
+
+    def _tagged(self, mask, enemy_name):
+        """`mask` with the condition_combat bits set for having just fought `enemy_name`."""
+        tags = self._tagged_cache.get(enemy_name)
+        if tags is None:
+            name = enemy_name.lower()
+            tags = self._tagged_cache[enemy_name] = sum(bit for bit, target in self.tags if target in name)
+        return (mask & self.items_mask) | tags
+
+    def _has(self, mask, item):
+        return bool(mask & self.item_bits[item.casefold()])
+
+    # --- Effects ---
+    def _apply(self, effects, stamina, skill, luck, gold, mask):
+        """Character.apply_effects on a compressed state: [(probability, (stamina, skill, luck, gold, mask))]."""
+        if not effects:
+            return [(1.0, (stamina, skill, luck, gold, mask))]
+        get = effects.get
+        if get("stamina"):
+            stamina = max(0, min(self.max_stamina, stamina + effects["stamina"]))
+        if get("skill"):
+            skill = max(0, min(self.max_skill, skill + effects["skill"]))
+        if get("luck"):
+            luck = max(0, min(self.max_luck, luck + effects["luck"]))
+        change = get("gold")
+        if change == "set_to_0":
+            gold = 0
+        elif isinstance(change, int) and change:
+            gold = max(0, gold + change)
+        for item in get("add_items", ()):
+            mask |= self.item_bits.get(item.casefold(), 0)
+        for item in get("remove_items", ()):
+            mask &= ~self.item_bits.get(item.casefold(), 0)
+        count = get("lose_random_items")
+        if count:
+            return [(p, (stamina, skill, luck, gold, left)) for p, left in self._lose_random(mask, count, UNTRACKED_ITEMS)]
+        return [(1.0, (stamina, skill, luck, gold, mask))]
+
+    def _lose_random(self, mask, count, fillers):
+        held = [bit for bit in self.item_bits.values() if mask & bit]
+        total = len(held) + fillers
+        if not count or not total:
+            return [(1.0, mask)]
+        found = []
+        for bit in held:
+            found.extend((p / total, left) for p, left in self._lose_random(mask & ~bit, count - 1, fillers))
+        if fillers:
+            found.extend((p * fillers / total, left) for p, left in self._lose_random(mask, count - 1, fillers - 1))
+        return found
+
+    def _then(self, page_id, changes):
+        return [(p, self.at(page_id, *stats)) for p, stats in changes]
+
+    # --- Transitions ---
+    def actions(self, state):
+        """[(label, [(probability, next state)])] for every choice open in `state`; one unlabelled action if none."""
+        page_id, phase, stamina, skill, luck, gold, mask = state
+        page = self.graph.pages[page_id]
+        ptype = page.type
+        out = page.outcomes
+        stats = (stamina, skill, luck, gold, mask)
+
+        if ptype == "choice":
+            return [(number, [(1.0, self.at(target, *stats))]) for number, (_, target, _) in enumerate(page.choices, 1)]
+
+        if ptype == "transaction":
+            found = []
+            for number, (_, target, option) in enumerate(page.choices, 1):
+                cost = option.get("cost", 0)
+                if gold >= cost:
+                    found.append((number, self._then(target, self._apply(option.get("effect"), stamina, skill, luck, gold - cost, mask))))
+            return found # Nothing affordable: stuck on this page for good
+
+        if ptype == "auto":
+            return [(None, [(1.0, self.at(page.next, *stats))])]
+
+        if ptype == "effect":
+            return [(None, self._then(page.next, self._apply(page.data.get("effects"), *stats)))]
+
+        if ptype == "random_effect":
+            rolls = self._rolls.get(page_id)
+            if rolls is None:
+                rolls = self._rolls[page_id] = list(outcomes(lambda dice: _freeze(page.effects.evaluate(page.roll(None, dice), dice))).items())
+            edges = []
+            for effects, p in rolls:
+                edges.extend((p * q, next_state) for q, next_state in self._then(page.next, self._apply(dict(effects), *stats)))
+            return [(None, edges)]
+
+        if ptype == "random_test":
+            rolls = self._rolls.get(page_id)
+            if rolls is None:
+                rolls = self._rolls[page_id] = list(outcomes(lambda dice: page.roll(None, dice)).items())
+            return [(None, [(p, self.at(random_test_target(out, roll), *stats)) for roll, p in rolls])]
+
+        if ptype == "luck_test":
+            return [(None, self._luck_branches(stamina, skill, luck, gold, mask, out["lucky"], out["unlucky"]))]
+
+        if ptype == "luck_test_double":
+            edges = []
+            first = chance_at_most(luck) if luck > 0 else 0.0
+            after = max(0, luck - 1)
+            for lucky, p in (("lucky", first), ("unlucky", 1 - first)):
+                second = chance_at_most(after) if after > 0 else 0.0
+                for result, q in (("lucky", second), ("unlucky", 1 - second)):
+                    edges.append((p * q, self.at(out[f"{lucky}_{result}"], stamina, skill, max(0, after - 1), gold, mask)))
+            return [(None, edges)]
+
+        if ptype == "skill_test":
+            success = chance_at_most(skill)
+            return [(None, [(success, self.at(out["success"], *stats)), (1 - success, self.at(out["failure"], *stats))])]
+
+        if ptype in ("condition_item", "condition_item_any", "condition_multi"):
+            items = _gate_items(page)
+            passed = any(self._has(mask, item) for item in items) if ptype == "condition_item_any" else all(self._has(mask, item) for item in items)
+            return [(None, [(1.0, self.at(out["success" if passed else "failure"], *stats))])]
+
+        if ptype == "condition_gold":
+            passed = gold >= page.data["check"]["amount"]
+            return [(None, [(1.0, self.at(out["success" if passed else "failure"], *stats))])]
+
+        if ptype == "condition_combat":
+            passed = bool(mask & self._tag_bits[page_id])
+            return [(None, [(1.0, self.at(out["success" if passed else "failure"], *stats))])]
+
+        if ptype in ("combat", "multi_combat"):
+            return [(policy, self._fight(page, stamina, skill, luck, gold, mask, policy)) for policy in self.luck_policies]
+
+        if ptype == "random_encounter":
+            found = []
+            for policy in self.luck_policies:
+                edges = []
+                for encounter in page.encounters.values():
+                    edges.extend((p / 6, next_state) for p, next_state in self._fight(encounter, stamina, skill, luck, gold, mask, policy))
+                found.append((policy, edges))
+            return found
+
+        if ptype in ("shop", "shop_multi"):
+            # Only key items are worth buying; anything else just costs gold
+            offered = [(item, cost) for item, cost in page.data["items"].items()
+                       if item.casefold() in self.item_bits and not self._has(mask, item)]
+            found = []
+            for chosen in _subsets(offered):
+                cost = sum(price for _, price in chosen)
+                if cost <= gold:
+                    bought = mask
+                    for item, _ in chosen:
+                        bought |= self.item_bits[item.casefold()]
+                    found.append((tuple(item for item, _ in chosen), [(1.0, self.at(page.next, stamina, skill, luck, gold - cost, bought))]))
+            return found
+
+        if ptype == "pawn_shop":
+            held = [(item, value) for item, value in page.data["items"].items() if self._has(mask, item)]
+            found = []
+            for chosen in _subsets(held):
+                sold = mask
+                for item, _ in chosen:
+                    sold &= ~self.item_bits[item.casefold()]
+                earned = sum(value for _, value in chosen)
+                found.append((tuple(item for item, _ in chosen), [(1.0, self.at(page.next, stamina, skill, luck, gold + earned, sold))]))
+            return found
+
+        if ptype == "dice_game":
+            rules = page.data.get("rules", {})
+            if rules.get("game_type", "high_roll") == "hot_potato":
+                wager = rules.get("wager", 5)
+                # Each round you lose on a 1 (1/6), else they lose on a 1 (5/36), else roll again
+                return [(None, [(6 / 11, self.at(page.next, stamina, skill, luck, gold - wager, mask)),
+                                (5 / 11, self.at(page.next, stamina, skill, luck, gold + wager, mask))])]
+            stake = rules.get("stake", 2)
+            stop = ("stop", [(1.0, self.at(page.next, *stats))])
+            if phase >= rules.get("max_plays", 4) or gold < stake:
+                return [stop]
+            return [stop, ("play", [
+                (15 / 36, self.at(page_id, stamina, skill, luck, gold + stake * 4, mask, phase + 1)),
+                (15 / 36, self.at(page_id, stamina, skill, luck, gold - stake, mask, phase + 1)),
+                (6 / 36, self.at(page_id, stamina, skill, luck, gold, mask, phase + 1)),
+            ])]
+
+        if ptype == "special_heal":
+            heal = page.data.get("heal_per_arrow", 2)
+            return [(arrows, self._then(page.next, self._apply(page.data.get("effects"), min(self.max_stamina, stamina + arrows * heal), skill, luck, gold, mask)))
+                    for arrows in range(7)]
+
+        return []
+
+    def _luck_branches(self, stamina, skill, luck, gold, mask, lucky, unlucky):
+        if luck <= 0:
+            return [(1.0, self.at(unlucky, stamina, skill, luck, gold, mask))]
+        p = chance_at_most(luck)
+        return [(p, self.at(lucky, stamina, skill, luck - 1, gold, mask)),
+                (1 - p, self.at(unlucky, stamina, skill, luck - 1, gold, mask))]
+
+    def _fight(self, page, stamina, skill, luck, gold, mask, policy):
+        key = (id(page), stamina, skill, luck, policy)
+        results = self._fights.get(key)
+        if results is None:
+            results = self._fights[key] = self._fight_results(page, stamina, skill, luck, policy)
+        if page.type == "combat":
+            mask = self._tagged(mask, page.enemies[-1][1]["name"])
+        return [(p, LOSS if target is None else self.at(target, after, skill, left, gold, mask)) for p, target, after, left in results]
+
+    def _fight_results(self, page, stamina, skill, luck, policy):
+        """[(probability, target page or None for death, STAMINA, LUCK)] for one fight."""
+        import numpy as np
+        from engine.odds import CombatRules, fight_odds, fight_table
+        rules = page.data.get("rules", {})
+        out = page.outcomes
+        if "escape_after_rounds" in rules or "max_rounds" in rules:
+            odds = fight_odds(skill, stamina, luck, [stats for _, stats in page.enemies], rules, policy)
+            lost, final = odds.lose, odds.final
+            fast = odds.win_fast / odds.win if odds.win > 0 else 0.0
+        else:
+            # Whole-fight tables shared by every start; enemies in turn carry the winner's state on
+            key = CombatRules(rules).key()
+            lost, carry = 0.0, None
+            for _, enemy in page.enemies:
+                table = fight_table(skill - enemy["skill"], enemy["stamina"], self.max_stamina, self.max_luck, key, policy)
+                ends = table[stamina, luck] if carry is None else np.tensordot(carry, table, axes=([0, 1], [0, 1]))
+                lost += float(ends[1].sum())
+                carry = ends[0]
+            final = {"win": carry}
+        results = [(lost, None, 0, 0)]
+        if "max_rounds" in rules:
+            split = (("win", out["win_fast"], fast), ("win", out["win_slow"], 1 - fast))
+        else:
+            split = (("win", out.get("win"), 1.0),)
+        if "escape" in out:
+            split += (("escape", out["escape"], 1.0),)
+        for name, target, share in split:
+            dist = final[name]
+            for after, left in zip(*np.nonzero(dist > FIGHT_EPSILON)):
+                results.append((float(dist[after, left]) * share, target, int(after), int(left)))
+        return results
+
+    # --- Solving ---
+    def _intern(self, state):
+        position = self.index.get(state)
+        if position is None:
+            position = self.index[state] = len(self.states)
+            self.states.append(state)
+            self.values.append(0.0)
+        return position
+
+    def explore(self, start):
+        """Adds every state reachable from `start`; returns the position of the first new state."""
+        first = len(self.states)
+        if isinstance(start, int) or start in self.index:
+            return first
+        if start in self._too_large:
+            raise StateLimitError(f"More than {self.max_states} states reachable from page {self.graph.pages[start[0]].key}")
+        self._intern(start)
+        position = first
+        while position < len(self.states):
+            if len(self.states) > self.max_states:
+                self._truncate(first)
+                self._too_large.add(start)
+                raise StateLimitError(f"More than {self.max_states} states reachable from page {self.graph.pages[start[0]].key}")
+            for _, edges in self.actions(self.states[position]):
+                merged = {}
+                for p, next_state in edges:
+                    if p > 0:
+                        target = next_state if isinstance(next_state, int) else self._intern(next_state)
+                        merged[target] = merged.get(target, 0.0) + p
+                self.targets.extend(merged)
+                self.probs.extend(merged.values())
+                self.edge_ends.append(len(self.targets))
+            self.state_ends.append(len(self.edge_ends) - 1)
+            position += 1
+        return first
+
+    def _truncate(self, first):
+        """Drops every state from `first` on, with the actions and edges they own."""
+        for state in self.states[first:]:
+            del self.index[state]
+        edges = self.edge_ends[self.state_ends[first]]
+        del self.states[first:]
+        del self.values[first:]
+        del self.state_ends[first + 1:]
+        del self.edge_ends[self.state_ends[first] + 1:]
+        del self.targets[edges:]
+        del self.probs[edges:]
+
+    def _successors(self, position):
+        targets, edge_ends = self.targets, self.edge_ends
+        return targets[edge_ends[self.state_ends[position]]:edge_ends[self.state_ends[position + 1]]]
+
+    def _components(self, first):
+        """Strongly connected components of the states from `first` on, sinks first."""
+        # States solved earlier are constants here, so their edges are left out
+        successors = lambda node: [target - first for target in self._successors(node + first) if target >= first]
+        return [[node + first for node in component] for component in _tarjan(len(self.states) - first, successors)]
+
+    def _backup(self, position):
+        values, targets, probs, edge_ends = self.values, self.targets, self.probs, self.edge_ends
+        best = 0.0
+        for action in range(self.state_ends[position], self.state_ends[position + 1]):
+            value = 0.0
+            for edge in range(edge_ends[action], edge_ends[action + 1]):
+                value += probs[edge] * values[targets[edge]]
+            if value > best:
+                best = value
+        return best
+
+    def _solve(self, first):
+        values = self.values
+        for component in self._components(first):
+            if len(component) == 1 and component[0] not in self._successors(component[0]):
+                values[component[0]] = self._backup(component[0])
+                continue
+            while True: # Gauss-Seidel sweeps until the loop settles
+                delta = 0.0
+                for position in component:
+                    value = self._backup(position)
+                    delta = max(delta, abs(value - values[position]))
+                    values[position] = value
+                if delta < TOLERANCE:
+                    break
+
+    def value(self, state):
+        """Probability of reaching victory from `state` under best play."""
+        if isinstance(state, int):
+            return self.values[state]
+        if state not in self.index:
+            self._solve(self.explore(state))
+        return self.values[self.index[state]]
+
+    def rank(self, state):
+        """[(label, victory probability)] for each action in `state`, best first."""
+        self.value(state)
+        ranked = []
+        for label, edges in self.actions(state):
+            ranked.append((label, sum(p * self.value(next_state) for p, next_state in edges)))
+        ranked.sort(key=lambda item: -item[1])
+        return ranked
+
+    def hint(self, page, character, last_enemy=""):
+        with self.lock:
+            return self._hint(page, character, last_enemy)
+
+    def _hint(self, page, character, last_enemy):
+        state = self.state_for(character, page.id, last_enemy)
+        if isinstance(state, int):
+            return "Nothing left to decide."
+        ranked = self.rank(state)
+        if not ranked:
+            return "No way forward from here."
+        label, chance = ranked[0]
+        if page.type in ("choice", "transaction"):
+            text = page.choices[label - 1][0]
+            others = ", ".join(f"{number}: {p:.1%}" for number, p in sorted(ranked[1:]))
+            return f"Best: {label}. {text} ({chance:.1%} to win{'; ' + others if others else ''})"
+        if page.type in ("combat", "multi_combat", "random_encounter"):
+            luck = "Test your Luck on every hit" if label == "always" else "Don't Test your Luck"
+            return f"{luck} in this fight ({chance:.1%} to win)."
+        return f"Best play wins {chance:.1%} of the time from here."
+
+def _tarjan(count, successors):
+    """Strongly connected components of nodes 0..count-1, sinks first (iterative Tarjan)."""
+    index = [-1] * count
+    low = [0] * count
+    on_stack = [False] * count
+    stack, components = [], []
+    counter = 0
+    for root in range(count):
+        if index[root] >= 0:
+            continue
+        work = [(root, iter(successors(root)))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            node, targets = work[-1]
+            for target in targets:
+                if index[target] < 0:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append((target, iter(successors(target))))
+                    break
+                if on_stack[target] and index[target] < low[node]:
+                    low[node] = index[target]
+            else:
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+def _gate_items(page):
+    if page.type == "condition_item":
+        return (page.data["check"]["item"],)
+    if page.type == "condition_multi":
+        return tuple(check["value"] for check in page.data["checks"] if check["type"] == "item")
+    if page.type == "condition_item_any":
+        return tuple(check["item"] for check in page.data["checks"])
+    return ()
+
+def _combat_target(page):
+    # Same matching as CheckHandler.handle_condition_combat
+    if page.enemies:
+        return page.enemies[0][1]["name"].lower()
+    return page.data["check"].get("last_enemy_fought", "").lower().replace("_", " ").rstrip(" 0123456789")
+
+def _subsets(options):
+    subsets = [()]
+    for option in options:
+        subsets += [chosen + (option,) for chosen in subsets]
+    return subsets
+
+_solvers_lock = threading.Lock()
+
+def solver_for(graph, max_skill, max_stamina, max_luck, max_states=HINT_STATES):
+    """Shared Solver per book and initial stats, so hints reuse earlier work.
+
+    Solvers live on the graph itself, so a pack eviction or hot reload that
+    drops the graph frees their tables with it.
+    """
+    key = (max_skill, max_stamina, max_luck, max_states)
+    with _solvers_lock:
+        solver = graph.solvers.get(key)
+        if solver is None:
+            solver = graph.solvers[key] = Solver(graph, max_skill, max_stamina, max_luck, max_states=max_states)
+        return solver
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Best play and victory chance by value iteration.")
+    parser.add_argument("--page", default="1")
+    parser.add_argument("--skill", type=int, default=9)
+    parser.add_argument("--stamina", type=int, default=18)
+    parser.add_argument("--luck", type=int, default=9)
+    parser.add_argument("--gold", type=int, default=9)
+    parser.add_argument("--items", nargs="*", default=["Sword", "Leather Armour", "Backpack"])
+    parser.add_argument("--max-states", type=int, default=MAX_STATES)
+    parser.add_argument("--data", default=DATA_DIR)
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(args.data, "pages.json"), "r", encoding="utf-8") as f:
+        story = json.load(f)
+    with open(os.path.join(args.data, "enemies.json"), "r", encoding="utf-8") as f:
+        enemies = json.load(f)
+    graph = compile_story(story, enemies)
+    page_id = graph.index.get(args.page)
+    if page_id is None:
+        print(f"No page {args.page!r}")
+        return 1
+
+    from models.character import Character
+    character = Character.from_dict({"name": "Solver", "skill": args.skill, "stamina": args.stamina, "luck": args.luck,
+                                     "max_skill": args.skill, "max_stamina": args.stamina, "max_luck": args.luck,
+                                     "gold": args.gold, "inventory": args.items})
+    solver = Solver(graph, args.skill, args.stamina, args.luck, max_states=args.max_states)
+    state = solver.state_for(character, page_id)
+    try:
+        chance = solver.value(state)
+    except StateLimitError as e:
+        print(f"{e}; raise --max-states or start further into the book")
+        return 1
+    print(f"{len(solver)} states, {len(solver.targets)} transitions")
+    print(f"Victory chance from page {args.page} under best play: {chance:.4%}")
+    if not isinstance(state, int):
+        for label, p in solver.rank(state):
+            print(f"  {label if label is not None else '(no choice)'}: {p:.4%}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
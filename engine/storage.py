@@ -1,26 +1,90 @@
 import json
 import os
+import threading
+import zlib
+from contextlib import contextmanager
+from engine import codec, metrics
+try:
+    import fcntl
+except ImportError: # Windows: shards are still written atomically, but only locked within one process
+    fcntl = None
 from models.character import Character
 
+def write_atomic(path, text):
+    """Writes `text` (str or bytes) to a temp file next to `path` and renames it into place."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp" # Per process, so two writers never share a temp file
+    with open(tmp_path, "wb") if isinstance(text, bytes) else open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+CODECS = ("json", "binary")
+
+class StaleWriteError(Exception):
+    """A save based on an older stored version than the one now on disk."""
+    def __init__(self, user_id, expected, actual):
+        super().__init__(f"Stale save for {user_id!r}: based on version {expected}, stored version is {actual}")
+        self.user_id = user_id
+        self.expected = expected
+        self.actual = actual
+
 class SaveManager:
-    def __init__(self, file_path="data/characters.json"):
+    """
+    Whole-file character store. `codec="binary"` keeps the file in the compact
+    snapshot format from engine.codec instead of pretty-printed JSON.
+
+    Saves are compare-and-swap on `Character.version`: a save must be based on
+    the version currently stored, and bumps it. A stale save calls
+    `on_conflict(mine, theirs)`, which returns the Character to write instead
+    (a merge, or `mine` to force it through), or None to raise StaleWriteError.
+    `stats` counts conflicts and the retries the hook resolved.
+    """
+    def __init__(self, file_path="data/characters.json", codec="json", on_conflict=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown save codec {codec!r}; expected one of {', '.join(CODECS)}")
         self.file_path = file_path
+        self.codec = codec
+        self.on_conflict = on_conflict
+        self.stats = {"conflicts": 0, "retries": 0}
+
+    def _read_bytes(self):
+        with open(self.file_path, "rb") as f:
+            blob = f.read()
+        if metrics.enabled:
+            metrics.observe_bytes("ff_storage_bytes", len(blob), "read")
+        return blob
 
     def _load_all(self):
         if not os.path.exists(self.file_path):
             return {}
+        if self.codec == "binary":
+            return codec.decode(self._read_bytes())
         try:
             with open(self.file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+                data = json.load(f)
+                if metrics.enabled:
+                    metrics.observe_bytes("ff_storage_bytes", f.tell(), "read")
+                return data
         except json.JSONDecodeError:
             return {}
 
     def _save_all(self, data):
-        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-        with open(self.file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        text = codec.encode(data) if self.codec == "binary" else json.dumps(data, indent=4)
+        write_atomic(self.file_path, text)
+        if metrics.enabled:
+            metrics.observe_bytes("ff_storage_bytes", len(text), "write")
 
     def load_character(self, user_id):
+        if self.codec == "binary":
+            # Seek straight to the one record instead of decoding the whole store
+            if not os.path.exists(self.file_path):
+                return None
+            record = codec.decode_one(self._read_bytes(), user_id)
+            return Character.from_dict(record) if record is not None else None
         data = self._load_all()
         if user_id in data:
             return Character.from_dict(data[user_id])
@@ -28,8 +92,9 @@ class SaveManager:
 
     def save_character(self, character):
         data = self._load_all()
-        data[character.user_id] = character.to_dict()
+        record = data[character.user_id] = self._swap(data.get(character.user_id), character.to_dict())
         self._save_all(data)
+        character.version = record["version"]
 
     def delete_character(self, user_id):
         data = self._load_all()
@@ -37,4 +102,315 @@ class SaveManager:
             del data[user_id]
             self._save_all(data)
             return True
-        return False
\ No newline at end of file
+        return False
+
+    def write_batch(self, records, deleted=()):
+        """
+        Applies many saves/deletes with a single read-modify-write. Returns
+        ({user_id: version written}, {user_id: StaleWriteError}); stale records
+        are skipped and the rest still land.
+        """
+        data = self._load_all()
+        result = self._merge(data, records, deleted)
+        self._save_all(data)
+        return result
+
+    # --- Compare-and-swap ---
+    def _swap(self, stored, record):
+        """The record to store over `stored` (a dict or None), with its version bumped."""
+        current = stored.get("version", 0) if stored else 0
+        if record.get("version", 0) != current:
+            self.stats["conflicts"] += 1
+            resolved = None
+            if self.on_conflict is not None:
+                resolved = self.on_conflict(Character.from_dict(record), Character.from_dict(stored) if stored else None)
+            if resolved is None:
+                raise StaleWriteError(record["user_id"], record.get("version", 0), current)
+            self.stats["retries"] += 1
+            record = resolved.to_dict()
+        record["version"] = current + 1
+        return record
+
+    def _merge(self, data, records, deleted):
+        written, stale = {}, {}
+        for user_id, record in records.items():
+            try:
+                record = data[user_id] = self._swap(data.get(user_id), dict(record))
+            except StaleWriteError as e:
+                stale[user_id] = e
+                continue
+            written[user_id] = record["version"]
+        for user_id in deleted:
+            data.pop(user_id, None)
+        return written, stale
+
+    # Hooks for write-back wrappers; plain storage writes through
+    def note_page(self, page_type):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class MemorySaveManager(SaveManager):
+    """Keeps live Character objects in a dict. For headless runs that must not touch disk."""
+    def __init__(self, on_conflict=None):
+        super().__init__(file_path=None, on_conflict=on_conflict)
+        self._characters = {}
+
+    def _load_all(self):
+        return {uid: c.to_dict() for uid, c in self._characters.items()}
+
+    def load_character(self, user_id):
+        return self._characters.get(user_id)
+
+    def save_character(self, character):
+        stored = self._characters.get(character.user_id)
+        if stored is character or (stored is None and not character.version):
+            character.version += 1 # The common case: the session saving its own live object
+            self._characters[character.user_id] = character
+            return
+        record = self._swap(stored.to_dict() if stored else None, character.to_dict())
+        character.version = record["version"]
+        self._characters[character.user_id] = Character.from_dict(record)
+
+    def delete_character(self, user_id):
+        return self._characters.pop(user_id, None) is not None
+
+    def write_batch(self, records, deleted=()):
+        data = {uid: self._characters[uid].to_dict() for uid in records if uid in self._characters}
+        written, stale = self._merge(data, records, deleted)
+        for user_id in written:
+            self._characters[user_id] = Character.from_dict(data[user_id])
+        for user_id in deleted:
+            self._characters.pop(user_id, None)
+        return written, stale
+
+class JournaledSaveManager(SaveManager):
+    """
+    Appends every save/delete to a journal instead of rewriting the snapshot.
+    The journal is folded into `characters.json` every `compact_every` records
+    and replayed on startup, so a crash only loses a torn final line.
+
+    The store lives in this process's memory and is only read from disk at
+    startup, so its compare-and-swap sees this process's saves alone. Give
+    each journal a single process; processes that share saves need
+    SaveManager or ShardedSaveManager, which check the version on disk.
+    """
+    def __init__(self, file_path="data/characters.json", journal_path=None, compact_every=1000, fsync=False, codec="json", on_conflict=None):
+        super().__init__(file_path, codec, on_conflict)
+        self.journal_path = journal_path or os.path.splitext(file_path)[0] + ".journal"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._journal = None
+        self._records = 0
+        self._data = self._recover()
+
+    # --- Recovery ---
+    def _recover(self):
+        data = super()._load_all()
+        if not os.path.exists(self.journal_path):
+            return data
+
+        good_bytes = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break  # Torn write from a crash; everything after it is garbage
+                if not line.endswith(b"\n"):
+                    break
+                self._apply(data, record)
+                self._records += 1
+                good_bytes += len(line)
+
+        # Drop the torn tail so new records don't get glued onto it
+        if good_bytes != os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good_bytes)
+        return data
+
+    @staticmethod
+    def _apply(data, record):
+        if record["op"] == "save":
+            data[record["id"]] = record["data"]
+        elif record["op"] == "delete":
+            data.pop(record["id"], None)
+
+    # --- Journal ---
+    def _append(self, record):
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._journal.write(line)
+        self._journal.flush()
+        if metrics.enabled:
+            metrics.observe_bytes("ff_storage_bytes", len(line), "append")
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+        self._apply(self._data, record)
+        self._records += 1
+        if self._records >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        # Snapshot first, then truncate: a crash in between just replays
+        # records that are already in the snapshot, which is harmless.
+        self._save_all(self._data)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._records = 0
+
+    def close(self):
+        if self._records:
+            self.compact()
+        elif self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    # --- Public API ---
+    def _load_all(self):
+        return self._data
+
+    def load_character(self, user_id):
+        if user_id in self._data:
+            return Character.from_dict(self._data[user_id])
+        return None
+
+    def save_character(self, character):
+        record = self._swap(self._data.get(character.user_id), character.to_dict())
+        self._append({"op": "save", "id": character.user_id, "data": record})
+        character.version = record["version"]
+
+    def delete_character(self, user_id):
+        if user_id in self._data:
+            self._append({"op": "delete", "id": user_id})
+            return True
+        return False
+
+    def write_batch(self, records, deleted=()):
+        written, stale = {}, {}
+        for user_id, data in records.items():
+            try:
+                record = self._swap(self._data.get(user_id), dict(data))
+            except StaleWriteError as e:
+                stale[user_id] = e
+                continue
+            self._append({"op": "save", "id": user_id, "data": record})
+            written[user_id] = record["version"]
+        for user_id in deleted:
+            if user_id in self._data:
+                self._append({"op": "delete", "id": user_id})
+        return written, stale
+
+class ShardedSaveManager(SaveManager):
+    """
+    Spreads characters over `shards` files in `directory`, picked by a stable
+    hash of user_id, so a save rewrites one shard instead of the whole user
+    base. Each shard has a `.lock` file held with an fcntl advisory lock
+    around every read-modify-write, so several bot processes can share the
+    directory. The shard count and codec are fixed by `shards.json` when the
+    directory is first used (see `python -m engine.migrate` to split an
+    existing characters.json).
+    """
+    def __init__(self, directory="data/characters", shards=64, codec="json", on_conflict=None):
+        super().__init__(None, codec, on_conflict)
+        self.directory = directory
+        manifest_path = os.path.join(directory, "shards.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            shards, codec = manifest["shards"], manifest["codec"]
+        else:
+            os.makedirs(directory, exist_ok=True)
+            write_atomic(manifest_path, json.dumps({"shards": shards, "codec": codec}))
+        self.shard_count = shards
+        self.codec = codec
+
+        extension = "ffc" if codec == "binary" else "json"
+        self._shards = [SaveManager(os.path.join(directory, f"shard-{i:03d}.{extension}"), codec) for i in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._lock_files = [None] * shards
+
+    def shard_of(self, user_id):
+        return zlib.crc32(str(user_id).encode("utf-8")) % self.shard_count
+
+    @contextmanager
+    def _locked(self, index, exclusive=True):
+        # The thread lock covers this process; flock covers the others. The
+        # lock lives in a side file because atomic renames replace the shard.
+        with self._locks[index]:
+            if fcntl is None:
+                yield self._shards[index]
+                return
+            lock_file = self._lock_files[index]
+            if lock_file is None:
+                lock_file = self._lock_files[index] = open(os.path.join(self.directory, f"shard-{index:03d}.lock"), "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield self._shards[index]
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- Public API ---
+    def _load_all(self):
+        data = {}
+        for index in range(self.shard_count):
+            with self._locked(index, exclusive=False) as shard:
+                data.update(shard._load_all())
+        return data
+
+    def _save_all(self, data):
+        by_shard = [{} for _ in range(self.shard_count)]
+        for user_id, record in data.items():
+            by_shard[self.shard_of(user_id)][user_id] = record
+        for index, records in enumerate(by_shard):
+            with self._locked(index) as shard:
+                shard._save_all(records)
+
+    def load_character(self, user_id):
+        with self._locked(self.shard_of(user_id), exclusive=False) as shard:
+            return shard.load_character(user_id)
+
+    def save_character(self, character):
+        # Read, compare and write under one exclusive lock, so the swap holds across processes
+        with self._locked(self.shard_of(character.user_id)) as shard:
+            data = shard._load_all()
+            record = data[character.user_id] = self._swap(data.get(character.user_id), character.to_dict())
+            shard._save_all(data)
+        character.version = record["version"]
+
+    def delete_character(self, user_id):
+        with self._locked(self.shard_of(user_id)) as shard:
+            return shard.delete_character(user_id)
+
+    def write_batch(self, records, deleted=()):
+        """One read-modify-write per touched shard."""
+        touched = {}
+        for user_id, record in records.items():
+            touched.setdefault(self.shard_of(user_id), ({}, []))[0][user_id] = record
+        for user_id in deleted:
+            touched.setdefault(self.shard_of(user_id), ({}, []))[1].append(user_id)
+        written, stale = {}, {}
+        for index, (shard_records, shard_deleted) in sorted(touched.items()):
+            with self._locked(index) as shard:
+                data = shard._load_all()
+                shard_written, shard_stale = self._merge(data, shard_records, shard_deleted)
+                shard._save_all(data)
+            written.update(shard_written)
+            stale.update(shard_stale)
+        return written, stale
+
+    def close(self):
+        for index, lock_file in enumerate(self._lock_files):
+            if lock_file is not None:
+                lock_file.close()
+                self._lock_files[index] = None
@@ -0,0 +1,175 @@
+"""
+Golden transcripts: scripted sessions through the real main menu, checked
+against the screen output and final character they produced before.
+
+    python -m engine.transcripts                    # every transcripts/*.json
+    python -m engine.transcripts transcripts/shop.json --update
+
+A transcript is a JSON file:
+
+    {"seed": 7, "character": {"current_location": "52", "gold": 20}, "inputs": ["2", "1", ""]}
+
+`inputs` are typed at the prompts in order, starting at the main menu, with
+dice seeded from `seed`. `character`, if given, is stored before the menu
+starts (over DEFAULT_CHARACTER), so "2" continues from its page. The run
+stops when the inputs run out or the menu quits. Its plain-text output, each
+answer echoed after its prompt, and the stored character end up in a
+`.golden` file next to the script. Exits with status 1 on any difference.
+
+Runs only see the built-in book, and the FF_* settings that change what the
+game does or writes (metrics, analytics, hot reload, event logs) are unset
+while they play, so the shell running the harness can't change a transcript.
+"""
+import argparse
+import difflib
+import glob
+import io
+import json
+import multiprocessing
+import os
+from contextlib import contextmanager
+
+from engine.dice import Dice
+from engine.io import TerminalIO
+from engine.pacing import InstantClock
+from engine.render import PlainBackend
+from engine.simulator import SimulationAborted
+from engine.storage import MemorySaveManager
+from models.character import DEFAULT_BOOK, Character
+
+TRANSCRIPT_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "transcripts"))
+USER_ID = "local_player"
+PINNED_ENV = ("FF_METRICS_FILE", "FF_ANALYTICS_FILE", "FF_HOT_RELOAD", "FF_EVENT_LOG_DIR")
+
+DEFAULT_CHARACTER = {
+    "name": "Tester", "user_id": USER_ID,
+    "skill": 10, "stamina": 20, "luck": 10, "max_skill": 10, "max_stamina": 20, "max_luck": 10,
+    "inventory": ["Sword", "Leather Armour", "Backpack"], "gold": 10, "provisions": 10, "current_location": "1",
+}
+
+class ScriptedTerminalIO(TerminalIO):
+    """The terminal port in plain mode, writing to a buffer and typing answers from a script."""
+    def __init__(self, answers):
+        super().__init__(backend=PlainBackend(), stream=io.StringIO(), clock=InstantClock())
+        self.answers = list(answers)
+        self.position = 0
+
+    async def read(self, prompt="", options=None):
+        self.frame.raw(prompt)
+        if self.position == len(self.answers):
+            self.frame.raw("\n[end of script]\n")
+            self.frame.flush()
+            raise SimulationAborted("Script exhausted")
+        answer = self.answers[self.position]
+        self.position += 1
+        self.frame.raw(answer + "\n") # Echoed, as a terminal would show it
+        self.frame.flush()
+        return answer
+
+    def text(self):
+        self.frame.flush()
+        return self.frame.stream.getvalue()
+
+class TranscriptResult:
+    def __init__(self, path, ok, diff=None, error=None):
+        self.path = path
+        self.ok = ok
+        self.diff = diff
+        self.error = error
+
+    def describe(self):
+        if self.ok:
+            return f"OK    {self.path}"
+        if self.error:
+            return f"ERROR {self.path}: {self.error}"
+        return f"DIFF  {self.path}\n{self.diff}"
+
+@contextmanager
+def pinned_env():
+    saved = {name: os.environ.pop(name) for name in PINNED_ENV if name in os.environ}
+    try:
+        yield
+    finally:
+        os.environ.update(saved)
+
+def run_script(script):
+    """The golden text for one transcript: screen output, then the stored character as JSON."""
+    from main import DATA_DIR, main_menu # Top-level entry point; only the harness needs it
+    port = ScriptedTerminalIO(script["inputs"])
+    storage = MemorySaveManager()
+    if "character" in script:
+        storage.save_character(Character.from_dict({**DEFAULT_CHARACTER, **script["character"]}))
+    try:
+        with pinned_env():
+            main_menu(io=port, save_manager=storage, dice=Dice(script.get("seed", 0)), log_dir=None, books={DEFAULT_BOOK: DATA_DIR})
+    except (SimulationAborted, SystemExit):
+        pass
+    final = storage.load_character(USER_ID)
+    state = json.dumps(final.to_dict() if final else None, indent=2, sort_keys=True)
+    return f"{port.text()}\n=== final character ===\n{state}\n"
+
+def golden_path(path):
+    return os.path.splitext(path)[0] + ".golden"
+
+def check(path, update=False):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            got = run_script(json.load(f))
+    except Exception as e:
+        return TranscriptResult(path, False, error=f"{type(e).__name__}: {e}")
+
+    golden = golden_path(path)
+    if update:
+        with open(golden, "w", encoding="utf-8") as f:
+            f.write(got)
+        return TranscriptResult(path, True)
+    try:
+        with open(golden, "r", encoding="utf-8") as f:
+            want = f.read()
+    except FileNotFoundError:
+        return TranscriptResult(path, False, error="No golden file; run with --update")
+    if want == got:
+        return TranscriptResult(path, True)
+    diff = "".join(difflib.unified_diff(want.splitlines(True), got.splitlines(True), golden, "this run"))
+    return TranscriptResult(path, False, diff=diff)
+
+# --- Process Pool ---
+def _check(args):
+    return check(*args)
+
+def check_all(paths, update=False, processes=None):
+    jobs = [(path, update) for path in paths]
+    if processes == 1:
+        return [_check(job) for job in jobs]
+    with multiprocessing.Pool(processes) as pool:
+        # Every transcript gets its own menu, engine, storage and dice, so any worker can run any of them
+        return pool.map(_check, jobs, chunksize=max(1, len(jobs) // ((processes or os.cpu_count()) * 2)))
+
+def find_scripts(targets):
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(sorted(glob.glob(os.path.join(target, "*.json"))))
+        else:
+            paths.append(target)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run scripted sessions and diff them against their golden transcripts.")
+    parser.add_argument("scripts", nargs="*", default=[TRANSCRIPT_DIR], help="Transcript files or directories of them")
+    parser.add_argument("--update", action="store_true", help="Rewrite the golden files from this run")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--verbose", action="store_true", help="List passing transcripts too")
+    args = parser.parse_args(argv)
+
+    results = check_all(find_scripts(args.scripts), args.update, args.processes)
+    failed = [r for r in results if not r.ok]
+    for result in results:
+        if args.verbose or not result.ok:
+            print(result.describe())
+    verb = "written" if args.update else "matched"
+    print(f"{len(results) - len(failed)}/{len(results)} transcripts {verb}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
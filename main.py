@@ -1,16 +1,21 @@
 import json
 import os
 import sys
+from engine import metrics
 from engine.game import GameEngine
-from engine.utils import clear_screen, print_header, print_error
+from engine.io import TerminalIO, numbered, run_sync
+from engine.graph import StoryError, compile_story
+from engine.packs import ContentPack, PackLibrary, read_meta
+from engine.render import render_cache
+from engine.utils import print_error
 
-def load_data():
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+def load_data(directory=DATA_DIR):
     try:
-        base_path = os.path.dirname(__file__)
-        
-        with open(os.path.join(base_path, "data/pages.json"), "r", encoding="utf-8") as f:
+        with open(os.path.join(directory, "pages.json"), "r", encoding="utf-8") as f:
             story = json.load(f)
-        with open(os.path.join(base_path, "data/enemies.json"), "r", encoding="utf-8") as f:
+        with open(os.path.join(directory, "enemies.json"), "r", encoding="utf-8") as f:
             enemies = json.load(f)
         return story, enemies
     except FileNotFoundError as e:
@@ -20,43 +25,113 @@ def load_data():
         print_error(f"FATAL: JSON format error. {e}")
         sys.exit(1)
 
-def main_menu():
-    story_data, enemy_data = load_data()
-    engine = GameEngine(story_data, enemy_data)
+def load_book(book_id, directory, color=True):
+    # Deferred until an adventure needs this book; the menu never does
+    story_data, enemy_data = load_data(directory)
+    try:
+        graph = compile_story(story_data, enemy_data)
+    except StoryError as e:
+        print_error(f"FATAL: Broken story data in {book_id}. {e}")
+        sys.exit(1)
+    render_cache.prerender(graph, color=color)
+    return ContentPack(book_id, read_meta(directory), graph, directory)
 
+def choose_book(io, library):
+    titles = library.titles()
+    if len(titles) == 1:
+        return next(iter(titles))
+    io.write("Choose your book:")
+    for number, title in enumerate(titles.values(), 1):
+        io.write(f"{number}. {title}")
     while True:
-        clear_screen()
-        print_header("FIGHTING FANTASY: CITY OF THIEVES")
-        print("1. New Game / Create Character")
-        print("2. Continue Adventure")
-        print("3. View Character Stats")
-        print("4. Delete Character")
-        print("5. Quit")
-        
-        choice = input("\nSelect an option: ").strip()
-
-        if choice == "1":
-            clear_screen()
-            if engine.create_character_flow():
-                engine.play()
-        elif choice == "2":
-            engine.play()
-        elif choice == "3":
-            clear_screen()
-            engine.show_stats()
-        elif choice == "4":
-            confirm = input("Are you sure you want to delete your character? (y/n): ")
-            if confirm.lower() == 'y':
-                if engine.delete_character():
-                    print("Character deleted.")
-                else:
-                    print("No character to delete.")
-                input("Press Enter...")
-        elif choice == "5":
-            print("Goodbye!")
-            sys.exit()
-        else:
-            pass
+        choice = run_sync(io.read("\n> ", numbered(len(titles)))).strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(titles):
+            return list(titles)[int(choice) - 1]
+        io.error("Invalid choice.")
+
+def watch_story(color=True):
+    from engine.reload import StoryWatcher
+    def on_reload(graph):
+        # Called before the swap: pin the new version, then let go of the one it replaces
+        render_cache.prerender(graph, color=color)
+        render_cache.unpin(watcher.graph)
+    try:
+        watcher = StoryWatcher(DATA_DIR, on_reload=on_reload)
+    except (OSError, json.JSONDecodeError, StoryError) as e:
+        print_error(f"FATAL: Could not load story data. {e}")
+        sys.exit(1)
+    render_cache.prerender(watcher.graph, color=color)
+    return watcher.start()
+
+def main_menu(io=None, save_manager=None, dice=None, log_dir=None, books=None):
+    # Defaults are the terminal game; the transcript harness passes its own port, storage, dice and books
+    # ({book_id: directory}; by default every book installed under data/)
+    # FF_METRICS_FILE=path turns on latency histograms, exported there in Prometheus text format
+    metrics_file = os.environ.get("FF_METRICS_FILE")
+    if metrics_file:
+        metrics.enable(textfile=metrics_file)
+
+    # FF_EVENT_LOG_DIR=dir leaves one event log per adventure there, for bug reports (python -m engine.replay dir)
+    if log_dir is None:
+        log_dir = os.environ.get("FF_EVENT_LOG_DIR")
+
+    # FF_ANALYTICS_FILE=path keeps running page, choice, fight and gold totals there (python -m engine.analytics path)
+    analytics_file = os.environ.get("FF_ANALYTICS_FILE")
+    analytics = None
+    if analytics_file:
+        from engine.analytics import Analytics
+        analytics = Analytics(analytics_file).start()
+
+    io = io or TerminalIO() # Picks the colour or plain backend once for the whole run
+    library = PackLibrary(DATA_DIR, loader=lambda book_id, directory: load_book(book_id, directory, io.backend.color), directories=books)
+    engine = GameEngine(io=io, books=library, save_manager=save_manager, dice=dice, log_dir=log_dir, analytics=analytics)
+
+    # FF_HOT_RELOAD=1 picks up edits to data/*.json (the built-in book) between pages instead of at the next start
+    if os.environ.get("FF_HOT_RELOAD"):
+        engine.story = watch_story(io.backend.color)
+
+    try:
+        while True:
+            io.clear()
+            io.header("FIGHTING FANTASY: CITY OF THIEVES")
+            io.write("1. New Game / Create Character")
+            io.write("2. Continue Adventure")
+            io.write("3. View Character Stats")
+            io.write("4. Delete Character")
+            io.write("5. Quit")
+            
+            choice = run_sync(io.read("\nSelect an option: ")).strip()
+
+            if choice == "1":
+                io.clear()
+                engine.book = choose_book(io, library)
+                if run_sync(engine.create_character_flow()):
+                    run_sync(engine.play())
+            elif choice == "2":
+                run_sync(engine.play())
+            elif choice == "3":
+                io.clear()
+                run_sync(engine.show_stats())
+            elif choice == "4":
+                confirm = run_sync(io.read("Are you sure you want to delete your character? (y/n): "))
+                if confirm.lower() == 'y':
+                    if engine.delete_character():
+                        io.write("Character deleted.")
+                    else:
+                        io.write("No character to delete.")
+                    run_sync(io.read("Press Enter..."))
+            elif choice == "5":
+                io.write("Goodbye!")
+                io.close()
+                if metrics.enabled:
+                    metrics.disable()
+                if analytics is not None:
+                    analytics.stop()
+                sys.exit()
+            else:
+                pass
+    finally:
+        engine.save_manager.close() # Writes back whatever the cache still holds, even on Ctrl-C
 
 if __name__ == "__main__":
     os.system('') 
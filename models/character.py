@@ -1,24 +1,68 @@
-import random
+import threading
 from colorama import Fore, Style
 
+# Casefolded item name -> bit, shared by every character in the process. Only
+# items a character actually holds are interned; queries never add names.
+_ITEM_BITS = {}
+_ITEM_LOCK = threading.Lock()
+
+def held_bit(item_name):
+    """The bit of an item someone has held, or 0 for a name never interned."""
+    return _ITEM_BITS.get(item_name.casefold(), 0)
+
+def item_bit(item_name):
+    """Interns an item name that is going into an inventory."""
+    key = item_name.casefold()
+    bit = _ITEM_BITS.get(key)
+    if bit is None:
+        with _ITEM_LOCK:
+            bit = _ITEM_BITS.setdefault(key, 1 << len(_ITEM_BITS))
+    return bit
+
+DEFAULT_BOOK = "city_of_thieves" # Book of saves made before content packs
+
+# Saved fields, in save-file order
+FIELDS = ("name", "user_id", "skill", "stamina", "luck", "max_skill", "max_stamina", "max_luck", "inventory", "gold", "provisions", "current_location", "version", "book")
+
 class Character:
-    def __init__(self, name, user_id="local_player"):
+    # Slotted: thousands of resident sessions each hold one of these
+    __slots__ = ("name", "user_id", "skill", "stamina", "luck", "max_skill", "max_stamina", "max_luck",
+                 "gold", "provisions", "current_location", "version", "book", "_inventory", "_items")
+
+    def __init__(self, name, user_id="local_player", *, dice, book=DEFAULT_BOOK):
+        # `dice` is the session's engine.dice.Dice, passed in so models never import the engine
         self.name = name
         self.user_id = str(user_id)
-        self.skill = self.roll_dice(1) + 6
-        self.stamina = self.roll_dice(2) + 12
-        self.luck = self.roll_dice(1) + 6
+        self.skill = self.roll_dice(1, dice) + 6
+        self.stamina = self.roll_dice(2, dice) + 12
+        self.luck = self.roll_dice(1, dice) + 6
         self.max_skill = self.skill
         self.max_stamina = self.stamina
         self.max_luck = self.luck
         self.inventory = ["Sword", "Leather Armour", "Backpack"]
-        self.gold = self.roll_dice(1) + 8
+        self.gold = self.roll_dice(1, dice) + 8
         self.provisions = 10
         self.current_location = "1"
+        self.version = 0 # Stored version this copy was loaded from; storage bumps it on every save
+        self.book = book # Content pack that current_location belongs to
+
+    # --- Inventory ---
+    # `_inventory` is an immutable tuple in display order; `_items` is a bitset
+    # over interned casefolded item names, so lookups never rescan it.
+    @property
+    def inventory(self):
+        return self._inventory
+
+    @inventory.setter
+    def inventory(self, items):
+        self._inventory = tuple(items)
+        self._items = 0
+        for item in self._inventory:
+            self._items |= item_bit(item)
 
     @staticmethod
-    def roll_dice(number_of_dice):
-        return sum(random.randint(1, 6) for _ in range(number_of_dice))
+    def roll_dice(number_of_dice, dice):
+        return dice.roll(number_of_dice)
 
     def take_damage(self, amount):
         self.stamina = max(0, self.stamina - amount)
@@ -29,26 +73,33 @@ class Character:
     def is_dead(self):
         return self.stamina <= 0
 
-    def test_skill(self):
-        return self.roll_dice(2) <= self.skill
+    def test_skill(self, dice):
+        return dice.two_d6() <= self.skill
 
-    def test_luck(self):
+    def test_luck(self, dice):
         if self.luck <= 0: return False
-        is_lucky = self.roll_dice(2) <= self.luck
+        is_lucky = dice.two_d6() <= self.luck
         self.luck = max(0, self.luck - 1)
         return is_lucky
 
     def has_item(self, item_name):
-        return item_name.lower() in (item.lower() for item in self.inventory)
+        return bool(self._items & held_bit(item_name))
         
     def add_item(self, item_name):
-        if not self.has_item(item_name):
-            self.inventory.append(item_name)
+        bit = item_bit(item_name)
+        if not self._items & bit:
+            self._inventory += (item_name,)
+            self._items |= bit
 
     def remove_item(self, item_name):
-        item_to_remove = next((item for item in self.inventory if item.lower() == item_name.lower()), None)
-        if item_to_remove:
-            self.inventory.remove(item_to_remove)
+        bit = held_bit(item_name)
+        if not self._items & bit:
+            return
+        key = item_name.casefold()
+        matches = [i for i, item in enumerate(self._inventory) if item.casefold() == key]
+        self._inventory = self._inventory[:matches[0]] + self._inventory[matches[0] + 1:]
+        if len(matches) == 1: # Old saves may hold duplicates; keep the bit while one is left
+            self._items &= ~bit
 
     def eat_provision(self):
         if self.provisions > 0:
@@ -61,7 +112,7 @@ class Character:
         else:
             return "You have no provisions left!"
 
-    def apply_effects(self, effects):
+    def apply_effects(self, effects, dice):
         summary = []
         
         # --- STAMINA ---
@@ -118,9 +169,9 @@ class Character:
             count = effects["lose_random_items"]
             lost = []
             for _ in range(count):
-                if self.inventory:
-                    item = random.choice(self.inventory)
-                    self.inventory.remove(item)
+                if self._inventory:
+                    item = dice.choice(self._inventory)
+                    self.remove_item(item)
                     lost.append(item)
             if lost:
                 summary.append(f"Lost random items: {', '.join(lost)}")
@@ -128,12 +179,28 @@ class Character:
         return ", ".join(summary)
 
     def to_dict(self):
-        return self.__dict__
+        """A fresh dict; nothing in it aliases the live character."""
+        return {field: list(self._inventory) if field == "inventory" else getattr(self, field) for field in FIELDS}
 
     @classmethod
     def from_dict(cls, data):
-        char = cls(name=data['name'], user_id=data.get('user_id', 'local_player'))
-        char.__dict__.update(data)
+        # Saved stats are authoritative; skip __init__ so loading never rolls dice
+        char = cls.__new__(cls)
+        get = data.get
+        char.name = data["name"]
+        char.user_id = get("user_id", "local_player")
+        char.skill = data["skill"]
+        char.stamina = data["stamina"]
+        char.luck = data["luck"]
+        char.max_skill = data["max_skill"]
+        char.max_stamina = data["max_stamina"]
+        char.max_luck = data["max_luck"]
+        char.inventory = get("inventory", ())
+        char.gold = get("gold", 0)
+        char.provisions = get("provisions", 10)
+        char.current_location = get("current_location", "1")
+        char.version = get("version", 0)
+        char.book = get("book", DEFAULT_BOOK)
         return char
 
     def __str__(self):